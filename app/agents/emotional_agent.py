@@ -19,17 +19,18 @@ def emotional_node(state: HerCycleState) -> Dict[str, Any]:
     symptom_output = state["agent_outputs"].get("symptom_insight")
     
     # Extract mood and journal
-    mood = daily_log.get("mood", "neutral") if daily_log else "neutral"
+    from app.rag.query_templates import mood_and_stress, plan_queries, EMOTIONAL_CONTEXT_CHARS
+    mood, stress = mood_and_stress(daily_log)
     journal = daily_log.get("journal", "") if daily_log else ""
-    stress = daily_log.get("stress", 3) if daily_log else 3
     
-    # Query RAG for coping strategies
+    # Query RAG for coping strategies (prefetched at graph start when available)
     from app.rag.vector_store import query_knowledge
-    rag_query = f"emotional support coping strategies for {mood} mood during period stress level {stress}"
+    rag_query, k, filters = plan_queries(daily_log)["emotional"]
+    prefetched = (state.get("rag_results") or {}).get("emotional")
     
     try:
-        rag_results = query_knowledge(rag_query, k=2)
-        rag_context = "\n\n".join([doc["content"][:400] for doc in rag_results])
+        rag_results = prefetched if prefetched is not None else query_knowledge(rag_query, k=k, filters=filters)
+        rag_context = "\n\n".join([doc["content"][:EMOTIONAL_CONTEXT_CHARS] for doc in rag_results])
     except:
         rag_context = "No RAG context available"
     
@@ -1,6 +1,8 @@
 """
 LangGraph orchestration - defines the agent workflow graph.
 """
+from typing import Any, Optional
+
 from langgraph.graph import StateGraph, START, END
 
 from app.state import HerCycleState
@@ -15,10 +17,27 @@ from app.agents.coordinator_agent import coordinator_node
 from app.agents.safety_agent import safety_node
 
 
+class PlanRunState(HerCycleState, total=False):
+    """Application state plus data scoped to one graph run (never persisted)"""
+    rag_results: Optional[dict[str, list[dict[str, Any]]]]  # RAG context prefetched per agent at graph start
+
+
+def rag_prefetch_node(state: PlanRunState) -> dict:
+    """Retrieve the RAG context for the nutrition, emotional and knowledge agents in one batch"""
+    from app.rag.vector_store import prefetch_plan_knowledge
+    try:
+        return {"rag_results": prefetch_plan_knowledge(state.get("daily_log"))}
+    except Exception as e:
+        # Agents fall back to querying on their own
+        print(f"Warning: RAG prefetch failed: {e}")
+        return {"rag_results": {}}
+
+
 # Build the state graph
-graph_builder = StateGraph(HerCycleState)
+graph_builder = StateGraph(PlanRunState)
 
 # Add nodes
+graph_builder.add_node("rag_prefetch", rag_prefetch_node)
 graph_builder.add_node("cycle_pattern", cycle_pattern_node)
 graph_builder.add_node("symptom_insight", symptom_insight_node)
 graph_builder.add_node("nutrition", nutrition_node)
@@ -30,7 +49,8 @@ graph_builder.add_node("coordinator", coordinator_node)
 graph_builder.add_node("safety", safety_node)
 
 # Define sequential edges
-graph_builder.add_edge(START, "cycle_pattern")
+graph_builder.add_edge(START, "rag_prefetch")
+graph_builder.add_edge("rag_prefetch", "cycle_pattern")
 graph_builder.add_edge("cycle_pattern", "symptom_insight")
 graph_builder.add_edge("symptom_insight", "nutrition")
 graph_builder.add_edge("nutrition", "movement")
@@ -53,7 +73,8 @@ def run_full_plan(state: HerCycleState) -> HerCycleState:
         state: Current HerCycle state
         
     Returns:
-        Updated state after all agents have run
+        Updated state after all agents have run (without the run-scoped keys)
     """
     result = COMPILED_GRAPH.invoke(state)
+    result.pop("rag_results", None)
     return result
@@ -21,22 +21,16 @@ def knowledge_resource_node(state: HerCycleState) -> Dict[str, Any]:
     cycle_output = state["agent_outputs"].get("cycle_pattern")
     
     # Build query based on symptoms and phase
-    query_topics = []
-    if daily_log:
-        if daily_log.get("pain", 0) > 5:
-            query_topics.append("pain relief")
-        if daily_log.get("mood") == "bad":
-            query_topics.append("mood management")
+    from app.rag.query_templates import knowledge_topics, plan_queries, KNOWLEDGE_SNIPPET_CHARS
+    query_topics = knowledge_topics(daily_log)
     
-    if not query_topics:
-        query_topics = ["menstrual health general"]
-    
-    # Query RAG
+    # Query RAG (prefetched at graph start when available)
     from app.rag.vector_store import query_knowledge
-    rag_query = " ".join(query_topics)
+    rag_query, k, filters = plan_queries(daily_log)["knowledge_resources"]
+    prefetched = (state.get("rag_results") or {}).get("knowledge_resources")
     
     try:
-        rag_results = query_knowledge(rag_query, k=3)
+        rag_results = prefetched if prefetched is not None else query_knowledge(rag_query, k=k, filters=filters)
     except:
         rag_results = []
     
@@ -63,7 +57,7 @@ Rules:
 Cycle context: {cycle_output.get('summary_text') if cycle_output else 'N/A'}
 
 RAG Results:
-{json.dumps([{'topic': r['metadata'].get('topic'), 'source': r['metadata'].get('source'), 'snippet': r['content'][:200]} for r in rag_results], indent=2)}
+{json.dumps([{'topic': r['metadata'].get('topic'), 'source': r['metadata'].get('source'), 'snippet': r['content'][:KNOWLEDGE_SNIPPET_CHARS]} for r in rag_results], indent=2)}
 
 Available Resources:
 {json.dumps([{'url': r['url'], 'title': r['title'], 'topic': r['topic']} for r in scraped_metadata[:10]], indent=2)}
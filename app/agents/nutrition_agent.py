@@ -27,23 +27,15 @@ def nutrition_node(state: HerCycleState) -> Dict[str, Any]:
     with open(foods_path, 'r') as f:
         foods_db = json.load(f)
     
-    # Determine tags for RAG query
-    tags = []
-    if daily_log:
-        if daily_log.get("pain", 0) > 5:
-            tags.append("cramps")
-        if daily_log.get("energy", 5) < 3:
-            tags.append("low_energy")
-        if daily_log.get("stress", 3) > 3:
-            tags.append("stress")
-    
-    # Query RAG for nutrition knowledge
+    # Query RAG for nutrition knowledge (prefetched at graph start when available)
     from app.rag.vector_store import query_knowledge
-    rag_query = f"nutrition recommendations for {', '.join(tags)} during menstrual cycle"
+    from app.rag.query_templates import plan_queries, NUTRITION_CONTEXT_CHARS
+    rag_query, k, filters = plan_queries(daily_log)["nutrition"]
+    prefetched = (state.get("rag_results") or {}).get("nutrition")
     
     try:
-        rag_results = query_knowledge(rag_query, k=2)
-        rag_context = "\n\n".join([doc["content"][:500] for doc in rag_results])
+        rag_results = prefetched if prefetched is not None else query_knowledge(rag_query, k=k, filters=filters)
+        rag_context = "\n\n".join([doc["content"][:NUTRITION_CONTEXT_CHARS] for doc in rag_results])
     except:
         rag_context = "No RAG context available"
     
@@ -0,0 +1,94 @@
+"""
+Bounded LRU + TTL cache for results derived from a versioned source.
+Backs the RAG query_knowledge cache and the ML prediction and explanation
+caches; entries never outlive the version that produced them.
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class VersionedLRUCache:
+    """
+    Thread-safe LRU cache with per-entry TTL, scoped to one version of
+    whatever produced the values (an index snapshot, a model version).
+
+    The cache holds the version of its latest put. A lookup for any other
+    version is a plain miss, so requests still pinned to a previous version
+    never wipe the live entries; storing a result for a new version drops
+    the old entries, so results never outlive the version that produced them.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _set_version(self, version: Optional[str]) -> None:
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version: Optional[str], key: Hashable) -> Optional[Any]:
+        """Return the cached value for key under this version, or None"""
+        with self._lock:
+            entry = self._entries.get(key) if version == self._version else None
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, version: Optional[str], key: Hashable) -> Optional[Any]:
+        """Like get, but without touching recency or the hit/miss counters"""
+        with self._lock:
+            if version != self._version:
+                return None
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                return None
+            return entry[1]
+
+    def put(self, version: Optional[str], key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Callers only store results of the live version; a put for a version
+        other than the cached one clears the cache and adopts that version.
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._set_version(version)
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit-rate metrics for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "version": self._version
+            }
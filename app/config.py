@@ -14,6 +14,7 @@ BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 KNOWLEDGE_DIR = BASE_DIR / "app" / "knowledge"
 VECTOR_STORE_DIR = DATA_DIR / "vector_store"
+EMBEDDING_CACHE_DIR = DATA_DIR / "embedding_cache"
 
 # Gemini API Configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
@@ -30,8 +31,49 @@ RAG_CORPUS_PATH = str(KNOWLEDGE_DIR / "rag_corpus")
 SCRAPED_RESOURCES_PATH = str(KNOWLEDGE_DIR / "scraped_resources.json")
 RESOURCES_SEED_PATH = str(KNOWLEDGE_DIR / "resources_seed.json")
 
+# RAG settings
+EMBEDDING_CACHE_PATH = str(EMBEDDING_CACHE_DIR)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+CORPUS_LOADER_WORKERS = int(os.getenv("CORPUS_LOADER_WORKERS", "8"))  # threads reading corpus files
+RAG_CHUNKER = os.getenv("RAG_CHUNKER", "markdown")  # "markdown" (headings + token budget) or "recursive"
+RAG_CHUNK_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", "100"))  # markdown chunker budget, ~400 chars
+RAG_CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "1000"))  # recursive chunker: characters per chunk
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "200"))
+RAG_DEDUP_ENABLED = os.getenv("RAG_DEDUP_ENABLED", "true").lower() == "true"
+RAG_DEDUP_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.8"))  # MinHash Jaccard estimate
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "3"))
+RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "hybrid")  # "vector", "lexical" or "hybrid"
+RAG_SEARCH_BACKEND = os.getenv("RAG_SEARCH_BACKEND", "chroma")  # "chroma" or "numpy"
+RAG_VECTOR_DTYPE = os.getenv("RAG_VECTOR_DTYPE", "float32")  # numpy backend: "float32", "float16" or "int8"
+RAG_RESCORE_FACTOR = int(os.getenv("RAG_RESCORE_FACTOR", "4"))  # numpy backend: k * factor candidates rescored in float32
+RAG_ANN_THRESHOLD = int(os.getenv("RAG_ANN_THRESHOLD", "20000"))  # numpy backend: rows before IVF kicks in
+RAG_ANN_NPROBE = int(os.getenv("RAG_ANN_NPROBE", "8"))  # numpy backend: IVF lists scanned per query
+RAG_QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "512"))  # 0 disables the result cache
+RAG_QUERY_CACHE_TTL = float(os.getenv("RAG_QUERY_CACHE_TTL", "3600"))  # seconds
+RAG_PRECOMPUTE_AGENT_QUERIES = os.getenv("RAG_PRECOMPUTE_AGENT_QUERIES", "true").lower() == "true"
+RAG_WATCH_ENABLED = os.getenv("RAG_WATCH_ENABLED", "false").lower() == "true"  # hot-reload on corpus edits
+RAG_WATCH_INTERVAL = float(os.getenv("RAG_WATCH_INTERVAL", "5"))  # seconds between corpus polls
+
 # ML Model path
-ML_MODEL_PATH = str(BASE_DIR / "final_trained_cycle_model.pkl")
+ML_MODEL_PATH = str(BASE_DIR / "final_trained_cycle_model.pkl")  # served while the registry is empty
+ML_REGISTRY_DIR = os.getenv("ML_REGISTRY_DIR", str(BASE_DIR / "models"))  # versioned models from train_model.py
+ML_REGISTRY_POLL_INTERVAL = float(os.getenv("ML_REGISTRY_POLL_INTERVAL", "10"))  # seconds; 0 stops following other workers' swaps
+ML_FOREST_DIR = str(DATA_DIR / "compiled_forest")  # mmap-able forest exports, one per model version
+ML_TRAIN_CACHE_DIR = str(DATA_DIR / "train_cache")  # preprocessed training matrices (train_model.py --search)
+ML_MMAP_ENABLED = os.getenv("ML_MMAP_ENABLED", "true").lower() == "true"
+ML_PREDICTION_CACHE_SIZE = int(os.getenv("ML_PREDICTION_CACHE_SIZE", "4096"))  # 0 disables the result cache
+ML_PREDICTION_CACHE_QUANTIZE = os.getenv("ML_PREDICTION_CACHE_QUANTIZE", "false").lower() == "true"  # nearby inputs share a cached result
+ML_EXPLANATION_CACHE_SIZE = int(os.getenv("ML_EXPLANATION_CACHE_SIZE", "1024"))  # SHAP results kept per model
+ML_SHAP_APPROX_TREES = int(os.getenv("ML_SHAP_APPROX_TREES", "25"))  # trees explained in approximate mode
+ML_SHAP_WORKERS = int(os.getenv("ML_SHAP_WORKERS", "1"))  # threads computing deferred explanations
+
+# Per-user cycle length estimator (population priors; see app/cycle_estimator.py)
+CYCLE_PRIOR_MEAN = float(os.getenv("CYCLE_PRIOR_MEAN", "28"))  # days
+CYCLE_PRIOR_SD = float(os.getenv("CYCLE_PRIOR_SD", "3"))  # expected cycle-to-cycle variation, days
+CYCLE_PRIOR_WEIGHT = float(os.getenv("CYCLE_PRIOR_WEIGHT", "1"))  # logged cycles the prior mean is worth
+CYCLE_RF_SD = float(os.getenv("CYCLE_RF_SD", "3"))  # forest error (days) when the model has no test_mae
 
 # Ensure directories exist
 DATA_DIR.mkdir(exist_ok=True)
@@ -0,0 +1,156 @@
+"""
+Per-user online cycle length estimator.
+Keeps a Normal-Inverse-Gamma posterior over the user's cycle length (mean and
+variance), seeded from population priors and updated in O(1) from each logged
+cycle start, so predictions personalize without retraining the forest.
+The posterior is a handful of numbers stored in state["cycle_estimate"].
+"""
+import math
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from app.config import (
+    CYCLE_PRIOR_MEAN,
+    CYCLE_PRIOR_SD,
+    CYCLE_PRIOR_WEIGHT,
+    CYCLE_RF_SD
+)
+
+
+# Gaps between logged starts outside this range are treated as missed or
+# duplicate logs rather than cycles (same bounds train_model.py uses)
+MIN_CYCLE_DAYS = 15
+MAX_CYCLE_DAYS = 45
+# Shape of the prior on the cycle length variance; 3 keeps it proper (finite
+# mean and variance) while letting a few cycles dominate it
+PRIOR_SHAPE = 3.0
+
+
+class CycleLengthEstimator:
+    """
+    Conjugate Bayesian estimate of one user's cycle length.
+
+    Args:
+        mean: Posterior mean of the cycle length (days)
+        weight: Pseudo-cycles backing the mean (kappa)
+        shape: Inverse-Gamma shape of the variance (alpha)
+        scale: Inverse-Gamma scale of the variance (beta)
+        observations: Cycle lengths observed so far
+        last_start: ISO date of the latest logged cycle start
+    """
+
+    def __init__(
+        self,
+        mean: float = CYCLE_PRIOR_MEAN,
+        weight: float = CYCLE_PRIOR_WEIGHT,
+        shape: float = PRIOR_SHAPE,
+        scale: float = (PRIOR_SHAPE - 1) * CYCLE_PRIOR_SD ** 2,
+        observations: int = 0,
+        last_start: Optional[str] = None
+    ):
+        self.mean = mean
+        self.weight = weight
+        self.shape = shape
+        self.scale = scale
+        self.observations = observations
+        self.last_start = last_start
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CycleLengthEstimator":
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mean": self.mean,
+            "weight": self.weight,
+            "shape": self.shape,
+            "scale": self.scale,
+            "observations": self.observations,
+            "last_start": self.last_start
+        }
+
+    @classmethod
+    def from_cycles(cls, cycles: List[Dict[str, Any]]) -> "CycleLengthEstimator":
+        """Replay a cycle history (e.g. state saved before the estimator existed)"""
+        estimator = cls()
+        for start in sorted(cycle["start_date"] for cycle in cycles if cycle.get("start_date")):
+            estimator.log_start(start)
+        return estimator
+
+    def update(self, cycle_length: float) -> None:
+        """Fold one observed cycle length into the posterior"""
+        weight = self.weight + 1
+        self.scale += self.weight * (cycle_length - self.mean) ** 2 / (2 * weight)
+        self.mean += (cycle_length - self.mean) / weight
+        self.weight = weight
+        self.shape += 0.5
+        self.observations += 1
+
+    def log_start(self, start_date: str) -> Optional[int]:
+        """
+        Record a cycle start; the gap since the previous start is an observation.
+
+        Returns:
+            The observed cycle length, or None if the gap isn't a plausible
+            cycle (first log, out-of-order date, or outside MIN/MAX_CYCLE_DAYS)
+        """
+        start = date.fromisoformat(start_date)
+        previous = date.fromisoformat(self.last_start) if self.last_start else None
+        if previous is not None and start <= previous:
+            return None
+        self.last_start = start_date
+        if previous is None:
+            return None
+        cycle_length = (start - previous).days
+        if not MIN_CYCLE_DAYS <= cycle_length <= MAX_CYCLE_DAYS:
+            return None
+        self.update(cycle_length)
+        return cycle_length
+
+    @property
+    def variance(self) -> float:
+        """Predictive variance of the next cycle length (cycle noise plus uncertainty in the mean)"""
+        return self.scale / (self.shape - 1) * (1 + 1 / self.weight)
+
+    @property
+    def cycle_length(self) -> int:
+        """Expected cycle length in whole days"""
+        return int(round(self.mean))
+
+    def blend(self, rf_days: float, rf_sd: float = CYCLE_RF_SD) -> Dict[str, float]:
+        """
+        Precision-weighted combination with the forest's population prediction.
+
+        With few logged cycles the forest dominates; as the user's own history
+        narrows the posterior, the personal estimate takes over. Before any
+        cycle is observed the posterior is only the population prior, which
+        the forest already models, so the forest prediction is returned as is.
+
+        Returns:
+            {"days", "sd", "personal_weight"}
+        """
+        if self.observations == 0:
+            return {"days": rf_days, "sd": rf_sd, "personal_weight": 0.0}
+        personal_precision = 1 / self.variance
+        rf_precision = 1 / rf_sd ** 2
+        personal_weight = personal_precision / (personal_precision + rf_precision)
+        return {
+            "days": personal_weight * self.mean + (1 - personal_weight) * rf_days,
+            "sd": math.sqrt(1 / (personal_precision + rf_precision)),
+            "personal_weight": personal_weight
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "cycle_length_days": round(self.mean, 1),
+            "sd_days": round(math.sqrt(self.variance), 1),
+            "observed_cycles": self.observations
+        }
+
+
+def get_estimator(state: Dict[str, Any]) -> CycleLengthEstimator:
+    """The user's estimator, rebuilt from state["cycles"] if none is stored yet"""
+    stored = state.get("cycle_estimate")
+    if stored:
+        return CycleLengthEstimator.from_dict(stored)
+    return CycleLengthEstimator.from_cycles(state.get("cycles", []))
@@ -4,14 +4,49 @@ Main entry point for the backend API.
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
 from app.state import load_state_from_file, save_state_to_file
-from app.rag.vector_store import init_vector_store
-from app.config import RAG_CORPUS_PATH, SCRAPED_RESOURCES_PATH, VECTOR_STORE_PATH
+from app.readiness import run_in_background, readiness, get_status
+from app.config import (
+    RAG_CORPUS_PATH,
+    SCRAPED_RESOURCES_PATH,
+    VECTOR_STORE_PATH,
+    RAG_WATCH_ENABLED,
+    RAG_WATCH_INTERVAL
+)
 
 # Import routers
-from app.routers import profile_routes, cycle_routes, checkin_routes, plan_routes, support_routes
+from app.routers import profile_routes, cycle_routes, checkin_routes, plan_routes, support_routes, prediction_routes
+
+
+def _init_rag() -> None:
+    """Build the RAG index (imports chromadb/langchain lazily, off the startup path)"""
+    from app.rag.vector_store import get_snapshot, init_vector_store, reload_vector_store
+    init_vector_store(
+        corpus_dir=RAG_CORPUS_PATH,
+        scraped_json=SCRAPED_RESOURCES_PATH,
+        persist_dir=VECTOR_STORE_PATH
+    )
+    
+    # Hot reload: corpus edits are re-indexed incrementally and swapped in
+    # without interrupting queries in flight
+    if RAG_WATCH_ENABLED:
+        from app.rag.watcher import CorpusWatcher
+        CorpusWatcher(
+            RAG_CORPUS_PATH,
+            SCRAPED_RESOURCES_PATH,
+            on_change=reload_vector_store,
+            interval=RAG_WATCH_INTERVAL,
+            sources=get_snapshot().sources
+        ).start()
+
+
+def _load_ml_model() -> None:
+    """Load and warm up the cycle prediction model ahead of the first request"""
+    from app.ml_cycle_predictor import preload_model
+    preload_model()
 
 
 @asynccontextmanager
@@ -29,18 +64,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Warning: Could not load state: {e}")
     
-    # Initialize vector store
-    try:
-        init_vector_store(
-            corpus_dir=RAG_CORPUS_PATH,
-            scraped_json=SCRAPED_RESOURCES_PATH,
-            persist_dir=VECTOR_STORE_PATH
-        )
-        print("✓ Vector store initialized")
-    except Exception as e:
-        print(f"Warning: Vector store initialization failed: {e}")
+    # Build the vector store and load the ML model in the background so the
+    # server accepts requests right away; agents fall back to no RAG context
+    # (or lexical-only search) until retrieval is ready
+    run_in_background("vector_store", _init_rag)
+    run_in_background("ml_model", _load_ml_model, required=False)
     
-    print("✓ HerCycle backend ready!")
+    print("✓ HerCycle backend live (vector store and ML model loading in background)")
     
     yield
     
@@ -76,6 +106,7 @@ app.include_router(cycle_routes.router)
 app.include_router(checkin_routes.router)
 app.include_router(plan_routes.router)
 app.include_router(support_routes.router)
+app.include_router(prediction_routes.router)
 
 
 @app.get("/")
@@ -90,18 +121,41 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Detailed health check"""
+    """Detailed health check with separate liveness and readiness"""
     from app.config import GEMINI_API_KEY, GOOGLE_PLACES_API_KEY
     
-    return {
+    health = {
         "status": "healthy",
+        "liveness": "alive",
+        "readiness": readiness(),
         "services": {
             "gemini_api": "configured" if GEMINI_API_KEY else "not_configured",
             "places_api": "configured" if GOOGLE_PLACES_API_KEY else "not_configured",
-            "vector_store": "initialized",
+            "vector_store": get_status("vector_store"),
+            "ml_model": get_status("ml_model"),
             "state_persistence": "enabled"
         }
     }
+    if get_status("vector_store") == "ready":
+        from app.rag.vector_store import get_query_cache_stats
+        health["rag_query_cache"] = get_query_cache_stats()
+    if get_status("ml_model") == "ready":
+        from app.ml_cycle_predictor import get_prediction_cache_stats
+        health["ml_prediction_cache"] = get_prediction_cache_stats()
+    return health
+
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe - the process is up and serving requests"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe - 503 until all required components are ready"""
+    status = readiness()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+"""
+Throughput benchmark for the cycle prediction model.
+Times the per-row prediction path against the vectorized batch path on the
+same inputs, each stage of a single-row prediction, and the pickled sklearn
+forest against the array-backed one (latency by batch size, memory). Uses
+the active model, or a model fitted on synthetic rows with the training
+pipeline when --synthetic is given (no dataset needed).
+
+Run with: python -m app.ml_benchmark --rows 1000 --synthetic
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app import ml_cycle_predictor
+
+
+EXERCISE_LEVELS = ["Low", "Moderate", "High"]
+DIETS = ["Balanced", "Vegetarian", "Vegan", "Keto", "High Protein"]
+SYMPTOMS = ["None", "Cramps", "Headache", "Bloating", "Fatigue", "Mood Swings"]
+
+
+def synthetic_features(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Deterministic feature dicts in the run_cycle_prediction input format"""
+    rng = random.Random(seed)
+    return [
+        {
+            "Age": rng.randint(16, 45),
+            "BMI": round(rng.uniform(17.0, 35.0), 1),
+            "Stress Level": rng.randint(1, 5),
+            "Exercise Frequency": rng.choice(EXERCISE_LEVELS),
+            "Sleep Hours": round(rng.uniform(4.0, 10.0), 1),
+            "Diet": rng.choice(DIETS),
+            "Cycle Length": rng.randint(21, 35),
+            "Period Length": rng.randint(3, 7),
+            "Symptoms": rng.choice(SYMPTOMS)
+        }
+        for _ in range(n)
+    ]
+
+
+def train_synthetic_model(n_rows: int = 2000, n_estimators: int = 200, max_depth: int = 15, seed: int = 42):
+    """Fit the train_model.py pipeline on synthetic rows (same preprocessing and forest shape)"""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    X = pd.DataFrame(synthetic_features(n_rows, seed))
+    rng = np.random.default_rng(seed)
+    y = (
+        X["Cycle Length"]
+        + 0.6 * (X["Stress Level"] - 3)
+        - 0.3 * (X["Sleep Hours"] - 7)
+        + rng.normal(0, 1.5, n_rows)
+    )
+    model = Pipeline([
+        ("preprocess", ColumnTransformer([
+            ("cat", OneHotEncoder(handle_unknown="ignore", drop="first"), ml_cycle_predictor.CATEGORICAL_FEATURES),
+            ("num", StandardScaler(), ml_cycle_predictor.NUMERIC_FEATURES)
+        ], remainder="drop")),
+        ("rf", RandomForestRegressor(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            random_state=seed,
+            n_jobs=-1
+        ))
+    ])
+    return model.fit(X, y)
+
+
+def run_benchmark(n_rows: int = 1000, repeats: int = 3, seed: int = 0) -> dict:
+    """
+    Time per-row and batch prediction (prediction + SHAP) over the same rows.
+
+    Returns:
+        Dict of path -> {"seconds", "rows_per_second"}, plus "speedup"
+    """
+    features = synthetic_features(n_rows, seed)
+    ml_cycle_predictor.preload_model()
+
+    def best_of(fn):
+        times = []
+        for _ in range(repeats):
+            # Measure the computation, not the result caches
+            ml_cycle_predictor._predictions.clear()
+            ml_cycle_predictor._explanations.clear()
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    per_row = best_of(lambda: [ml_cycle_predictor.run_cycle_prediction(f) for f in features])
+    batch = best_of(lambda: ml_cycle_predictor.run_cycle_prediction_batch(features))
+    return {
+        "per_row": {"seconds": per_row, "rows_per_second": n_rows / per_row},
+        "batch": {"seconds": batch, "rows_per_second": n_rows / batch},
+        "speedup": per_row / batch
+    }
+
+
+def _mean_us(fn, repeats: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def run_latency_benchmark(repeats: int = 200, seed: int = 0) -> dict:
+    """
+    Time each stage of a single-row prediction, in microseconds.
+
+    Returns:
+        Dict of stage -> mean microseconds per call
+    """
+    model = ml_cycle_predictor._get_model()
+    features = synthetic_features(1, seed)
+    row = model.transform(features)
+    report = {
+        "dataframe_transform": _mean_us(lambda: model.preprocess.transform(pd.DataFrame(features)), repeats),
+        "predict": _mean_us(lambda: model.predict(row), repeats),
+        "shap": _mean_us(lambda: model.explainer.shap_values(row), max(1, repeats // 20))
+    }
+    if model.encoder is not None:
+        encoder = model.encoder
+        report["compiled_encode"] = _mean_us(lambda: encoder.transform_one(features[0]), repeats)
+    return report
+
+
+def run_forest_benchmark(batch_sizes=(1, 32, 1000), repeats: int = 20, seed: int = 0) -> dict:
+    """
+    Compare the pickled sklearn forest with the array-backed forest.
+
+    Returns:
+        {"memory": {"pickle_mb", "compiled_mb"}, "max_abs_diff": float,
+         "latency": {batch size: {"sklearn_us", "compiled_us"}}}
+    """
+    import pickle
+    from app.ml_forest import CompiledForest
+
+    model = ml_cycle_predictor._get_model()
+    rf = model.rf
+    forest = CompiledForest.from_sklearn(rf)
+    X = model.transform(synthetic_features(max(batch_sizes), seed))
+    report = {
+        "memory": {
+            "pickle_mb": len(pickle.dumps(rf)) / 2 ** 20,
+            "compiled_mb": forest.nbytes / 2 ** 20
+        },
+        "max_abs_diff": float(np.abs(forest.predict(X) - rf.predict(X)).max()),
+        "latency": {}
+    }
+    for size in batch_sizes:
+        batch = X[:size]
+        n = max(1, repeats * 32 // size)
+        report["latency"][size] = {
+            "sklearn_us": _mean_us(lambda: rf.predict(batch), n),
+            "compiled_us": _mean_us(lambda: forest.predict(batch), n)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cycle prediction throughput")
+    parser.add_argument("--rows", type=int, default=1000, help="Feature rows per run")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per path (best is reported)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Benchmark a model fitted on synthetic rows instead of the active model")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        import tempfile
+        import joblib
+        # Keep the synthetic model, its registry and its forest export out of
+        # the real data directories
+        paths = ("ML_MODEL_PATH", "ML_REGISTRY_DIR", "ML_FOREST_DIR")
+        saved = {name: getattr(ml_cycle_predictor, name) for name in paths}
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                ml_cycle_predictor.ML_MODEL_PATH = f"{tmp}/synthetic_model.pkl"
+                ml_cycle_predictor.ML_REGISTRY_DIR = f"{tmp}/registry"
+                ml_cycle_predictor.ML_FOREST_DIR = f"{tmp}/compiled_forest"
+                joblib.dump(train_synthetic_model(), ml_cycle_predictor.ML_MODEL_PATH)
+                report = run_benchmark(args.rows, args.repeats, args.seed)
+                latency = run_latency_benchmark(seed=args.seed)
+                forest = run_forest_benchmark(seed=args.seed)
+            finally:
+                for name, value in saved.items():
+                    setattr(ml_cycle_predictor, name, value)
+                ml_cycle_predictor._active = None
+    else:
+        report = run_benchmark(args.rows, args.repeats, args.seed)
+        latency = run_latency_benchmark(seed=args.seed)
+        forest = run_forest_benchmark(seed=args.seed)
+    print(f"\n{'path':<10}{'seconds':>10}{'rows/s':>12}")
+    for path in ("per_row", "batch"):
+        row = report[path]
+        print(f"{path:<10}{row['seconds']:>10.3f}{row['rows_per_second']:>12.1f}")
+    print(f"\nBatch speedup: {report['speedup']:.1f}x")
+
+    print(f"\n{'single-row stage':<22}{'us':>12}")
+    for stage, us in latency.items():
+        print(f"{stage:<22}{us:>12.1f}")
+
+    print(f"\n{'forest rows':<14}{'sklearn us':>14}{'compiled us':>14}")
+    for size, row in forest["latency"].items():
+        print(f"{size:<14}{row['sklearn_us']:>14.1f}{row['compiled_us']:>14.1f}")
+    memory = forest["memory"]
+    print(f"Memory: pickle {memory['pickle_mb']:.1f} MB, compiled {memory['compiled_mb']:.1f} MB; "
+          f"max |difference| {forest['max_abs_diff']:.2e}")
+
+
+if __name__ == "__main__":
+    main()
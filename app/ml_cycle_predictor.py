@@ -1,42 +1,561 @@
 """
 ML Cycle Predictor - Wraps the trained Random Forest + SHAP model.
 Predicts next cycle start and provides feature importance explanations.
+
+SHAP is by far the most expensive step, so explanations are optional: they
+can be computed inline (exact or approximate), deferred to a worker thread
+and fetched later by id, or skipped. Computed explanations are cached by the
+exact encoded feature vector.
+
+The model comes from the local registry (app/model_registry.py), falling
+back to ML_MODEL_PATH while it is empty. A new version is loaded and warmed
+up next to the active one and swapped in with a single assignment, so
+deploys and rollbacks need no restart.
 """
+import copy
+import hashlib
+import threading
+import time
 import joblib
 import pandas as pd
 import numpy as np
 import shap
-from typing import Dict, Any, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 
-from app.config import ML_MODEL_PATH
+from app.config import (
+    ML_MODEL_PATH,
+    ML_FOREST_DIR,
+    ML_MMAP_ENABLED,
+    ML_PREDICTION_CACHE_SIZE,
+    ML_PREDICTION_CACHE_QUANTIZE,
+    ML_EXPLANATION_CACHE_SIZE,
+    ML_SHAP_APPROX_TREES,
+    ML_SHAP_WORKERS,
+    ML_REGISTRY_DIR,
+    ML_REGISTRY_POLL_INTERVAL
+)
+from app.model_registry import ModelRegistry
+from app.cache import VersionedLRUCache
+from app.readiness import run_in_background
+
+
+CATEGORICAL_FEATURES = ["Exercise Frequency", "Diet", "Symptoms"]
+NUMERIC_FEATURES = ["Age", "BMI", "Stress Level", "Sleep Hours", "Cycle Length", "Period Length"]
+TOP_CONTRIBUTIONS = 10
+# "full": exact SHAP inline, "approximate": SHAP over a subset of trees inline,
+# "deferred": exact SHAP in a worker (fetch with get_explanation), "none": skip
+EXPLAIN_MODES = ("full", "approximate", "deferred", "none")
+# Larger batches go to sklearn's multithreaded predict, which wins once the
+# per-call overhead is amortized
+COMPILED_FOREST_MAX_ROWS = 256
+# Numeric inputs are snapped to these steps before prediction, so profile
+# values and coarse check-in buckets map onto a small set of cache keys
+QUANTIZATION_STEPS = {
+    "Age": 1,
+    "BMI": 0.1,
+    "Stress Level": 1,
+    "Sleep Hours": 0.5,
+    "Cycle Length": 1,
+    "Period Length": 1
+}
+# Representative input used to warm every inference path at startup
+WARMUP_FEATURES = {
+    "Age": 25,
+    "BMI": 22.5,
+    "Stress Level": 3,
+    "Exercise Frequency": "Moderate",
+    "Sleep Hours": 7.0,
+    "Diet": "Balanced",
+    "Cycle Length": 28,
+    "Period Length": 5,
+    "Symptoms": "Cramps"
+}
+
+# The active model; replaced as a whole on hot swap, so a request that
+# captured it keeps a consistent set of components until it finishes
+_active: Optional["LoadedModel"] = None
+_load_lock = threading.Lock()
+# Serializes swaps (activate, rollback, following the registry)
+_swap_lock = threading.Lock()
+_next_registry_check = 0.0
+
+# Results by quantized features and explain mode, scoped to the model version
+_predictions = VersionedLRUCache(max_entries=ML_PREDICTION_CACHE_SIZE, ttl_seconds=float("inf"))
+# SHAP values by explanation id, scoped to the model version
+_explanations = VersionedLRUCache(max_entries=ML_EXPLANATION_CACHE_SIZE, ttl_seconds=float("inf"))
+# Errors of deferred explanations that failed, same scoping (retried on the next request)
+_failures = VersionedLRUCache(max_entries=ML_EXPLANATION_CACHE_SIZE, ttl_seconds=float("inf"))
+_pending: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+_shap_pool = None
+
+
+def _transformed_feature_names(preprocess) -> np.ndarray:
+    """Names of the preprocessed columns, in ColumnTransformer output order"""
+    names = []
+    for name, transformer, columns in preprocess.transformers_:
+        if name == "cat":
+            names.extend(transformer.get_feature_names_out(columns))
+        elif name == "num":
+            names.extend(columns)
+    return np.array(names)
 
 
-# Cached model components
-_model = None
-_preprocess = None
-_rf = None
-_explainer = None
+def _forest_key(model_version: str) -> str:
+    return hashlib.sha256(model_version.encode("utf-8")).hexdigest()[:16]
 
 
-def _load_model():
-    """Load the trained model (cached)"""
-    global _model, _preprocess, _rf, _explainer
+def _load_forest(rf, model_version: str):
+    """
+    Array-backed forest for rf. With ML_MMAP_ENABLED it is exported once per
+    model version and memory-mapped, so every worker process serves
+    predictions from the same shared read-only pages.
+    """
+    from app.ml_forest import CompiledForest
+    
+    if not ML_MMAP_ENABLED:
+        return CompiledForest.from_sklearn(rf)
+    forest_dir = Path(ML_FOREST_DIR) / _forest_key(model_version)
+    if not (forest_dir / "meta.json").exists():
+        CompiledForest.from_sklearn(rf).save(str(forest_dir))
+    return CompiledForest.load(str(forest_dir), mmap_mode="r")
+
+
+def _prune_forests(keep: List[str]) -> None:
+    """Delete forest exports of versions no longer in the registry (other than the given ones)"""
+    import re
+    import shutil
     
-    if _model is None:
-        model_path = Path(ML_MODEL_PATH)
-        if not model_path.exists():
-            raise FileNotFoundError(f"ML model not found at {ML_MODEL_PATH}")
+    forest_root = Path(ML_FOREST_DIR)
+    if not forest_root.is_dir():
+        return
+    keys = {_forest_key(meta["version"]) for meta in _registry().versions()}
+    keys.update(_forest_key(version) for version in keep)
+    for forest_dir in forest_root.iterdir():
+        if re.fullmatch(r"[0-9a-f]{16}", forest_dir.name) and forest_dir.name not in keys:
+            # Workers that still map it keep their pages until they swap
+            shutil.rmtree(forest_dir, ignore_errors=True)
+
+
+class LoadedModel:
+    """
+    One model version with everything derived from it (explainers, encoder,
+    compiled forest).
+    
+    Args:
+        model: Fitted Pipeline with "preprocess" and "rf" steps
+        version: Registry version id (or a file stamp for ML_MODEL_PATH)
+        metadata: Registry metadata (metrics, params); empty outside the registry
+    """
+    
+    def __init__(self, model, version: str, metadata: Optional[Dict[str, Any]] = None):
+        self.model = model
+        self.version = version
+        self.metadata = metadata or {}
+        self.preprocess = model.named_steps["preprocess"]
+        self.rf = model.named_steps["rf"]
+        self.explainer = shap.TreeExplainer(self.rf)
+        self.feature_names = _transformed_feature_names(self.preprocess)
+        self._approx_explainer = None
+        
+        # Precompile dict -> row encoding; fall back to the DataFrame path
+        # for preprocessing steps the encoder can't reproduce
+        from app.ml_encoder import FeatureEncoder
+        try:
+            self.encoder = FeatureEncoder.from_preprocess(self.preprocess)
+        except ValueError as e:
+            print(f"Warning: Using DataFrame preprocessing for predictions: {e}")
+            self.encoder = None
+        
+        try:
+            self.forest = _load_forest(self.rf, version)
+        except ValueError as e:
+            print(f"Warning: Using sklearn forest for predictions: {e}")
+            self.forest = None
+    
+    def transform(self, features_list: List[Dict[str, Any]]) -> np.ndarray:
+        """Preprocess feature dicts into the forest's input matrix"""
+        if self.encoder is not None:
+            if len(features_list) == 1:
+                return self.encoder.transform_one(features_list[0])
+            return self.encoder.transform(features_list)
+        transformed = self.preprocess.transform(pd.DataFrame(features_list))
+        if hasattr(transformed, "toarray"):
+            transformed = transformed.toarray()
+        return transformed
+    
+    def predict(self, transformed: np.ndarray) -> np.ndarray:
+        """
+        Forest prediction on an already-preprocessed matrix.
         
-        _model = joblib.load(str(model_path))
-        _preprocess = _model.named_steps["preprocess"]
-        _rf = _model.named_steps["rf"]
-        _explainer = shap.TreeExplainer(_rf)
+        Small batches (the per-request case) use the array-backed forest:
+        RandomForestRegressor.predict spends most of its time on input
+        validation and per-tree thread dispatch rather than on the trees.
+        """
+        if self.forest is not None and len(transformed) <= COMPILED_FOREST_MAX_ROWS:
+            return self.forest.predict(transformed)
+        return self.rf.predict(transformed)
+    
+    @property
+    def approx_explainer(self):
+        """
+        TreeExplainer over the first ML_SHAP_APPROX_TREES trees.
+        
+        SHAP values are additive over trees, so the sub-forest's values estimate
+        the full forest's at a fraction of the cost; good enough to rank the
+        top contributors.
+        """
+        if self._approx_explainer is None:
+            n_trees = min(ML_SHAP_APPROX_TREES, len(self.rf.estimators_))
+            sub_forest = copy.copy(self.rf)
+            sub_forest.estimators_ = self.rf.estimators_[:n_trees]
+            sub_forest.n_estimators = n_trees
+            self._approx_explainer = shap.TreeExplainer(sub_forest)
+        return self._approx_explainer
+    
+    def warm(self) -> None:
+        """Exercise every inference path once, without touching the result caches"""
+        row = self.transform([WARMUP_FEATURES])
+        self.predict(row)
+        self.explainer.shap_values(row, check_additivity=False)
+        self.approx_explainer.shap_values(row, check_additivity=False)
+
+
+def _registry() -> ModelRegistry:
+    return ModelRegistry(ML_REGISTRY_DIR)
+
+
+def _load_version(model_path: Path, version: str, metadata: Optional[Dict[str, Any]] = None) -> LoadedModel:
+    # Plain NumPy arrays in the pickle stay memory-mapped; sklearn copies
+    # tree nodes into its own buffers, hence the mmap-ed forest export
+    model = joblib.load(str(model_path), mmap_mode="r" if ML_MMAP_ENABLED else None)
+    return LoadedModel(model, version, metadata)
+
+
+def _load_initial() -> LoadedModel:
+    """The registry's active version, or ML_MODEL_PATH while the registry is empty"""
+    registry = _registry()
+    version = registry.current()
+    if version is not None:
+        return _load_version(registry.model_path(version), version, registry.metadata(version))
+    model_path = Path(ML_MODEL_PATH)
+    if not model_path.exists():
+        raise FileNotFoundError(f"ML model not found at {ML_MODEL_PATH}")
+    stat = model_path.stat()
+    return _load_version(model_path, f"{model_path.name}:{stat.st_mtime_ns}:{stat.st_size}")
+
+
+def _get_model() -> LoadedModel:
+    """The active model (loaded on first use; safe to call from several threads)"""
+    global _active
+    
+    model = _active
+    if model is None:
+        with _load_lock:
+            if _active is None:
+                _active = _load_initial()
+            model = _active
+    else:
+        _follow_registry(model)
+    return model
+
+
+def _follow_registry(model: LoadedModel) -> None:
+    """
+    Pick up a version activated through another worker process.
+    
+    Checks the registry at most every ML_REGISTRY_POLL_INTERVAL seconds and
+    swaps in the background, so requests keep using the current model.
+    """
+    global _next_registry_check
+    
+    now = time.monotonic()
+    if ML_REGISTRY_POLL_INTERVAL <= 0 or now < _next_registry_check:
+        return
+    _next_registry_check = now + ML_REGISTRY_POLL_INTERVAL
+    current = _registry().current()
+    if current is not None and current != model.version and not _swap_lock.locked():
+        run_in_background("ml_model_swap", lambda: activate_model(current), required=False)
+
+
+def activate_model(version: str) -> str:
+    """
+    Load a registered version, warm it up and swap it in.
+    
+    Requests in flight finish on the model they started with; the next ones
+    use the new version. The registry records the activation, so other
+    workers follow and rollback_model can return to the previous version.
+    
+    Raises:
+        KeyError: If the version isn't registered
     
-    return _model, _preprocess, _rf, _explainer
+    Returns:
+        The now active version
+    """
+    global _active
+    
+    registry = _registry()
+    with _swap_lock:
+        candidate = _load_version(registry.model_path(version), version, registry.metadata(version))
+        candidate.warm()
+        if registry.current() != version:
+            registry.activate(version)
+        _active = candidate
+        # Computations still running for the old model are no longer tracked
+        with _pending_lock:
+            _pending.clear()
+        try:
+            _prune_forests([version])
+        except Exception as e:
+            print(f"Warning: Could not prune stale forest exports: {e}")
+    print(f"✓ Cycle prediction model {version} active")
+    return version
+
+
+def rollback_model() -> str:
+    """
+    Swap back to the previously active registry version (loaded and warmed first).
+    
+    Raises:
+        ValueError: If there is no previous version
+    
+    Returns:
+        The now active version
+    """
+    global _active
+    
+    registry = _registry()
+    with _swap_lock:
+        version = registry.previous()
+        if version is None:
+            raise ValueError("No previous model version to roll back to")
+        candidate = _load_version(registry.model_path(version), version, registry.metadata(version))
+        candidate.warm()
+        registry.rollback()
+        _active = candidate
+        # Computations still running for the old model are no longer tracked
+        with _pending_lock:
+            _pending.clear()
+        try:
+            _prune_forests([version])
+        except Exception as e:
+            print(f"Warning: Could not prune stale forest exports: {e}")
+    print(f"✓ Cycle prediction model rolled back to {version}")
+    return version
+
+
+def get_model_info() -> Dict[str, Any]:
+    """The active model's version and metadata plus every registered version"""
+    registry = _registry()
+    model = _active
+    return {
+        "active_version": model.version if model is not None else None,
+        "active_metadata": model.metadata if model is not None else None,
+        "registry_current": registry.current(),
+        "rollback_version": registry.previous(),
+        "versions": registry.versions()
+    }
+
+
+def get_active_metadata() -> Dict[str, Any]:
+    """Registry metadata (metrics, params) of the active model; empty if none"""
+    model = _active
+    return model.metadata if model is not None else {}
 
 
-def run_cycle_prediction(features: Dict[str, Any]) -> Dict[str, Any]:
+def preload_model() -> None:
+    """
+    Load the model ahead of the first prediction (called at startup) and
+    warm it up, so no user request pays for loading or a cold inference path.
+    """
+    _get_model()
+    warmup()
+
+
+def warmup() -> None:
+    """Run a dummy prediction through every path (encoder, forest, exact and approximate SHAP)"""
+    run_cycle_prediction(WARMUP_FEATURES, explain="full")
+    run_cycle_prediction(WARMUP_FEATURES, explain="approximate")
+
+
+def quantize_features(features: Dict[str, Any]) -> tuple:
+    """
+    Canonical, quantized form of a feature dict (the prediction cache key).
+    
+    Numeric features are rounded to QUANTIZATION_STEPS, categoricals kept as
+    strings, in NUMERIC_FEATURES + CATEGORICAL_FEATURES order.
+    """
+    numeric = tuple(
+        round(round(float(features[name]) / QUANTIZATION_STEPS[name]) * QUANTIZATION_STEPS[name], 6)
+        for name in NUMERIC_FEATURES
+    )
+    return numeric + tuple(str(features[name]) for name in CATEGORICAL_FEATURES)
+
+
+def _cache_key(features: Dict[str, Any]) -> tuple:
+    """Prediction cache key: exact inputs, or quantized with ML_PREDICTION_CACHE_QUANTIZE"""
+    if ML_PREDICTION_CACHE_QUANTIZE:
+        return quantize_features(features)
+    return tuple(float(features[name]) for name in NUMERIC_FEATURES) + tuple(
+        str(features[name]) for name in CATEGORICAL_FEATURES
+    )
+
+
+def get_prediction_cache_stats() -> Dict[str, Any]:
+    """Hit-rate metrics for the prediction and explanation caches"""
+    return {
+        "model_version": _active.version if _active is not None else None,
+        "predictions": _predictions.stats(),
+        "explanations": _explanations.stats()
+    }
+
+
+def _explanation_id(row: np.ndarray, approximate: bool) -> str:
+    """Id of the explanation for one encoded feature vector"""
+    digest = hashlib.sha256(np.ascontiguousarray(row, dtype=np.float64).tobytes())
+    digest.update(b"approximate" if approximate else b"exact")
+    return digest.hexdigest()[:32]
+
+
+def _explain(model: LoadedModel, transformed: np.ndarray, approximate: bool = False) -> List[np.ndarray]:
+    """SHAP values per row, from the cache where possible and in one call for the rest"""
+    ids = [_explanation_id(row, approximate) for row in transformed]
+    values = [_explanations.get(model.version, explanation_id) for explanation_id in ids]
+    missing = [i for i, found in enumerate(values) if found is None]
+    if missing:
+        explainer = model.approx_explainer if approximate else model.explainer
+        computed = explainer.shap_values(transformed[missing], check_additivity=False)
+        for i, row_values in zip(missing, computed):
+            # A request that outlived a swap must not reset the caches to its version
+            if model is _active:
+                _explanations.put(model.version, ids[i], row_values)
+            values[i] = row_values
+    return values
+
+
+def _compute_deferred(explanation_id: str, row: np.ndarray, model: LoadedModel) -> np.ndarray:
+    try:
+        values = model.explainer.shap_values(row[None, :], check_additivity=False)[0]
+    except Exception as e:
+        print(f"Error computing deferred explanation {explanation_id}: {e}")
+        if model is _active:
+            _failures.put(model.version, explanation_id, str(e))
+        raise
+    if model is _active:
+        _explanations.put(model.version, explanation_id, values)
+    return values
+
+
+def _forget(explanation_id: str, future: Future) -> None:
+    """Drop a finished computation (unless a swap already replaced it with a newer one)"""
+    with _pending_lock:
+        if _pending.get(explanation_id) is future:
+            del _pending[explanation_id]
+
+
+def _defer(model: LoadedModel, transformed: np.ndarray) -> List[str]:
+    """Queue exact SHAP for each row in the worker pool and return the explanation ids"""
+    global _shap_pool
+    ids = []
+    for row in transformed:
+        explanation_id = _explanation_id(row, approximate=False)
+        ids.append(explanation_id)
+        with _pending_lock:
+            # A failed computation is no longer pending, so the next request retries it
+            if explanation_id in _pending or _explanations.peek(model.version, explanation_id) is not None:
+                continue
+            if _shap_pool is None:
+                _shap_pool = ThreadPoolExecutor(max_workers=ML_SHAP_WORKERS, thread_name_prefix="shap")
+            future = _shap_pool.submit(_compute_deferred, explanation_id, row.copy(), model)
+            _pending[explanation_id] = future
+        future.add_done_callback(lambda done, explanation_id=explanation_id: _forget(explanation_id, done))
+    return ids
+
+
+def _contributions(
+    feature_names: np.ndarray,
+    shap_values: np.ndarray,
+    top_k: int,
+    include_raw: bool = True
+) -> Dict[str, Any]:
+    """Ranked (and optionally raw) SHAP contributions for one row"""
+    # Rank by absolute contribution (stable, so ties keep column order)
+    ranked = np.argsort(-np.abs(shap_values), kind="stable")[:top_k]
+    explanation = {
+        "feature_contributions_ranked": [
+            {
+                "feature": str(feature_names[i]),
+                "direction": "increase" if shap_values[i] > 0 else "decrease",
+                "impact_days": float(abs(shap_values[i]))
+            }
+            for i in ranked
+        ]
+    }
+    if include_raw:
+        explanation["raw_shap_values"] = {
+            str(feat): float(val)
+            for feat, val in zip(feature_names, shap_values)
+        }
+    return explanation
+
+
+def get_explanation(explanation_id: str, top_k: int = TOP_CONTRIBUTIONS) -> Optional[Dict[str, Any]]:
+    """
+    Fetch a deferred explanation.
+    
+    Returns:
+        {"status": "ready", "model_version", "feature_contributions_ranked", "raw_shap_values"},
+        {"status": "pending"}, {"status": "failed", "error"}, or None if the
+        id is unknown (never requested, evicted, or from a replaced model)
+    """
+    model = _active
+    values = _explanations.peek(model.version, explanation_id) if model is not None else None
+    if values is not None:
+        return {
+            "status": "ready",
+            "model_version": model.version,
+            **_contributions(model.feature_names, values, top_k)
+        }
+    with _pending_lock:
+        future = _pending.get(explanation_id)
+    if future is not None and not future.done():
+        return {"status": "pending"}
+    error = _failures.peek(model.version, explanation_id) if model is not None else None
+    if error is not None:
+        return {"status": "failed", "error": error}
+    return None
+
+
+def _run_rows(model: LoadedModel, transformed: np.ndarray, explain: str, top_k: int) -> List[Dict[str, Any]]:
+    """Predict (and explain, per the mode) every row of a preprocessed matrix"""
+    pred_days = model.predict(transformed)
+    results = [
+        {"prediction_days_until_next_cycle": float(pred), "model_version": model.version}
+        for pred in pred_days
+    ]
+    
+    if explain in ("full", "approximate"):
+        approximate = explain == "approximate"
+        for result, values in zip(results, _explain(model, transformed, approximate)):
+            result.update(_contributions(model.feature_names, values, top_k, include_raw=not approximate))
+            if approximate:
+                result["explanation_approximate"] = True
+    elif explain == "deferred":
+        for result, explanation_id in zip(results, _defer(model, transformed)):
+            result["explanation_id"] = explanation_id
+            result["explanation_status"] = (
+                "ready" if _explanations.peek(model.version, explanation_id) is not None else "pending"
+            )
+    return results
+
+
+def run_cycle_prediction(
+    features: Dict[str, Any],
+    explain: str = "full",
+    top_k: int = TOP_CONTRIBUTIONS
+) -> Dict[str, Any]:
     """
     Run cycle prediction using the trained ML model.
     
@@ -51,60 +570,79 @@ def run_cycle_prediction(features: Dict[str, Any]) -> Dict[str, Any]:
             - Cycle Length: int
             - Period Length: int
             - Symptoms: str ("None", "Cramps", "Headache", etc.)
+        explain: One of EXPLAIN_MODES
+        top_k: Contributors listed in feature_contributions_ranked
     
     Returns:
         Dictionary containing:
             - prediction_days_until_next_cycle: float
+            - model_version: str, the model version that produced the result
             - feature_contributions_ranked: list of dicts with feature, direction, impact_days
-            - raw_shap_values: dict of feature_name: float
+              ("full" and "approximate" only)
+            - raw_shap_values: dict of feature_name: float ("full" only)
+            - explanation_approximate: True ("approximate" only)
+            - explanation_id, explanation_status: ("deferred" only) fetch the
+              explanation with get_explanation once the status is "ready"
+    """
+    return run_cycle_prediction_batch([features], explain=explain, top_k=top_k)[0]
+
+
+def run_cycle_prediction_batch(
+    features_list: List[Dict[str, Any]],
+    explain: str = "full",
+    top_k: int = TOP_CONTRIBUTIONS
+) -> List[Dict[str, Any]]:
+    """
+    Run cycle prediction for many feature dicts at once (e.g. nightly refreshes).
+    
+    Preprocesses once, then predicts and computes SHAP values for the whole
+    matrix in single vectorized calls instead of one model round trip per row.
+    
+    Predictions are always computed on the inputs as given and cached per
+    input, so a repeat prediction is a dictionary lookup. With
+    ML_PREDICTION_CACHE_QUANTIZE the cache key is the quantized input (see
+    QUANTIZATION_STEPS) instead, so nearby inputs are served the result of
+    the first one seen. Deferred results are not cached since their status
+    changes; their explanations are.
+    
+    Args:
+        features_list: Feature dicts as accepted by run_cycle_prediction
+        explain: One of EXPLAIN_MODES
+        top_k: Contributors listed in feature_contributions_ranked
+    
+    Returns:
+        One result per input, in order, with the run_cycle_prediction schema
     """
+    if explain not in EXPLAIN_MODES:
+        raise ValueError(f"Unknown explain mode '{explain}', expected one of {EXPLAIN_MODES}")
+    if not features_list:
+        return []
     try:
-        model, preprocess, rf, explainer = _load_model()
-        
-        # Create DataFrame from features
-        sample_input = pd.DataFrame([features])
-        
-        # Make prediction
-        pred_days = model.predict(sample_input)[0]
+        # Captured once: a hot swap mid-batch doesn't mix model versions
+        model = _get_model()
+        version = model.version
         
-        # Transform input for SHAP
-        transformed_row = preprocess.transform(sample_input)
-        
-        # Calculate SHAP values
-        shap_values = explainer.shap_values(transformed_row)[0]
-        
-        # Build feature names
-        cat_cols = ["Exercise Frequency", "Diet", "Symptoms"]
-        num_cols = ["Age", "BMI", "Stress Level", "Sleep Hours", "Cycle Length", "Period Length"]
-        
-        ohe_feature_names = preprocess.named_transformers_["cat"].get_feature_names_out(cat_cols)
-        full_feature_names = np.concatenate([num_cols, ohe_feature_names])
-        
-        # Sort by importance
-        importance = sorted(
-            zip(full_feature_names, shap_values),
-            key=lambda x: abs(x[1]),
-            reverse=True
-        )
-        
-        # Build result
-        result = {
-            "prediction_days_until_next_cycle": float(pred_days),
-            "feature_contributions_ranked": [
-                {
-                    "feature": feat,
-                    "direction": "increase" if val > 0 else "decrease",
-                    "impact_days": float(abs(val))
-                }
-                for feat, val in importance[:10]  # Top 10 features
-            ],
-            "raw_shap_values": {
-                feat: float(val) 
-                for feat, val in zip(full_feature_names, shap_values)
-            }
-        }
+        keys = [(_cache_key(features), explain, top_k) for features in features_list]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(keys)
+        misses: Dict[tuple, List[int]] = {}
+        for i, key in enumerate(keys):
+            cached = _predictions.get(version, key) if explain != "deferred" else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.setdefault(key, []).append(i)
         
-        return result
+        if misses:
+            # Transform once and reuse the matrix for both prediction and SHAP
+            transformed = model.transform([features_list[indices[0]] for indices in misses.values()])
+            computed = _run_rows(model, transformed, explain, top_k)
+            for (key, indices), result in zip(misses.items(), computed):
+                if explain != "deferred" and model is _active:
+                    _predictions.put(version, key, result)
+                for i in indices:
+                    results[i] = result
+        # Cached dicts are shared, so hand out copies
+        return [copy.deepcopy(result) for result in results]
         
     except Exception as e:
         print(f"Error in cycle prediction: {e}")
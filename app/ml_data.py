@@ -0,0 +1,193 @@
+"""
+Training data loading for the cycle prediction model.
+Reads the cycle CSV in chunks with explicit compact dtypes (categoricals,
+int8/float32) into preallocated columns and parses the dates once, then
+keeps a columnar copy keyed by the source file's hash, so later runs on the
+same file skip CSV parsing entirely. The copy is Parquet when pyarrow is
+installed and a pandas pickle otherwise (same dtypes, larger file).
+
+Every load reports its time, peak memory and the frame's in-memory size.
+"""
+import hashlib
+import os
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import ML_TRAIN_CACHE_DIR
+
+
+DATE_COLUMNS = ["Cycle Start Date", "Next Cycle Start Date"]
+# Nullable integer types while reading; columns without missing values are
+# narrowed to plain NumPy ints afterwards and the rest to float32
+COLUMN_DTYPES = {
+    "Age": "Int8",
+    "BMI": "float32",
+    "Stress Level": "Int8",
+    "Exercise Frequency": "category",
+    "Sleep Hours": "float32",
+    "Diet": "category",
+    "Cycle Length": "Int16",
+    "Period Length": "Int8",
+    "Symptoms": "category"
+}
+CHUNK_ROWS = 250_000
+# Bump when the parsing above changes, so stale cached copies are ignored
+CACHE_SCHEMA_VERSION = 1
+
+
+def source_hash(path: str) -> str:
+    """SHA-256 of the file's content (streamed)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_format() -> str:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "pickle"
+    return "parquet"
+
+
+def _scan(path: str, columns: List[str], chunk_rows: int) -> Tuple[int, Dict[str, list]]:
+    """Row count and sorted category set of each categorical column, from a parse of those columns only"""
+    categorical = [column for column in columns if COLUMN_DTYPES.get(column) == "category"]
+    rows = 0
+    seen: Dict[str, set] = {column: set() for column in categorical}
+    for chunk in pd.read_csv(path, usecols=categorical or columns[:1], dtype="category", chunksize=chunk_rows):
+        rows += len(chunk)
+        for column in categorical:
+            seen[column].update(chunk[column].cat.categories)
+    return rows, {column: sorted(values) for column, values in seen.items()}
+
+
+def _finish(values: np.ndarray, missing: Optional[np.ndarray], categories: Optional[list]):
+    """Filled buffer -> final column: categoricals from their codes, ints as float32 NaN only if needed"""
+    if categories is not None:
+        return pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(categories))
+    if missing is not None and missing.any():
+        values = values.astype("float32")
+        values[missing] = np.nan
+    return values
+
+
+def read_csv_chunked(path: str, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Parse the CSV chunk by chunk with COLUMN_DTYPES, keeping only the model's columns.
+
+    A first pass over the categorical columns fixes the row count and the
+    category sets, so every output column is allocated once at its final
+    dtype and each chunk is copied straight into it. Peak memory is the
+    final frame plus one chunk. Nullable integer columns end up as NumPy ints
+    (no missing values) or float32 (sklearn-friendly NaN). Dates are parsed
+    strictly: a malformed date raises instead of becoming NaT.
+    """
+    wanted = list(COLUMN_DTYPES) + DATE_COLUMNS
+    columns = [column for column in pd.read_csv(path, nrows=0).columns if column in wanted]
+    if not columns:
+        return pd.DataFrame(columns=wanted)
+    rows, categories = _scan(path, columns, chunk_rows)
+    if rows == 0:
+        return pd.DataFrame(columns=columns)
+
+    buffers: Dict[str, np.ndarray] = {}
+    missing: Dict[str, np.ndarray] = {}
+    dtypes: Dict[str, Any] = {}
+    for column in columns:
+        dtype = COLUMN_DTYPES.get(column)
+        if column in categories:
+            dtypes[column] = pd.CategoricalDtype(categories[column])
+            buffers[column] = np.empty(rows, dtype=pd.Categorical([], dtype=dtypes[column]).codes.dtype)
+        elif column in DATE_COLUMNS:
+            buffers[column] = np.empty(rows, dtype="datetime64[ns]")
+        else:
+            dtypes[column] = dtype
+            buffers[column] = np.empty(rows, dtype=dtype.lower())
+            if dtype.startswith("Int"):
+                missing[column] = np.empty(rows, dtype=bool)
+
+    offset = 0
+    for chunk in pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_rows):
+        end = offset + len(chunk)
+        for column in columns:
+            series = chunk[column]
+            if column in categories:
+                buffers[column][offset:end] = series.cat.codes
+            elif column in DATE_COLUMNS:
+                buffers[column][offset:end] = pd.to_datetime(series).to_numpy()
+            elif column in missing:
+                missing[column][offset:end] = series.isna().to_numpy()
+                buffers[column][offset:end] = series.to_numpy(dtype=buffers[column].dtype, na_value=0)
+            else:
+                buffers[column][offset:end] = series.to_numpy()
+        offset = end
+
+    # copy=False wraps the buffers as they are instead of consolidating them into new blocks
+    return pd.DataFrame({
+        column: _finish(buffers.pop(column), missing.pop(column, None), categories.get(column))
+        for column in columns
+    }, copy=False)
+
+
+def load_dataset(
+    path: str,
+    cache_dir: Optional[str] = ML_TRAIN_CACHE_DIR,
+    chunk_rows: int = CHUNK_ROWS
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Load the training CSV, from the columnar cache when the file is unchanged.
+
+    Args:
+        path: Source CSV
+        cache_dir: Where cached copies live (None disables the cache)
+        chunk_rows: Rows parsed per chunk
+
+    Returns:
+        (typed DataFrame, report with "cache" ("hit", "miss" or "disabled"),
+         "format", "rows", "seconds", "peak_mb", "frame_mb")
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        cache_format = _cache_format()
+        cache_path = None
+        status = "disabled"
+        if cache_dir is not None:
+            key = hashlib.sha256(f"{source_hash(path)}:{CACHE_SCHEMA_VERSION}:{COLUMN_DTYPES}".encode("utf-8"))
+            suffix = "parquet" if cache_format == "parquet" else "pkl"
+            cache_path = Path(cache_dir) / f"dataset-{key.hexdigest()[:16]}.{suffix}"
+            status = "hit" if cache_path.exists() else "miss"
+
+        if status == "hit":
+            df = pd.read_parquet(cache_path) if cache_format == "parquet" else pd.read_pickle(cache_path)
+        else:
+            df = read_csv_chunked(path, chunk_rows)
+            if cache_path is not None:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_path.with_name(f"{cache_path.name}.tmp-{os.getpid()}")
+                if cache_format == "parquet":
+                    df.to_parquet(tmp_path, index=False)
+                else:
+                    df.to_pickle(tmp_path)
+                os.replace(tmp_path, cache_path)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return df, {
+        "cache": status,
+        "format": cache_format if cache_path is not None else "csv",
+        "rows": len(df),
+        "seconds": seconds,
+        "peak_mb": peak / 2 ** 20,
+        "frame_mb": df.memory_usage(deep=True).sum() / 2 ** 20
+    }
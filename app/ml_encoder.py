@@ -0,0 +1,99 @@
+"""
+Precompiled feature encoder for the cycle prediction model.
+Turns feature dicts straight into the numeric rows the forest was trained on,
+without building a DataFrame or going through ColumnTransformer dispatch.
+The lookup tables are extracted once from the fitted OneHotEncoder
+(categories, dropped category, handle_unknown="ignore") and StandardScaler
+(mean, scale), so the output matches preprocess.transform exactly.
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+class FeatureEncoder:
+    """
+    Dict -> NumPy row encoder compiled from a fitted ColumnTransformer.
+
+    Args:
+        n_features: Width of the transformed row
+        one_hot: (column, {category: output index}) per categorical column;
+            dropped and unknown categories have no entry and encode as all zeros
+        numeric: (column, output index, mean, scale) per scaled numeric column
+    """
+
+    def __init__(self, n_features: int, one_hot: list, numeric: list):
+        self.n_features = n_features
+        self.one_hot = one_hot
+        self.numeric = numeric
+        self.numeric_columns = [column for column, _, _, _ in numeric]
+        self.numeric_index = np.array([index for _, index, _, _ in numeric], dtype=np.intp)
+        self.mean = np.array([mean for _, _, mean, _ in numeric], dtype=np.float64)
+        self.scale = np.array([scale for _, _, _, scale in numeric], dtype=np.float64)
+
+    @classmethod
+    def from_preprocess(cls, preprocess) -> "FeatureEncoder":
+        """
+        Compile the encoder from the pipeline's fitted ColumnTransformer.
+
+        Raises:
+            ValueError: If the transformer uses steps this encoder can't
+                reproduce (callers fall back to preprocess.transform)
+        """
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        one_hot, numeric = [], []
+        offset = 0
+        for name, transformer, columns in preprocess.transformers_:
+            if transformer == "drop" or not len(columns):
+                continue
+            if isinstance(transformer, OneHotEncoder):
+                if transformer.handle_unknown != "ignore" or getattr(transformer, "infrequent_categories_", None):
+                    raise ValueError(f"Unsupported OneHotEncoder settings in '{name}'")
+                drop_idx = transformer.drop_idx_
+                for i, (column, categories) in enumerate(zip(columns, transformer.categories_)):
+                    dropped = drop_idx[i] if drop_idx is not None else None
+                    lookup = {}
+                    for j, category in enumerate(categories):
+                        if dropped is not None and j == dropped:
+                            continue
+                        lookup[category] = offset
+                        offset += 1
+                    one_hot.append((column, lookup))
+            elif isinstance(transformer, StandardScaler):
+                # mean_ is fitted even with with_mean=False, so follow the flags
+                for i, column in enumerate(columns):
+                    mean = transformer.mean_[i] if transformer.with_mean else 0.0
+                    scale = transformer.scale_[i] if transformer.with_std else 1.0
+                    numeric.append((column, offset, float(mean), float(scale)))
+                    offset += 1
+            else:
+                raise ValueError(f"Unsupported transformer '{name}': {type(transformer).__name__}")
+        return cls(offset, one_hot, numeric)
+
+    def transform(self, features_list: List[Dict[str, Any]]) -> np.ndarray:
+        """Encode feature dicts into an (n_rows, n_features) float64 matrix"""
+        X = np.zeros((len(features_list), self.n_features), dtype=np.float64)
+        raw = np.array(
+            [[features[column] for column in self.numeric_columns] for features in features_list],
+            dtype=np.float64
+        ).reshape(len(features_list), len(self.numeric_columns))
+        X[:, self.numeric_index] = (raw - self.mean) / self.scale
+        for row, features in enumerate(features_list):
+            for column, lookup in self.one_hot:
+                index = lookup.get(features[column])
+                if index is not None:
+                    X[row, index] = 1.0
+        return X
+
+    def transform_one(self, features: Dict[str, Any]) -> np.ndarray:
+        """Encode one feature dict into a (1, n_features) row"""
+        X = np.zeros((1, self.n_features), dtype=np.float64)
+        row = X[0]
+        for column, index, mean, scale in self.numeric:
+            row[index] = (float(features[column]) - mean) / scale
+        for column, lookup in self.one_hot:
+            index = lookup.get(features[column])
+            if index is not None:
+                row[index] = 1.0
+        return X
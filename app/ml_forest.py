@@ -0,0 +1,146 @@
+"""
+Array-backed Random Forest for fast inference.
+Flattens the fitted trees of a RandomForestRegressor into contiguous NumPy
+arrays (split feature, threshold, children, leaf value) and predicts a batch
+by stepping every (tree, row) pair down one level at a time, so a prediction
+is depth-many vectorized gathers instead of one Python/joblib dispatch per tree.
+
+Export the model with: python -m app.ml_forest final_trained_cycle_model.pkl forest/
+"""
+import argparse
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+FOREST_ARRAYS = ("feature", "threshold", "children", "value", "roots")
+
+
+class CompiledForest:
+    """
+    A forest stored as flat node arrays.
+
+    All trees share one node numbering; roots holds each tree's root index.
+    children[2 * node] is the right child and children[2 * node + 1] the
+    left one, so a step is a single gather indexed by the split outcome.
+    Leaves point to themselves, so after max_depth steps every path has
+    settled on its leaf and the traversal needs no per-path termination check.
+    """
+
+    def __init__(self, arrays: dict, max_depth: int, n_features: int):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children = arrays["children"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.max_depth = max_depth
+        self.n_features = n_features
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in FOREST_ARRAYS)
+
+    @classmethod
+    def from_sklearn(cls, rf) -> "CompiledForest":
+        """Flatten a fitted single-output RandomForestRegressor"""
+        if getattr(rf, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+        parts = {name: [] for name in FOREST_ARRAYS}
+        offset = 0
+        max_depth = 0
+        for estimator in rf.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count, dtype=np.int32) + offset
+            is_leaf = tree.children_left < 0
+            parts["feature"].append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            parts["threshold"].append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+            left = np.where(is_leaf, nodes, tree.children_left + offset)
+            right = np.where(is_leaf, nodes, tree.children_right + offset)
+            parts["children"].append(np.stack([right, left], axis=1).ravel().astype(np.int32))
+            parts["value"].append(tree.value[:, 0, 0].astype(np.float64))
+            parts["roots"].append(np.array([offset], dtype=np.int32))
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+        arrays = {name: np.ascontiguousarray(np.concatenate(chunks)) for name, chunks in parts.items()}
+        return cls(arrays, max_depth, rf.n_features_in_)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Mean leaf value over the trees for each row of X"""
+        # Same split semantics as sklearn: float32 features, x <= threshold goes left
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        values = X.ravel()
+        # One path per (tree, row), flattened tree-major
+        nodes = np.repeat(self.roots, n_rows)
+        row_offsets = np.tile(np.arange(n_rows, dtype=np.int64) * n_features, self.n_trees)
+        feature, threshold, children = self.feature, self.threshold, self.children
+        for _ in range(self.max_depth):
+            goes_left = values[row_offsets + feature[nodes]] <= threshold[nodes]
+            nodes = children[2 * nodes + goes_left]
+        return self.value[nodes].reshape(self.n_trees, n_rows).mean(axis=0)
+
+    def save(self, path: str) -> bool:
+        """
+        Write the arrays as .npy files plus meta.json (loadable with mmap).
+
+        Written to a temp dir and renamed into place, so workers exporting
+        concurrently never see a partial forest. An existing export is never
+        replaced, since other workers may have it mapped: the new copy is
+        discarded and the existing one should be loaded instead.
+
+        Returns:
+            True if this call published the export, False if path already existed
+        """
+        final_path = Path(path)
+        if final_path.exists():
+            return False
+        tmp_path = final_path.with_name(f"{final_path.name}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        for name in FOREST_ARRAYS:
+            np.save(tmp_path / f"{name}.npy", getattr(self, name))
+        with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"max_depth": self.max_depth, "n_features": self.n_features}, f)
+        try:
+            os.rename(tmp_path, final_path)
+        except OSError:
+            # Another worker published the same forest first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return False
+        return True
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = "r") -> "CompiledForest":
+        """Open a saved forest; with mmap_mode="r" the pages are shared across processes"""
+        path = Path(path)
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in FOREST_ARRAYS}
+        return cls(arrays, meta["max_depth"], meta["n_features"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the cycle model's forest to flat arrays")
+    parser.add_argument("model", help="Pickled sklearn Pipeline with an 'rf' step")
+    parser.add_argument("out", help="Output directory")
+    args = parser.parse_args()
+
+    import joblib
+    rf = joblib.load(args.model).named_steps["rf"]
+    forest = CompiledForest.from_sklearn(rf)
+    if not forest.save(args.out):
+        parser.error(f"{args.out} already exists; remove it or pick another output directory")
+    print(f"Exported {forest.n_trees} trees ({len(forest.value)} nodes, "
+          f"{forest.nbytes / 2 ** 20:.1f} MB) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Local, versioned registry for trained cycle prediction models.
+
+Layout:
+    <root>/<version>/model.pkl       the pickled sklearn Pipeline
+    <root>/<version>/metadata.json   version, created_at, metrics, params, source
+    <root>/ACTIVE.json               {"history": [...]}; the last entry is the
+                                     active version, earlier ones are what a
+                                     rollback returns to
+
+Every write goes through a temp file/dir and a rename, so a process reading
+the registry (e.g. another uvicorn worker) never sees a half-written entry.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+ACTIVE_FILE = "ACTIVE.json"
+# Kept so repeated rollbacks have somewhere to go, without growing forever
+MAX_HISTORY = 20
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json(path: Path, data: Any) -> None:
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """A directory of immutable model versions plus the active-version history"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def register(
+        self,
+        model_path: str,
+        metrics: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        activate: bool = False
+    ) -> str:
+        """
+        Copy a trained model into the registry as a new version.
+
+        Args:
+            model_path: Pickled Pipeline written by train_model.py
+            metrics: Evaluation metrics (e.g. test_mae, test_r2)
+            params: Training configuration (e.g. forest hyperparameters)
+            activate: Make it the active version right away
+
+        Returns:
+            The version id (<UTC timestamp>-<content hash prefix>)
+        """
+        source = Path(model_path)
+        content_hash = _file_hash(source)
+        version = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}-{content_hash[:8]}"
+        final_path = self.root / version
+        tmp_path = self.root / f".{version}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        shutil.copyfile(source, tmp_path / "model.pkl")
+        _write_json(tmp_path / "metadata.json", {
+            "version": version,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "sha256": content_hash,
+            "size_bytes": source.stat().st_size,
+            "source": str(source),
+            "metrics": metrics or {},
+            "params": params or {}
+        })
+        os.rename(tmp_path, final_path)
+        if activate:
+            self.activate(version)
+        return version
+
+    def versions(self) -> List[Dict[str, Any]]:
+        """Metadata of every registered version, oldest first"""
+        if not self.root.is_dir():
+            return []
+        found = []
+        for path in self.root.iterdir():
+            if path.is_dir() and not path.name.startswith(".") and (path / "metadata.json").exists():
+                found.append(self.metadata(path.name))
+        return sorted(found, key=lambda meta: meta["version"])
+
+    def metadata(self, version: str) -> Dict[str, Any]:
+        path = self.root / version / "metadata.json"
+        if not path.exists():
+            raise KeyError(f"Unknown model version '{version}'")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def model_path(self, version: str) -> Path:
+        path = self.root / version / "model.pkl"
+        if not path.exists():
+            raise KeyError(f"Unknown model version '{version}'")
+        return path
+
+    def history(self) -> List[str]:
+        path = self.root / ACTIVE_FILE
+        if not path.exists():
+            return []
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["history"]
+
+    def current(self) -> Optional[str]:
+        """The active version (None if nothing was ever activated)"""
+        history = self.history()
+        return history[-1] if history else None
+
+    def previous(self) -> Optional[str]:
+        """The version a rollback would return to"""
+        history = self.history()
+        return history[-2] if len(history) > 1 else None
+
+    def activate(self, version: str) -> None:
+        """Make version the active one, remembering the current one for rollback"""
+        self.model_path(version)
+        history = [v for v in self.history() if v != version] + [version]
+        self.root.mkdir(parents=True, exist_ok=True)
+        _write_json(self.root / ACTIVE_FILE, {"history": history[-MAX_HISTORY:]})
+
+    def rollback(self) -> str:
+        """
+        Reactivate the previously active version.
+
+        Returns:
+            The version now active
+
+        Raises:
+            ValueError: If there is no earlier version to return to
+        """
+        history = self.history()
+        if len(history) < 2:
+            raise ValueError("No previous model version to roll back to")
+        _write_json(self.root / ACTIVE_FILE, {"history": history[:-1]})
+        return history[-2]
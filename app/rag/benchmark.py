@@ -0,0 +1,393 @@
+"""
+Retrieval benchmark harness for the RAG knowledge base.
+Builds the index from rag_corpus plus an optional synthetic scraped corpus at
+a configurable scale, using a deterministic local embedding model (no API key
+or network needed). A labeled query set drawn from the agents' query templates
+is run against every backend / chunking / search mode combination, reporting
+recall@k, MRR, p50/p99 query latency, index build time and memory. A second
+table compares the quantized vector dtypes against float32.
+
+Run with: python -m app.rag.benchmark --scale 1000 --chunkings markdown:100,recursive:1000
+"""
+import argparse
+import hashlib
+import json
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.config import (
+    RAG_CORPUS_PATH,
+    SCRAPED_RESOURCES_PATH,
+    RAG_CHUNK_OVERLAP,
+    RAG_CHUNK_SIZE,
+    RAG_CHUNK_TOKENS
+)
+from app.rag.query_templates import (
+    EMOTIONAL_FILTER,
+    NUTRITION_FILTER,
+    emotional_query,
+    knowledge_filter,
+    knowledge_query,
+    nutrition_query
+)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings via feature hashing.
+
+    Not semantically strong, but stable across runs and free to compute,
+    which is what a reproducible offline benchmark needs.
+    """
+    model = "local-hashing-embeddings"
+
+    def __init__(self, size: int = 256):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        from app.rag.lexical_index import tokenize
+        vec = np.zeros(self.size, dtype=np.float32)
+        for token in tokenize(text):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            idx = int.from_bytes(digest[:4], "little") % self.size
+            vec[idx] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+# Agent queries (with the agents' metadata filters) and the terms that mark a chunk as relevant
+LABELED_QUERIES = [
+    (nutrition_query(["cramps"]), NUTRITION_FILTER, ["magnesium", "anti-inflammatory", "iron-rich"]),
+    (nutrition_query(["low_energy", "stress"]), NUTRITION_FILTER, ["iron-rich", "magnesium", "stress management"]),
+    (nutrition_query(["cramps", "low_energy", "stress"]), NUTRITION_FILTER, ["magnesium", "iron-rich"]),
+    (emotional_query("bad", 5), EMOTIONAL_FILTER, ["mood swings", "meditation", "irritability"]),
+    (emotional_query("neutral", 3), EMOTIONAL_FILTER, ["mood", "deep breathing"]),
+    (emotional_query("okay", 2), EMOTIONAL_FILTER, ["mood", "journaling"]),
+    (knowledge_query(["pain relief"]), knowledge_filter(["pain relief"]), ["heat therapy", "heating pad", "pain relief"]),
+    (
+        knowledge_query(["pain relief", "mood management"]),
+        knowledge_filter(["pain relief", "mood management"]),
+        ["pain relief", "mood swings", "heating pad"]
+    ),
+    (knowledge_query([]), knowledge_filter([]), ["menstrual cycle", "phases of the cycle"]),
+]
+
+# Synthetic scraped articles: per topic, sentences carrying the labeled terms
+_SYNTHETIC_TOPICS = {
+    "nutrition_period": [
+        "Magnesium from leafy greens and seeds can ease muscle tension before a period.",
+        "Iron-rich foods such as lentils and spinach replace what is lost during bleeding.",
+        "Pairing iron-rich meals with vitamin C improves absorption.",
+    ],
+    "nutrition_pms": [
+        "An anti-inflammatory diet with oily fish and berries may soften PMS symptoms.",
+        "Complex carbohydrates support stress management by keeping blood sugar steady.",
+        "Cutting back on salt and caffeine helps some people with bloating.",
+    ],
+    "cramps_relief": [
+        "Heat therapy relaxes the uterine muscles and is a common first step for pain relief.",
+        "A heating pad on the lower abdomen for twenty minutes can reduce cramping.",
+        "Over-the-counter pain relief works best when taken at the first sign of cramps.",
+    ],
+    "emotional_support": [
+        "Mood swings before a period are linked to shifting hormone levels.",
+        "A short daily meditation practice can lower irritability.",
+        "Deep breathing exercises calm the nervous system during stressful days.",
+        "Journaling helps spot patterns between the cycle and how you feel.",
+    ],
+    "movement_period": [
+        "Gentle yoga and walking keep the body moving on low-energy days.",
+        "Strength training is often easier in the follicular phase.",
+    ],
+}
+_SYNTHETIC_FILLER = [
+    "Many readers track symptoms in an app alongside their sleep.",
+    "Everyone's body responds differently, so small experiments are worthwhile.",
+    "Talk to a healthcare provider if anything feels unusual.",
+    "Staying hydrated is a simple habit that supports overall health.",
+    "Consistency over several weeks matters more than any single day.",
+    "Research in this area is still growing and recommendations change.",
+    "Friends and family can be a helpful source of practical support.",
+    "Writing down questions before an appointment makes visits more useful.",
+]
+
+
+def write_synthetic_corpus(path: str, n_articles: int, base_scraped: Optional[str] = None, seed: int = 0) -> str:
+    """
+    Write a deterministic JSONL scraped corpus of n_articles synthetic articles.
+
+    Items from base_scraped (the real scraped resources) are copied first, so
+    the benchmark index contains everything production would index.
+
+    Returns:
+        The path written
+    """
+    from app.rag.corpus_loader import iter_scraped_items
+
+    rng = random.Random(seed)
+    topics = sorted(_SYNTHETIC_TOPICS)
+    with open(path, "w", encoding="utf-8") as f:
+        if base_scraped:
+            for item in iter_scraped_items(base_scraped):
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        for i in range(n_articles):
+            topic = topics[i % len(topics)]
+            sentences = rng.sample(_SYNTHETIC_TOPICS[topic], k=rng.randint(1, len(_SYNTHETIC_TOPICS[topic])))
+            sentences += [rng.choice(_SYNTHETIC_FILLER) for _ in range(rng.randint(6, 30))]
+            rng.shuffle(sentences)
+            paragraphs = [" ".join(sentences[j:j + 4]) for j in range(0, len(sentences), 4)]
+            f.write(json.dumps({
+                "url": f"https://synthetic.example/{topic}/{i}",
+                "title": f"Synthetic {topic.replace('_', ' ')} article {i}",
+                "topic": topic,
+                "content": "\n\n".join(paragraphs)
+            }) + "\n")
+    return path
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _is_relevant(content: str, terms: List[str]) -> bool:
+    content = content.lower()
+    return any(t in content for t in terms)
+
+
+def recall_at_k(results: List[dict], terms: List[str], n_relevant: int, k: int) -> float:
+    """Fraction of the attainable relevant chunks (capped at k) found in the results"""
+    if n_relevant == 0:
+        return 1.0
+    hits = sum(1 for r in results if _is_relevant(r["content"], terms))
+    return hits / min(k, n_relevant)
+
+
+def reciprocal_rank(results: List[dict], terms: List[str]) -> float:
+    """1 / rank of the first relevant result (0 when none is relevant)"""
+    for rank, r in enumerate(results, start=1):
+        if _is_relevant(r["content"], terms):
+            return 1.0 / rank
+    return 0.0
+
+
+def _dir_size(path: str) -> int:
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def _chunking_kwargs(spec: str) -> dict:
+    """init_vector_store arguments for a "markdown:<tokens>" or "recursive:<chars>" setting"""
+    chunker, _, size = spec.partition(":")
+    if chunker == "markdown":
+        return {"chunker": "markdown", "chunk_tokens": int(size or RAG_CHUNK_TOKENS)}
+    size = int(size or RAG_CHUNK_SIZE)
+    return {"chunker": chunker, "chunk_size": size, "chunk_overlap": min(RAG_CHUNK_OVERLAP, size // 5)}
+
+
+def run_benchmark(
+    corpus_dir: str = RAG_CORPUS_PATH,
+    scraped_json: str = SCRAPED_RESOURCES_PATH,
+    k: int = 3,
+    repeats: int = 20,
+    backends: Optional[Sequence[str]] = None,
+    chunkings: Sequence[str] = (f"markdown:{RAG_CHUNK_TOKENS}", f"recursive:{RAG_CHUNK_SIZE}")
+) -> dict:
+    """
+    Build a throwaway index per backend and chunking and measure each search mode.
+
+    Chunkings are "markdown:<token budget>" or "recursive:<characters>".
+
+    Build time and peak memory are measured with tracemalloc running, so they
+    are comparable across settings rather than absolute.
+
+    Returns:
+        {"builds": {(backend, chunking): {"chunks", "build_seconds", "peak_build_mb", "index_mb"}},
+         "queries": {(backend, chunking, mode): {"recall_at_k", "mrr", "p50_ms", "p99_ms", "mean_ms"}}}
+    """
+    from app.rag import vector_store
+    from app.cache import VersionedLRUCache
+
+    # Measure the search itself, not the result cache or precomputed table
+    saved_cache = vector_store._query_cache
+    saved_precompute = vector_store.RAG_PRECOMPUTE_AGENT_QUERIES
+    vector_store._query_cache = VersionedLRUCache(max_entries=0)
+    vector_store.RAG_PRECOMPUTE_AGENT_QUERIES = False
+    report = {"builds": {}, "queries": {}}
+    try:
+        for backend in backends or vector_store.SEARCH_BACKENDS:
+            for chunking in chunkings:
+                with tempfile.TemporaryDirectory() as persist_dir:
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    vector_store.init_vector_store(
+                        corpus_dir, scraped_json, persist_dir=persist_dir,
+                        embeddings=HashingEmbeddings(), backend=backend,
+                        **_chunking_kwargs(chunking)
+                    )
+                    build_seconds = time.perf_counter() - start
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+
+                    report["builds"][(backend, chunking)] = {
+                        "chunks": len(vector_store.get_snapshot().chunks),
+                        "build_seconds": build_seconds,
+                        "peak_build_mb": peak / 2 ** 20,
+                        "index_mb": _dir_size(persist_dir) / 2 ** 20
+                    }
+                    for mode, row in _measure_modes(vector_store, k, repeats).items():
+                        report["queries"][(backend, chunking, mode)] = row
+    finally:
+        vector_store._query_cache = saved_cache
+        vector_store.RAG_PRECOMPUTE_AGENT_QUERIES = saved_precompute
+    return report
+
+
+def _measure_modes(vector_store, k: int, repeats: int) -> dict:
+    """Run the labeled queries against the loaded index in every search mode"""
+    lexical_index = vector_store.get_snapshot().lexical_index
+    chunks = lexical_index.documents
+    n_relevant = {}
+    for query, filters, terms in LABELED_QUERIES:
+        rows = lexical_index.partitions.rows(filters)
+        in_slice = chunks if rows is None else [chunks[r] for r in rows]
+        n_relevant[query] = sum(1 for c in in_slice if _is_relevant(c.page_content, terms))
+
+    report = {}
+    for mode in vector_store.SEARCH_MODES:
+        latencies, recalls, ranks = [], [], []
+        for query, filters, terms in LABELED_QUERIES:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                results = vector_store.query_knowledge(query, k=k, mode=mode, filters=filters)
+                latencies.append((time.perf_counter() - start) * 1000)
+            recalls.append(recall_at_k(results, terms, n_relevant[query], k))
+            ranks.append(reciprocal_rank(results, terms))
+
+        report[mode] = {
+            "recall_at_k": statistics.mean(recalls),
+            "mrr": statistics.mean(ranks),
+            "p50_ms": _percentile(latencies, 50),
+            "p99_ms": _percentile(latencies, 99),
+            "mean_ms": statistics.mean(latencies)
+        }
+    return report
+
+
+def run_quantization_benchmark(
+    corpus_dir: str = RAG_CORPUS_PATH,
+    scraped_json: str = SCRAPED_RESOURCES_PATH,
+    k: int = 3,
+    rescore: int = 4,
+    repeats: int = 20
+) -> dict:
+    """
+    Compare float16 and int8 storage against float32 on the same chunks.
+
+    Recall@k is the overlap with the exact float32 top-k over the agent
+    query space, with and without full-precision rescoring.
+
+    Returns:
+        Dict of (dtype, rescore) -> {"searched_bytes", "memory_ratio", "recall_at_k", "p50_ms"}
+    """
+    from app.rag import vector_store
+    from app.rag.ingest import chunk_id, embed_matrix
+    from app.rag.numpy_index import VECTOR_DTYPES, NumpyVectorIndex
+    from app.rag.query_templates import agent_queries
+
+    embeddings = HashingEmbeddings()
+    queries = sorted({q for q, _, _ in agent_queries()} | {q for q, _, _ in LABELED_QUERIES})
+    query_vectors = embeddings.embed_documents(queries)
+    report = {}
+    with tempfile.TemporaryDirectory() as persist_dir:
+        vector_store.init_vector_store(
+            corpus_dir, scraped_json, persist_dir=persist_dir,
+            embeddings=embeddings, backend="numpy"
+        )
+        docs, matrix = embed_matrix(vector_store.get_snapshot().chunks, embeddings, on_progress=None)
+
+        baseline = None
+        for dtype in VECTOR_DTYPES:
+            for factor in ([0] if dtype == "float32" else [0, rescore]):
+                index = NumpyVectorIndex.build(
+                    f"{persist_dir}/quant-{dtype}", matrix, docs, dtype=dtype, rescore=factor
+                )
+                latencies, found = [], []
+                for vector in query_vectors:
+                    for _ in range(repeats):
+                        start = time.perf_counter()
+                        hits = index.search(vector, k=k)
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    found.append({chunk_id(index.documents[row]) for row, _ in hits})
+                if baseline is None:
+                    baseline = (index.searched_bytes, found)
+                report[(dtype, factor)] = {
+                    "searched_bytes": index.searched_bytes,
+                    "memory_ratio": index.searched_bytes / baseline[0],
+                    "recall_at_k": statistics.mean(
+                        len(f & b) / max(1, len(b)) for f, b in zip(found, baseline[1])
+                    ),
+                    "p50_ms": _percentile(latencies, 50)
+                }
+    return report
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark RAG retrieval quality and latency")
+    parser.add_argument("--scale", type=int, default=1000,
+                        help="Synthetic scraped articles added to the corpus (0 = real corpus only)")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=20, help="Timed runs per query")
+    parser.add_argument("--chunkings", default=f"markdown:{RAG_CHUNK_TOKENS},recursive:{RAG_CHUNK_SIZE}",
+                        help="Comma-separated markdown:<tokens> / recursive:<chars> settings")
+    parser.add_argument("--backends", default=None, help="Comma-separated backends (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    k = args.k
+    with tempfile.TemporaryDirectory() as corpus_tmp:
+        scraped_json = SCRAPED_RESOURCES_PATH
+        if args.scale:
+            scraped_json = write_synthetic_corpus(
+                f"{corpus_tmp}/scraped.jsonl", args.scale, base_scraped=SCRAPED_RESOURCES_PATH, seed=args.seed
+            )
+        report = run_benchmark(
+            scraped_json=scraped_json,
+            k=k,
+            repeats=args.repeats,
+            backends=args.backends.split(",") if args.backends else None,
+            chunkings=args.chunkings.split(",")
+        )
+        quant = run_quantization_benchmark(scraped_json=scraped_json, k=k, repeats=args.repeats)
+
+    print(f"\n{'backend':<10}{'chunking':<16}{'chunks':>8}{'build s':>10}{'peak MB':>10}{'index MB':>10}")
+    for (backend, chunking), row in report["builds"].items():
+        print(f"{backend:<10}{chunking:<16}{row['chunks']:>8}{row['build_seconds']:>10.2f}"
+              f"{row['peak_build_mb']:>10.1f}{row['index_mb']:>10.1f}")
+
+    print(f"\n{'backend':<10}{'chunking':<16}{'mode':<10}{f'recall@{k}':>10}{'MRR':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for (backend, chunking, mode), row in report["queries"].items():
+        print(f"{backend:<10}{chunking:<16}{mode:<10}{row['recall_at_k']:>10.3f}{row['mrr']:>8.3f}"
+              f"{row['p50_ms']:>10.3f}{row['p99_ms']:>10.3f}")
+
+    print(f"\n{'dtype':<10}{'rescore':<10}{'bytes':>10}{'vs f32':>8}{f'recall@{k}':>12}{'p50 ms':>10}")
+    for (dtype, factor), row in quant.items():
+        print(f"{dtype:<10}{factor:<10}{row['searched_bytes']:>10}{row['memory_ratio']:>8.2f}"
+              f"{row['recall_at_k']:>12.3f}{row['p50_ms']:>10.3f}")
@@ -0,0 +1,155 @@
+"""
+Structure- and token-aware chunker for markdown corpus files and scraped articles.
+Splits on headings and paragraphs instead of raw character counts, packs
+whole paragraphs into chunks up to a token budget, and records each chunk's
+heading path in its metadata.
+
+The budget is sized to what the agents inject into their prompts (see
+query_templates.*_CONTEXT_CHARS), so a retrieved chunk is used whole rather
+than cut off mid-list.
+"""
+import math
+import re
+from typing import Iterable, List, Tuple
+
+from langchain.docstore.document import Document
+
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Rough characters per token for English prose (no tokenizer dependency needed)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _sections(text: str) -> Iterable[Tuple[List[str], int, List[str]]]:
+    """Yield (heading path, heading level, paragraphs) for each markdown section"""
+    path: List[Tuple[int, str]] = []
+    level = 0
+    paragraphs: List[str] = []
+    current: List[str] = []
+
+    def flush_paragraph():
+        if current:
+            paragraphs.append("\n".join(current))
+            current.clear()
+
+    for line in text.splitlines():
+        match = _HEADING_RE.match(line)
+        if match:
+            flush_paragraph()
+            if paragraphs or path:
+                yield [title for _, title in path], level, paragraphs
+            level = len(match.group(1))
+            path = [(lvl, title) for lvl, title in path if lvl < level] + [(level, match.group(2))]
+            paragraphs = []
+        elif line.strip():
+            current.append(line.rstrip())
+        else:
+            flush_paragraph()
+    flush_paragraph()
+    if paragraphs:
+        yield [title for _, title in path], level, paragraphs
+
+
+class MarkdownChunker:
+    """
+    Split documents along markdown structure within a token budget.
+
+    Sections at or above split_level (h1/h2 by default) always start a new
+    chunk; deeper subsections are packed into their parent's chunk while
+    they fit, keeping their heading line inline. Paragraphs are only broken
+    (at sentence, then word, boundaries) when one alone exceeds the budget.
+    Documents without headings are packed paragraph by paragraph.
+    """
+
+    def __init__(self, max_tokens: int = 100, split_level: int = 2):
+        self.max_tokens = max_tokens
+        self.split_level = split_level
+
+    def _budget(self, heading: str) -> int:
+        """Tokens left for the body once the heading path line leads the chunk"""
+        if not heading:
+            return self.max_tokens
+        return max(self.max_tokens - estimate_tokens(heading + "\n"), self.max_tokens // 2)
+
+    def _fit(self, paragraph: str, budget: int) -> List[str]:
+        """Break a paragraph that exceeds the budget on its own"""
+        if estimate_tokens(paragraph) <= budget:
+            return [paragraph]
+        max_chars = budget * CHARS_PER_TOKEN
+        pieces, current = [], ""
+        for unit in _SENTENCE_RE.split(paragraph):
+            while len(unit) > max_chars:
+                cut = unit.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(unit[:cut])
+                unit = unit[cut:].lstrip()
+            if current and len(current) + 1 + len(unit) > max_chars:
+                pieces.append(current)
+                current = ""
+            current = f"{current} {unit}" if current else unit
+        if current:
+            pieces.append(current)
+        return pieces
+
+    def split_text(self, text: str, title: str = "") -> List[Tuple[str, str]]:
+        """Split one text into (heading path, chunk text) pairs"""
+        chunks: List[Tuple[str, str]] = []
+        chunk_path: List[str] = []
+        chunk_level = 0
+        body: List[str] = []
+
+        def flush():
+            if body:
+                heading = " > ".join(chunk_path)
+                chunks.append((heading, f"{heading}\n" + "\n\n".join(body) if heading else "\n\n".join(body)))
+                body.clear()
+
+        for path, level, paragraphs in _sections(text):
+            path = path or ([title] if title else [])
+            blocks = paragraphs
+            if body and level > self.split_level and path[:self.split_level] == chunk_path[:self.split_level]:
+                # Pack a sibling subsection into the open chunk, heading line inline
+                blocks = [f"{'#' * level} {path[-1]}\n{paragraphs[0]}"] + paragraphs[1:] if paragraphs else []
+                if blocks and estimate_tokens("\n\n".join(body + blocks[:1])) > self._budget(" > ".join(chunk_path)):
+                    flush()
+                    blocks = paragraphs
+            else:
+                flush()
+            if not blocks:
+                continue
+            if body:
+                common = 0
+                while common < min(len(path), len(chunk_path)) and path[common] == chunk_path[common]:
+                    common += 1
+                if common < len(chunk_path) and not body[0].startswith("#"):
+                    # The chunk now spans subsections, so its first one needs its heading line too
+                    body[0] = f"{'#' * chunk_level} {chunk_path[-1]}\n{body[0]}"
+                chunk_path = chunk_path[:common]
+            else:
+                chunk_path, chunk_level = list(path), level
+
+            for block in blocks:
+                for piece in self._fit(block, self._budget(" > ".join(chunk_path))):
+                    if body and estimate_tokens("\n\n".join(body + [piece])) > self._budget(" > ".join(chunk_path)):
+                        flush()
+                        chunk_path, chunk_level = list(path), level
+                    body.append(piece)
+        flush()
+        return chunks
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """Split documents, copying their metadata and adding heading_path"""
+        chunks = []
+        for doc in documents:
+            for heading, text in self.split_text(doc.page_content, doc.metadata.get("title", "")):
+                chunks.append(Document(
+                    page_content=text,
+                    metadata={**doc.metadata, "heading_path": heading}
+                ))
+        return chunks
@@ -1,65 +1,171 @@
 """
 Corpus loader - loads documents from filesystem and scraped JSON.
+Documents are yielded lazily: corpus files are read in a bounded thread pool
+and scraped resources (JSON array or JSONL) are parsed incrementally, so a
+large scraped corpus never has to sit in memory all at once.
 """
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
 from langchain.docstore.document import Document
 
 
+# Characters read per step when parsing a scraped JSON array incrementally
+_READ_SIZE = 1 << 16
+
+
+def _read_corpus_file(file_path: Path) -> Optional[Document]:
+    try:
+        content = file_path.read_text(encoding="utf-8")
+    except Exception as e:
+        print(f"Warning: Could not load {file_path}: {e}")
+        return None
+    return Document(
+        page_content=content,
+        metadata={
+            "source": str(file_path),
+            "filename": file_path.name,
+            "topic": "general",
+            "type": "corpus_file"
+        }
+    )
+
+
+def corpus_file_paths(corpus_dir: str) -> List[Path]:
+    """The .md/.txt files in the corpus directory, in a stable order"""
+    corpus_path = Path(corpus_dir)
+    if not corpus_path.exists():
+        return []
+    return sorted(
+        p for p in corpus_path.glob("**/*")
+        if p.suffix in [".md", ".txt"] and p.is_file()
+    )
+
+
+def iter_files(paths: Iterable[Path], max_workers: int = 8) -> Iterator[Document]:
+    """
+    Yield documents for the given corpus files, reading them in a thread pool.
+
+    At most 2 * max_workers files are in flight, so memory stays bounded
+    however many files there are.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append(pool.submit(_read_corpus_file, path))
+            if len(pending) >= 2 * max_workers:
+                doc = pending.popleft().result()
+                if doc is not None:
+                    yield doc
+        while pending:
+            doc = pending.popleft().result()
+            if doc is not None:
+                yield doc
+
+
+def iter_corpus_files(corpus_dir: str, max_workers: int = 8) -> Iterator[Document]:
+    """Yield .md/.txt files from the corpus directory, reading them in a thread pool"""
+    yield from iter_files(corpus_file_paths(corpus_dir), max_workers=max_workers)
+
+
+def _iter_json_array(f: TextIO) -> Iterator[Any]:
+    """Decode the elements of a top-level JSON array one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(_READ_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(_READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+        if len(buffer) < _READ_SIZE and not eof:
+            chunk = f.read(_READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+
+
+def iter_scraped_items(scraped_json: str) -> Iterator[Dict[str, Any]]:
+    """Yield scraped resources from a JSON array or JSONL file without loading it whole"""
+    scraped_path = Path(scraped_json)
+    if not scraped_path.exists():
+        return
+    with open(scraped_path, 'r', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if not first:
+            return
+        f.seek(0)
+        if first == "[":
+            yield from _iter_json_array(f)
+        else:
+            # JSONL: one resource per line
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def iter_corpus(corpus_dir: str, scraped_json: str, max_workers: int = 8) -> Iterator[Document]:
+    """
+    Lazily yield documents from corpus directory and scraped resources.
+
+    Args:
+        corpus_dir: Path to directory with .md/.txt files
+        scraped_json: Path to scraped resources (JSON array or JSONL)
+        max_workers: Threads reading corpus files
+
+    Yields:
+        LangChain Document objects
+    """
+    yield from iter_corpus_files(corpus_dir, max_workers=max_workers)
+    yield from iter_scraped_documents(scraped_json)
+
+
+def iter_scraped_documents(scraped_json: str) -> Iterator[Document]:
+    """Yield a Document per scraped resource with content"""
+    try:
+        for item in iter_scraped_items(scraped_json):
+            if "content" in item and item["content"]:
+                yield Document(
+                    page_content=item["content"],
+                    metadata={
+                        "source": item.get("url", "unknown"),
+                        "title": item.get("title", ""),
+                        "topic": item.get("topic", "general"),
+                        "type": "scraped_article"
+                    }
+                )
+    except Exception as e:
+        print(f"Warning: Could not load scraped resources: {e}")
+
+
 def load_corpus(corpus_dir: str, scraped_json: str) -> List[Document]:
     """
     Load documents from corpus directory and scraped resources JSON.
-    
+
     Args:
         corpus_dir: Path to directory with .md/.txt files
         scraped_json: Path to scraped_resources.json
-        
+
     Returns:
         List of LangChain Document objects
     """
-    documents = []
-    
-    # Load files from corpus directory
-    corpus_path = Path(corpus_dir)
-    if corpus_path.exists():
-        for file_path in corpus_path.glob("**/*"):
-            if file_path.suffix in [".md", ".txt"] and file_path.is_file():
-                try:
-                    content = file_path.read_text(encoding="utf-8")
-                    doc = Document(
-                        page_content=content,
-                        metadata={
-                            "source": str(file_path),
-                            "filename": file_path.name,
-                            "type": "corpus_file"
-                        }
-                    )
-                    documents.append(doc)
-                except Exception as e:
-                    print(f"Warning: Could not load {file_path}: {e}")
-    
-    # Load scraped resources
-    scraped_path = Path(scraped_json)
-    if scraped_path.exists():
-        try:
-            with open(scraped_path, 'r', encoding='utf-8') as f:
-                scraped_data = json.load(f)
-            
-            for item in scraped_data:
-                if "content" in item and item["content"]:
-                    doc = Document(
-                        page_content=item["content"],
-                        metadata={
-                            "source": item.get("url", "unknown"),
-                            "title": item.get("title", ""),
-                            "topic": item.get("topic", "general"),
-                            "type": "scraped_article"
-                        }
-                    )
-                    documents.append(doc)
-        except Exception as e:
-            print(f"Warning: Could not load scraped resources: {e}")
-    
+    documents = list(iter_corpus(corpus_dir, scraped_json))
     print(f"Loaded {len(documents)} documents from corpus and scraped resources")
     return documents
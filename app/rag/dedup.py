@@ -0,0 +1,109 @@
+"""
+Near-duplicate chunk elimination before embedding.
+Chunks are fingerprinted with MinHash over word shingles; locality-sensitive
+hashing (banding) finds candidate pairs without comparing every chunk with
+every other, and a candidate is dropped when its estimated Jaccard similarity
+to an already kept chunk reaches the threshold.
+"""
+import zlib
+from typing import List, Optional
+
+import numpy as np
+from langchain.docstore.document import Document
+
+from app.rag.lexical_index import tokenize
+
+
+# Mersenne prime for the universal hash family; a * x + b stays below 2**63
+_PRIME = (1 << 31) - 1
+
+# Topic every agent slice includes, so a chunk there can stand in for any other
+_SHARED_TOPIC = "general"
+
+
+def _shingles(text: str, size: int) -> np.ndarray:
+    """Hashed word shingles of a text (the whole text when it is shorter than one shingle)"""
+    tokens = tokenize(text)
+    if len(tokens) <= size:
+        grams = [" ".join(tokens)]
+    else:
+        grams = [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in set(grams)), dtype=np.uint64)
+
+
+class NearDuplicateFilter:
+    """
+    Streaming MinHash/LSH filter: keep() decides chunk by chunk, first one wins.
+
+    Corpus files are loaded before scraped articles, so curated text is kept
+    over scraped copies of it. A chunk only replaces one with the same topic
+    or with the shared "general" topic, so a metadata-filtered search never
+    loses a passage.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 0
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets: dict[tuple, List[int]] = {}
+        self._signatures: List[np.ndarray] = []
+        self._topics: List[Optional[str]] = []
+        self.seen = 0
+        self.dropped = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (num_perm minimums) of a text's shingles"""
+        shingles = _shingles(text, self.shingle_size) % np.uint64(_PRIME)
+        return ((np.outer(shingles, self._a) + self._b) % np.uint64(_PRIME)).min(axis=0)
+
+    def keep(self, doc: Document) -> bool:
+        """Register a chunk; False when it near-duplicates a chunk kept earlier"""
+        self.seen += 1
+        sig = self.signature(doc.page_content)
+        topic = doc.metadata.get("topic")
+        keys = [(band,) + tuple(part) for band, part in enumerate(np.split(sig, self.bands))]
+
+        candidates = {idx for key in keys for idx in self._buckets.get(key, ())}
+        for idx in candidates:
+            if self._topics[idx] not in (topic, _SHARED_TOPIC):
+                continue
+            if np.mean(self._signatures[idx] == sig) >= self.threshold:
+                self.dropped += 1
+                return False
+
+        idx = len(self._signatures)
+        self._signatures.append(sig)
+        self._topics.append(topic)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(idx)
+        return True
+
+    def stats(self, batch_size: int = 64) -> dict:
+        """Chunks seen, kept and dropped, and the embedding requests saved"""
+        kept = self.seen - self.dropped
+        batches = lambda n: -(-n // batch_size)
+        return {
+            "chunks": self.seen,
+            "kept": kept,
+            "dropped": self.dropped,
+            "reduction": self.dropped / self.seen if self.seen else 0.0,
+            "embedding_requests_saved": batches(self.seen) - batches(kept)
+        }
+
+
+def dedupe_chunks(chunks: List[Document], threshold: float = 0.8) -> List[Document]:
+    """Drop near-duplicate chunks, keeping the first of each group"""
+    dedup = NearDuplicateFilter(threshold=threshold)
+    return [doc for doc in chunks if dedup.keep(doc)]
@@ -0,0 +1,231 @@
+"""
+On-disk embedding cache keyed by embedding model and text hash.
+Vectors live in a memory-mapped float32 matrix with an append-only key log, so
+rebuilding the vector store only embeds text that has never been seen before.
+"""
+import fcntl
+import json
+import os
+import re
+import hashlib
+import inspect
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def text_key(text: str, kind: str = "document") -> str:
+    """Hash a text for cache lookup (documents and queries embed differently)"""
+    return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    """Best-effort stable name for an embeddings model"""
+    name = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None)
+    if name:
+        return str(name)
+    size = getattr(embeddings, "size", None)
+    return f"{type(embeddings).__name__}-{size}" if size else type(embeddings).__name__
+
+
+def _embed_query_batch(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Embed several queries in one request when the model exposes a query task type"""
+    if len(texts) > 1 and "task_type" in inspect.signature(embeddings.embed_documents).parameters:
+        # Gemini: the same request embed_query sends, for every text at once
+        task_type = getattr(embeddings, "task_type", None) or "RETRIEVAL_QUERY"
+        return embeddings.embed_documents(texts, task_type=task_type)
+    return [embeddings.embed_query(t) for t in texts]
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Query embeddings for several texts with as few model requests as possible"""
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.embed_queries(texts)
+    return _embed_query_batch(embeddings, texts)
+
+
+@contextmanager
+def _file_lock(lock_path: Path):
+    """
+    Cross-process exclusive lock (flock on a lock file).
+
+    The kernel releases it when the holder exits or crashes, so a live
+    writer's lock is never broken and a dead one's never lingers.
+    """
+    with open(lock_path, "a+b") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    """
+    Append-only embedding store for a single embedding model.
+
+    Layout under cache_dir/<model>/:
+        meta.json    - {"model": str, "dim": int}, written once
+        vectors.f32  - raw float32 rows, memory-mapped for reads
+        keys.log     - one text hash per line, in row order
+
+    Both files only ever grow, so a write appends the new rows and a reload
+    reads just the lines added since the last one; neither depends on how
+    many entries are already cached. Vectors are written before their keys,
+    so every complete key line has its vector on disk.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name).strip("_") or "default"
+        self.model_name = model_name
+        self.path = Path(cache_dir) / slug
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.path / "vectors.f32"
+        self._keys_path = self.path / "keys.log"
+        self._meta_path = self.path / "meta.json"
+        self._lock_path = self.path / ".lock"
+        self._lock = threading.Lock()
+        self._dim: Optional[int] = None
+        self._rows: dict[str, int] = {}
+        self._n_rows = 0
+        self._keys_offset = 0  # bytes of keys.log consumed so far
+        self._matrix: Optional[np.memmap] = None
+        self._reload()
+
+    def _reload(self) -> None:
+        """Pick up rows appended (by any process) since the last reload"""
+        if self._dim is None:
+            if not self._meta_path.exists():
+                return
+            try:
+                with open(self._meta_path, "r", encoding="utf-8") as f:
+                    self._dim = json.load(f)["dim"]
+            except (OSError, KeyError, json.JSONDecodeError) as e:
+                print(f"Warning: Ignoring unreadable embedding cache metadata: {e}")
+                return
+        if not self._keys_path.exists() or not self._vectors_path.exists():
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read()
+        # Only trust complete key lines whose vector was fully written
+        lines = data.split(b"\n")[:-1]
+        n_vectors = self._vectors_path.stat().st_size // (self._dim * 4)
+        lines = lines[:max(0, n_vectors - self._n_rows)]
+        if not lines:
+            return
+        for i, line in enumerate(lines):
+            self._rows.setdefault(line.decode("utf-8"), self._n_rows + i)
+        self._n_rows += len(lines)
+        self._keys_offset += sum(len(line) + 1 for line in lines)
+        self._matrix = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r", shape=(self._n_rows, self._dim)
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors for keys (None where missing)"""
+        with self._lock:
+            return [
+                self._matrix[self._rows[k]].tolist() if k in self._rows else None
+                for k in keys
+            ]
+
+    @staticmethod
+    def _append(path: Path, offset: int, data: bytes) -> None:
+        """Write data at offset, dropping anything a crashed writer left past it"""
+        with open(path, "r+b" if path.exists() else "w+b") as f:
+            f.seek(offset)
+            f.write(data)
+            f.truncate()
+
+    def put_many(self, keys: List[str], vectors: List[List[float]]) -> None:
+        """Append new vectors to the cache"""
+        if not keys:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        with self._lock, _file_lock(self._lock_path):
+            # Another process may have appended since we last looked
+            self._reload()
+            if self._dim is None:
+                self._dim = matrix.shape[1]
+                # Start from empty files (drops any leftovers of an older layout)
+                self._vectors_path.write_bytes(b"")
+                self._keys_path.write_bytes(b"")
+                self._n_rows, self._keys_offset = 0, 0
+                tmp_path = self._meta_path.with_suffix(".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dim": self._dim}, f)
+                os.replace(tmp_path, self._meta_path)
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match cache dimension {self._dim}"
+                )
+
+            new = {}
+            for k, row in zip(keys, matrix):
+                if k not in self._rows:
+                    new.setdefault(k, row)
+            if not new:
+                return
+            start = self._n_rows
+            self._append(self._vectors_path, start * self._dim * 4, np.stack(list(new.values())).tobytes())
+            self._append(self._keys_path, self._keys_offset, "".join(f"{k}\n" for k in new).encode("utf-8"))
+            self._reload()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain embeddings wrapper that consults an EmbeddingCache first.
+
+    Only texts missing from the cache are sent to the underlying model.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache_dir: str):
+        self.embeddings = embeddings
+        self.model_name = embedding_model_name(embeddings)
+        self.cache = EmbeddingCache(cache_dir, self.model_name)
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        keys = [text_key(t, kind) for t in texts]
+        vectors = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once
+        missing: dict[str, str] = {}
+        for key, text, vec in zip(keys, texts, vectors):
+            if vec is None:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            missing_keys = list(missing)
+            missing_texts = [missing[k] for k in missing_keys]
+            if kind == "query":
+                new_vectors = _embed_query_batch(self.embeddings, missing_texts)
+            else:
+                new_vectors = self.embeddings.embed_documents(missing_texts)
+            self.cache.put_many(missing_keys, new_vectors)
+            computed = dict(zip(missing_keys, new_vectors))
+            vectors = [
+                vec if vec is not None else list(computed[key])
+                for key, vec in zip(keys, vectors)
+            ]
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "document")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "query")
@@ -0,0 +1,243 @@
+"""
+Batched, concurrent embedding pipeline for corpus ingestion.
+Splits chunks into fixed-size batches, embeds them with bounded concurrency,
+retries failed batches and reports progress and throughput.
+"""
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
+
+
+class IngestionError(RuntimeError):
+    """Raised when a batch keeps failing after all retries"""
+
+
+def chunk_id(doc: Document) -> str:
+    """Stable id for a chunk so re-ingesting the same text upserts instead of duplicating"""
+    source = str(doc.metadata.get("source", ""))
+    return hashlib.sha256(f"{source}\0{doc.page_content}".encode("utf-8")).hexdigest()
+
+
+def _print_progress(done: int, total: Optional[int], elapsed: float) -> None:
+    rate = done / elapsed if elapsed > 0 else 0.0
+    of_total = f"/{total}" if total is not None else ""
+    print(f"  Embedded {done}{of_total} chunks ({rate:.1f} chunks/s)")
+
+
+def _embed_batch(
+    embeddings: Embeddings,
+    texts: List[str],
+    max_retries: int,
+    retry_backoff: float
+) -> List[List[float]]:
+    """
+    Embed one batch, retrying with exponential backoff.
+
+    If the batch still fails, it is split in half so a single bad text
+    cannot sink the texts around it.
+    """
+    last_error: Optional[Exception] = None
+    for attempt in range(max_retries + 1):
+        try:
+            vectors = embeddings.embed_documents(texts)
+            if len(vectors) != len(texts):
+                raise IngestionError(
+                    f"Embedding model returned {len(vectors)} vectors for {len(texts)} texts"
+                )
+            return vectors
+        except Exception as e:
+            last_error = e
+            if attempt < max_retries:
+                time.sleep(retry_backoff * (2 ** attempt))
+
+    if len(texts) > 1:
+        mid = len(texts) // 2
+        return (
+            _embed_batch(embeddings, texts[:mid], max_retries, retry_backoff)
+            + _embed_batch(embeddings, texts[mid:], max_retries, retry_backoff)
+        )
+    raise IngestionError(f"Failed to embed text after {max_retries} retries: {last_error}")
+
+
+def embed_texts(
+    texts: List[str],
+    embeddings: Embeddings,
+    batch_size: int = 64,
+    max_concurrency: int = 4,
+    max_retries: int = 3,
+    retry_backoff: float = 0.5,
+    on_progress: Optional[Callable[[int, int, float], None]] = _print_progress
+) -> List[List[float]]:
+    """
+    Embed texts in batches with a bounded number of concurrent requests.
+
+    Args:
+        texts: Texts to embed
+        embeddings: LangChain embeddings model
+        batch_size: Texts per embedding request
+        max_concurrency: Maximum embedding requests in flight
+        max_retries: Retries per batch before it is split
+        retry_backoff: Base delay in seconds between retries
+        on_progress: Called as (done, total, elapsed_seconds) after each batch
+
+    Returns:
+        One vector per input text, in input order
+    """
+    batches = [
+        (start, texts[start:start + batch_size])
+        for start in range(0, len(texts), batch_size)
+    ]
+    vectors: List[Optional[List[float]]] = [None] * len(texts)
+    started = time.perf_counter()
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        futures = {
+            pool.submit(_embed_batch, embeddings, batch, max_retries, retry_backoff): (start, len(batch))
+            for start, batch in batches
+        }
+        for future in as_completed(futures):
+            start, size = futures[future]
+            vectors[start:start + size] = future.result()
+            done += size
+            if on_progress:
+                on_progress(done, len(texts), time.perf_counter() - started)
+
+    return vectors
+
+
+def iter_embedded_windows(
+    chunks: Iterable[Document],
+    embeddings: Embeddings,
+    batch_size: int = 64,
+    max_concurrency: int = 4,
+    max_retries: int = 3,
+    on_progress: Optional[Callable[[int, Optional[int], float], None]] = _print_progress
+) -> Iterator[Tuple[List[str], List[Document], np.ndarray]]:
+    """
+    Stream chunks through the embedding pipeline a window at a time.
+
+    Each window holds enough batches to keep every concurrent request busy,
+    so only one window of chunks and vectors is alive at once. Exact repeats
+    (same source and text) are skipped.
+
+    Yields:
+        (ids, documents, float32 vectors) per window
+    """
+    window_size = batch_size * max(1, max_concurrency) * 2
+    total = len(chunks) if hasattr(chunks, "__len__") else None
+    seen: set[str] = set()
+    started = time.perf_counter()
+    done = 0
+
+    def _embed_window(ids: List[str], docs: List[Document]):
+        nonlocal done
+        offset = done
+        vectors = embed_texts(
+            [doc.page_content for doc in docs],
+            embeddings,
+            batch_size=batch_size,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            on_progress=(
+                (lambda n, _, __: on_progress(offset + n, total, time.perf_counter() - started))
+                if on_progress else None
+            )
+        )
+        done += len(docs)
+        return ids, docs, np.asarray(vectors, dtype=np.float32)
+
+    ids: List[str] = []
+    docs: List[Document] = []
+    for doc in chunks:
+        doc_id = chunk_id(doc)
+        if doc_id in seen:
+            continue
+        seen.add(doc_id)
+        ids.append(doc_id)
+        docs.append(doc)
+        if len(docs) >= window_size:
+            yield _embed_window(ids, docs)
+            ids, docs = [], []
+    if docs:
+        yield _embed_window(ids, docs)
+
+
+def index_chunks(
+    vectorstore,
+    chunks: Iterable[Document],
+    embeddings: Embeddings,
+    batch_size: int = 64,
+    max_concurrency: int = 4,
+    max_retries: int = 3,
+    on_progress: Optional[Callable[[int, Optional[int], float], None]] = _print_progress
+) -> dict:
+    """
+    Embed chunks through the batched pipeline and upsert them into Chroma.
+
+    Args:
+        vectorstore: LangChain Chroma vector store
+        chunks: Chunked documents to index (any iterable, consumed lazily)
+        embeddings: LangChain embeddings model
+        batch_size: Texts per embedding request and per Chroma upsert
+        max_concurrency: Maximum embedding requests in flight
+        max_retries: Retries per batch before it is split
+        on_progress: Progress callback, see embed_texts
+
+    Returns:
+        Dict with chunk count, elapsed seconds and throughput
+    """
+    started = time.perf_counter()
+    n_chunks = 0
+    for ids, docs, vectors in iter_embedded_windows(
+        chunks, embeddings, batch_size, max_concurrency, max_retries, on_progress
+    ):
+        for start in range(0, len(docs), batch_size):
+            end = start + batch_size
+            vectorstore._collection.upsert(
+                ids=ids[start:end],
+                embeddings=vectors[start:end].tolist(),
+                metadatas=[doc.metadata for doc in docs[start:end]],
+                documents=[doc.page_content for doc in docs[start:end]]
+            )
+        n_chunks += len(docs)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "chunks": n_chunks,
+        "seconds": elapsed,
+        "chunks_per_second": n_chunks / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def embed_matrix(
+    chunks: Iterable[Document],
+    embeddings: Embeddings,
+    batch_size: int = 64,
+    max_concurrency: int = 4,
+    max_retries: int = 3,
+    on_progress: Optional[Callable[[int, Optional[int], float], None]] = _print_progress
+) -> Tuple[List[Document], np.ndarray]:
+    """
+    Embed chunks into one float32 matrix (for the NumPy backend).
+
+    Vectors are copied window by window into compact float32 storage rather
+    than held as Python float lists.
+
+    Returns:
+        (unique documents, matrix with one row per document)
+    """
+    all_docs: List[Document] = []
+    blocks: List[np.ndarray] = []
+    for _, docs, vectors in iter_embedded_windows(
+        chunks, embeddings, batch_size, max_concurrency, max_retries, on_progress
+    ):
+        all_docs.extend(docs)
+        blocks.append(vectors)
+    matrix = np.concatenate(blocks) if blocks else np.empty((0, 0), dtype=np.float32)
+    return all_docs, matrix
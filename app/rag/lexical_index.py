@@ -0,0 +1,117 @@
+"""
+Local BM25 inverted index over the RAG chunks.
+Answers keyword-heavy agent queries without an embedding round trip.
+"""
+import math
+import re
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+
+from langchain.docstore.document import Document
+
+from app.rag.metadata_filter import MetadataPartitions
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "during", "for", "from",
+    "in", "is", "it", "of", "on", "or", "that", "the", "this", "to", "with",
+    "your", "you"
+}
+
+
+def _normalize_token(token: str) -> str:
+    """Very light stemming so 'cramps' matches 'cramp' and 'strategies' matches 'strategy'"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and stem"""
+    return [
+        _normalize_token(tok)
+        for tok in _TOKEN_RE.findall(text.lower())
+        if tok not in _STOPWORDS
+    ]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of documents.
+
+    Postings map each term to (doc_index, term_frequency) pairs, so a query
+    only touches documents that share at least one term with it.
+    """
+
+    def __init__(self, documents: List[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+
+        for idx, doc in enumerate(documents):
+            counts = Counter(tokenize(doc.page_content))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((idx, tf))
+
+        n_docs = len(documents)
+        self.avg_doc_length = (sum(self.doc_lengths) / n_docs) if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(posts) + 0.5) / (len(posts) + 0.5))
+            for term, posts in self.postings.items()
+        }
+        self.partitions = MetadataPartitions(documents)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, k: int = 3, rows: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Score documents against a query.
+
+        Args:
+            query: Free-text query
+            k: Number of results to return
+            rows: Only score these document indices (a metadata slice)
+
+        Returns:
+            List of (doc_index, score) sorted by descending score
+        """
+        allowed = {int(r) for r in rows} if rows is not None else None
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for idx, tf in self.postings[term]:
+                if allowed is not None and idx not in allowed:
+                    continue
+                norm = 1 - self.b + self.b * self.doc_lengths[idx] / self.avg_doc_length
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int, rrf_k: int = 60) -> List[str]:
+    """
+    Fuse several ranked id lists with reciprocal-rank fusion.
+
+    Args:
+        rankings: Ranked lists of document ids, best first
+        k: Number of fused ids to return
+        rrf_k: Damping constant (60 is the value from the original RRF paper)
+
+    Returns:
+        Fused list of ids, best first
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(scores, key=lambda d: scores[d], reverse=True)[:k]
@@ -0,0 +1,94 @@
+"""
+Metadata filters for query_knowledge.
+Chunks are partitioned by their `topic` and `type` metadata at index time so a
+filtered query only scores the rows in its slice instead of post-filtering.
+
+A filter maps a metadata field to one or more glob patterns, e.g.
+    {"topic": ["nutrition_*", "cramps_relief"], "type": "scraped_article"}
+Patterns within a field are OR-ed, fields are AND-ed.
+"""
+from fnmatch import fnmatchcase
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain.docstore.document import Document
+
+
+FILTER_FIELDS = ("topic", "type")
+
+Filters = Optional[Dict[str, Union[str, Sequence[str]]]]
+
+
+def normalize_filters(filters: Filters) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """Canonical, hashable form of a filter (used in cache keys)"""
+    if not filters:
+        return ()
+    normalized = []
+    for field, patterns in sorted(filters.items()):
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Cannot filter on '{field}', expected one of {FILTER_FIELDS}")
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        normalized.append((field, tuple(sorted(set(patterns)))))
+    return tuple(normalized)
+
+
+class MetadataPartitions:
+    """Posting lists of row indices per metadata value"""
+
+    def __init__(self, documents: List[Document], fields: Sequence[str] = FILTER_FIELDS):
+        postings: Dict[str, Dict[str, List[int]]] = {field: {} for field in fields}
+        for row, doc in enumerate(documents):
+            for field in fields:
+                value = doc.metadata.get(field)
+                if value is not None:
+                    postings[field].setdefault(str(value), []).append(row)
+        self.postings = {
+            field: {value: np.asarray(rows, dtype=np.int64) for value, rows in values.items()}
+            for field, values in postings.items()
+        }
+
+    def resolve(self, field: str, patterns: Sequence[str]) -> List[str]:
+        """Concrete metadata values matching any of the glob patterns"""
+        return sorted(
+            value for value in self.postings.get(field, {})
+            if any(fnmatchcase(value, pattern) for pattern in patterns)
+        )
+
+    def rows(self, filters: Filters) -> Optional[np.ndarray]:
+        """
+        Sorted row indices matching the filter.
+
+        Returns:
+            None when there is no filter (all rows match)
+        """
+        normalized = normalize_filters(filters)
+        if not normalized:
+            return None
+        selected: Optional[np.ndarray] = None
+        for field, patterns in normalized:
+            values = self.resolve(field, patterns)
+            field_rows = (
+                np.unique(np.concatenate([self.postings[field][v] for v in values]))
+                if values else np.empty(0, dtype=np.int64)
+            )
+            selected = field_rows if selected is None else np.intersect1d(selected, field_rows)
+        return selected
+
+    def chroma_where(self, filters: Filters) -> Optional[dict]:
+        """
+        Translate a filter into a Chroma `where` clause.
+
+        Returns:
+            None for no filter, {} when nothing can match
+        """
+        normalized = normalize_filters(filters)
+        if not normalized:
+            return None
+        clauses = []
+        for field, patterns in normalized:
+            values = self.resolve(field, patterns)
+            if not values:
+                return {}
+            clauses.append({field: {"$in": values}})
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
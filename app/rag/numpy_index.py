@@ -0,0 +1,293 @@
+"""
+In-process NumPy search backend for the RAG index.
+Holds L2-normalized embeddings in a memory-mapped .npy matrix and answers
+top-k queries with vectorized dot products. Above a size threshold it adds an
+IVF (inverted file) layer so a query only scans the closest clusters.
+
+The searched matrix can be stored as float32, float16 or int8 with a
+per-vector scale. Compact matrices keep a float32 copy on disk that is only
+paged in to rescore the top candidates at full precision.
+
+Because the matrix is opened with mmap_mode="r", every uvicorn worker that
+loads the same index directory shares the same page-cache pages.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain.docstore.document import Document
+
+from app.rag.metadata_filter import MetadataPartitions
+
+
+# Rows scored per block, bounds the float32 temporaries for compact matrices
+_BLOCK_ROWS = 65536
+
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization, returns (codes, scales)"""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _block_scores(
+    vectors: np.ndarray,
+    query: np.ndarray,
+    start: int,
+    end: int,
+    scales: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Dot products for vectors[start:end] computed in float32 blocks.
+
+    query is one vector (dim,) or several as columns (dim, n_queries).
+    """
+    out = np.empty((end - start,) + query.shape[1:], dtype=np.float32)
+    for lo in range(start, end, _BLOCK_ROWS):
+        hi = min(lo + _BLOCK_ROWS, end)
+        out[lo - start:hi - start] = np.asarray(vectors[lo:hi], dtype=np.float32) @ query
+    if scales is not None:
+        out *= scales[start:end].reshape((-1,) + (1,) * (out.ndim - 1))
+    return out
+
+
+def _spherical_kmeans(vectors: np.ndarray, n_lists: int, n_iter: int = 10, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Cluster unit vectors by cosine similarity, returns (centroids, assignments)"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    assign = np.zeros(len(vectors), dtype=np.int64)
+    for _ in range(n_iter):
+        for lo in range(0, len(vectors), _BLOCK_ROWS):
+            assign[lo:lo + _BLOCK_ROWS] = np.argmax(vectors[lo:lo + _BLOCK_ROWS] @ centroids.T, axis=1)
+        for c in range(n_lists):
+            members = vectors[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids.astype(np.float32), assign
+
+
+class NumpyVectorIndex:
+    """
+    Exact or IVF top-k search over a memory-mapped embedding matrix.
+
+    Layout of an index directory:
+        vectors.npy     - normalized embeddings (float32, float16 or int8), rows grouped by IVF list
+        documents.json  - chunk content + metadata, same row order
+        meta.json       - dtype, row count, IVF settings
+        scales.npy      - per-row dequantization scale (int8 only)
+        full.npy        - float32 copy used for rescoring (float16 and int8 only)
+        centroids.npy   - IVF list centroids (only above the ANN threshold)
+        offsets.npy     - row offset where each IVF list starts (n_lists + 1)
+    """
+
+    def __init__(self, path: str, nprobe: int = 8, rescore: int = 4):
+        self.path = Path(path)
+        with open(self.path / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(self.path / "documents.json", "r", encoding="utf-8") as f:
+            self.documents = [
+                Document(page_content=d["content"], metadata=d["metadata"])
+                for d in json.load(f)
+            ]
+        self.vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self.scales: Optional[np.ndarray] = None
+        self.full: Optional[np.ndarray] = None
+        if self.meta["dtype"] == "int8":
+            self.scales = np.load(self.path / "scales.npy")
+        if (self.path / "full.npy").exists():
+            self.full = np.load(self.path / "full.npy", mmap_mode="r")
+        self.centroids: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None
+        if self.meta.get("ivf"):
+            self.centroids = np.load(self.path / "centroids.npy")
+            self.offsets = np.load(self.path / "offsets.npy")
+        self.nprobe = nprobe
+        self.rescore = rescore
+        self.partitions = MetadataPartitions(self.documents)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def searched_bytes(self) -> int:
+        """Bytes of the matrix every query scans (the full-precision copy stays on disk)"""
+        return int(self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    @classmethod
+    def build(
+        cls,
+        path: str,
+        vectors: List[List[float]],
+        documents: List[Document],
+        dtype: str = "float32",
+        ann_threshold: int = 20000,
+        nprobe: int = 8,
+        rescore: int = 4
+    ) -> "NumpyVectorIndex":
+        """
+        Write an index directory atomically and open it.
+
+        Args:
+            path: Final index directory (written via a temp dir + rename)
+            vectors: One embedding per document
+            documents: Chunk documents
+            dtype: "float32", "float16" or "int8" storage for the matrix
+            ann_threshold: Row count above which an IVF layer is built
+            nprobe: IVF lists scanned per query
+            rescore: For compact dtypes, rescore k * rescore candidates at
+                full precision (0 disables rescoring)
+
+        Returns:
+            The opened index (or the one another worker finished first)
+        """
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype '{dtype}', expected one of {VECTOR_DTYPES}")
+        final_path = Path(path)
+        if (final_path / "meta.json").exists():
+            return cls(str(final_path), nprobe=nprobe, rescore=rescore)
+
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(documents), -1))
+        order = np.arange(len(documents))
+        meta = {"dtype": dtype, "rows": len(documents), "dim": int(matrix.shape[1]), "ivf": False}
+
+        tmp_path = final_path.with_name(f"{final_path.name}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+
+        if len(documents) > ann_threshold:
+            n_lists = max(1, int(np.sqrt(len(documents))))
+            centroids, assign = _spherical_kmeans(matrix, n_lists)
+            order = np.argsort(assign, kind="stable")
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+            np.save(tmp_path / "centroids.npy", centroids)
+            np.save(tmp_path / "offsets.npy", offsets.astype(np.int64))
+            meta.update({"ivf": True, "n_lists": n_lists})
+
+        matrix = matrix[order]
+        if dtype == "int8":
+            codes, scales = _quantize_int8(matrix)
+            np.save(tmp_path / "vectors.npy", codes)
+            np.save(tmp_path / "scales.npy", scales)
+        else:
+            np.save(tmp_path / "vectors.npy", matrix.astype(dtype))
+        if dtype != "float32":
+            np.save(tmp_path / "full.npy", matrix)
+        with open(tmp_path / "documents.json", "w", encoding="utf-8") as f:
+            json.dump(
+                [{"content": documents[i].page_content, "metadata": documents[i].metadata} for i in order],
+                f,
+                ensure_ascii=False
+            )
+        with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        try:
+            os.rename(tmp_path, final_path)
+        except OSError:
+            # Another worker published the same index version first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        return cls(str(final_path), nprobe=nprobe, rescore=rescore)
+
+    def _candidates(self, query: np.ndarray, rows: Optional[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows to rank for one normalized query and their (compact) scores"""
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            scores = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+            if self.scales is not None:
+                scores *= self.scales[rows]
+            return rows, scores
+        if self.centroids is None or self.nprobe >= len(self.centroids):
+            return np.arange(len(self)), _block_scores(self.vectors, query, 0, len(self), self.scales)
+        probe = np.argsort(-(self.centroids @ query))[:self.nprobe]
+        spans = [(int(self.offsets[c]), int(self.offsets[c + 1])) for c in probe]
+        rows = np.concatenate([np.arange(lo, hi) for lo, hi in spans])
+        scores = np.concatenate([
+            _block_scores(self.vectors, query, lo, hi, self.scales) for lo, hi in spans
+        ])
+        return rows, scores
+
+    def _top_k(self, rows: np.ndarray, scores: np.ndarray, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Best k candidates, rescored at full precision when a float32 copy exists"""
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        if self.full is not None and self.rescore > 0:
+            # Shortlist with the compact scores, then rank by the exact ones
+            n_candidates = min(len(scores), k * self.rescore)
+            shortlist = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+            rows = np.sort(rows[shortlist])  # sorted rows keep the disk reads sequential
+            scores = np.asarray(self.full[rows], dtype=np.float32) @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def search(
+        self,
+        query_vector: List[float],
+        k: int = 3,
+        rows: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the k rows with the highest cosine similarity.
+
+        Args:
+            query_vector: Query embedding (normalized here)
+            k: Number of results
+            rows: Only score these rows (a metadata slice, searched exactly)
+
+        Returns:
+            List of (row_index, score) sorted by descending score
+        """
+        if not len(self):
+            return []
+        query = _normalize(np.asarray(query_vector, dtype=np.float32))
+        candidate_rows, scores = self._candidates(query, rows)
+        return self._top_k(candidate_rows, scores, query, k)
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        ks: Sequence[int],
+        rows_list: Optional[Sequence[Optional[Sequence[int]]]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Search several queries, scoring them all with one matrix multiply.
+
+        IVF indexes probe different lists per query, so they fall back to
+        one search per query.
+
+        Args:
+            query_vectors: One embedding per query
+            ks: Number of results per query
+            rows_list: Optional metadata slice per query
+
+        Returns:
+            One search() result list per query
+        """
+        rows_list = list(rows_list) if rows_list is not None else [None] * len(query_vectors)
+        if not len(self) or not len(query_vectors):
+            return [[] for _ in query_vectors]
+        queries = _normalize(np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1))
+        if self.centroids is not None and self.nprobe < len(self.centroids):
+            return [self.search(q, k, rows) for q, k, rows in zip(queries, ks, rows_list)]
+
+        all_scores = _block_scores(self.vectors, queries.T, 0, len(self), self.scales)
+        results = []
+        for j, (query, k, rows) in enumerate(zip(queries, ks, rows_list)):
+            rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+            results.append(self._top_k(rows, all_scores[rows, j], query, k))
+        return results
@@ -0,0 +1,11 @@
+"""
+Query normalization for the query_knowledge result cache (app/cache.py).
+Agent queries are built from a handful of templates, so the same strings
+recur across users; a hit skips both the embedding call and the search.
+"""
+import re
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query"""
+    return re.sub(r"\s+", " ", query.strip().lower())
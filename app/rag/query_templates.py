@@ -0,0 +1,119 @@
+"""
+RAG query templates used by the agents.
+The agents only ever fill these templates from a few tags, so the full query
+space can be enumerated and its results precomputed at startup. Each agent
+also searches only its own metadata slice (see app/rag/metadata_filter.py).
+"""
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Tags each agent can put into its query, in the order the agents add them
+NUTRITION_TAGS = ("cramps", "low_energy", "stress")
+MOODS = ("good", "neutral", "bad", "okay")  # check-in moods + plan default
+STRESS_LEVELS = (1, 2, 3, 4, 5)
+KNOWLEDGE_TOPICS = ("pain relief", "mood management")
+KNOWLEDGE_DEFAULT_TOPIC = "menstrual health general"
+
+# Results requested by each agent
+NUTRITION_K = 2
+EMOTIONAL_K = 2
+KNOWLEDGE_K = 3
+
+# Characters of each retrieved chunk the agents put into their prompts;
+# RAG_CHUNK_TOKENS keeps chunks within these so they are used whole
+NUTRITION_CONTEXT_CHARS = 500
+EMOTIONAL_CONTEXT_CHARS = 400
+KNOWLEDGE_SNIPPET_CHARS = 200  # the knowledge agent only shows a snippet per resource
+
+# Topic slices searched by each agent; curated corpus files have topic "general"
+NUTRITION_FILTER = {"topic": ["nutrition_*", "cramps_relief", "general"]}
+EMOTIONAL_FILTER = {"topic": ["emotional_*", "general"]}
+KNOWLEDGE_TOPIC_SLICES = {
+    "pain relief": ["cramps_relief", "general"],
+    "mood management": ["emotional_*", "general"],
+}
+
+
+def nutrition_query(tags: Sequence[str]) -> str:
+    return f"nutrition recommendations for {', '.join(tags)} during menstrual cycle"
+
+
+def emotional_query(mood: str, stress: int) -> str:
+    return f"emotional support coping strategies for {mood} mood during period stress level {stress}"
+
+
+def knowledge_query(topics: Sequence[str]) -> str:
+    return " ".join(topics or [KNOWLEDGE_DEFAULT_TOPIC])
+
+
+def knowledge_filter(topics: Sequence[str]) -> Optional[dict]:
+    """Topic slice for the knowledge agent (whole collection for general queries)"""
+    patterns = sorted({p for topic in topics for p in KNOWLEDGE_TOPIC_SLICES.get(topic, [])})
+    if not patterns or any(topic not in KNOWLEDGE_TOPIC_SLICES for topic in topics):
+        return None
+    return {"topic": patterns}
+
+
+def nutrition_tags(daily_log: Optional[dict]) -> List[str]:
+    """Nutrition query tags for today's check-in"""
+    tags = []
+    if daily_log:
+        if daily_log.get("pain", 0) > 5:
+            tags.append("cramps")
+        if daily_log.get("energy", 5) < 3:
+            tags.append("low_energy")
+        if daily_log.get("stress", 3) > 3:
+            tags.append("stress")
+    return tags
+
+
+def mood_and_stress(daily_log: Optional[dict]) -> Tuple[str, int]:
+    """Mood and stress level the emotional agent works from"""
+    if not daily_log:
+        return "neutral", 3
+    return daily_log.get("mood", "neutral"), daily_log.get("stress", 3)
+
+
+def knowledge_topics(daily_log: Optional[dict]) -> List[str]:
+    """Topics the knowledge agent looks up for today's check-in"""
+    topics = []
+    if daily_log:
+        if daily_log.get("pain", 0) > 5:
+            topics.append("pain relief")
+        if daily_log.get("mood") == "bad":
+            topics.append("mood management")
+    return topics or [KNOWLEDGE_DEFAULT_TOPIC]
+
+
+def plan_queries(daily_log: Optional[dict]) -> Dict[str, Tuple[str, int, Optional[dict]]]:
+    """The (query, k, filters) each RAG agent issues for a plan, keyed by agent"""
+    topics = knowledge_topics(daily_log)
+    return {
+        "nutrition": (nutrition_query(nutrition_tags(daily_log)), NUTRITION_K, NUTRITION_FILTER),
+        "emotional": (emotional_query(*mood_and_stress(daily_log)), EMOTIONAL_K, EMOTIONAL_FILTER),
+        "knowledge_resources": (knowledge_query(topics), KNOWLEDGE_K, knowledge_filter(topics)),
+    }
+
+
+def _ordered_subsets(items: Sequence[str]) -> List[List[str]]:
+    """All subsets of items, each keeping the original order"""
+    return [list(combo) for size in range(len(items) + 1) for combo in combinations(items, size)]
+
+
+def agent_queries() -> List[Tuple[str, int, Optional[dict]]]:
+    """Every (query, k, filters) triple the nutrition, emotional and knowledge agents can issue"""
+    queries = [
+        (nutrition_query(tags), NUTRITION_K, NUTRITION_FILTER)
+        for tags in _ordered_subsets(NUTRITION_TAGS)
+    ]
+    queries += [
+        (emotional_query(mood, stress), EMOTIONAL_K, EMOTIONAL_FILTER)
+        for mood in MOODS
+        for stress in STRESS_LEVELS
+    ]
+    queries += [
+        (knowledge_query(topics), KNOWLEDGE_K, knowledge_filter(topics))
+        for topics in _ordered_subsets(KNOWLEDGE_TOPICS)
+    ]
+    return queries
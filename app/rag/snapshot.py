@@ -0,0 +1,183 @@
+"""
+Immutable index snapshots and incremental corpus reloads.
+
+Everything a query needs (BM25 index, dense backend, precomputed results,
+version) lives on one IndexSnapshot. A reload builds a complete new snapshot
+next to the live one and swaps it in with a single assignment, so queries
+that already picked up the old snapshot finish against it.
+
+Reloads are incremental: files whose mtime (or, failing that, content hash)
+is unchanged keep their chunks, and chunks whose text was already embedded
+reuse the previous snapshot's vectors instead of calling the embedding model.
+"""
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
+
+
+def file_hash(path: Path) -> str:
+    """sha256 of a file's bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_stat(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def collect_chunks(
+    corpus_dir: str,
+    scraped_json: str,
+    split: Callable[[Document], List[Document]],
+    previous: Optional[Dict[str, dict]] = None,
+    max_workers: int = 8
+) -> Tuple[Dict[str, dict], List[str]]:
+    """
+    Chunk every corpus file and the scraped resources, reusing unchanged files.
+
+    Args:
+        corpus_dir: Directory with .md/.txt files
+        scraped_json: Scraped resources (JSON array or JSONL)
+        split: Turns one document into its chunks
+        previous: Sources of the previous snapshot (see Returns)
+        max_workers: Threads reading changed corpus files
+
+    Returns:
+        (sources, changed) where sources maps each file path to
+        {"stat", "hash", "chunks"} in corpus-then-scraped order, and changed
+        lists the files that were re-read and re-chunked
+    """
+    from app.rag.corpus_loader import corpus_file_paths, iter_files, iter_scraped_documents
+
+    previous = previous or {}
+    paths = corpus_file_paths(corpus_dir)
+    if Path(scraped_json).is_file():
+        paths.append(Path(scraped_json))
+
+    sources: Dict[str, dict] = {}
+    changed: List[Path] = []
+    for path in paths:
+        key = str(path)
+        stat = _file_stat(path)
+        old = previous.get(key)
+        if old is not None and old["stat"] == stat:
+            sources[key] = old
+            continue
+        digest = file_hash(path)
+        if old is not None and old["hash"] == digest:
+            sources[key] = {**old, "stat": stat}
+            continue
+        sources[key] = {"stat": stat, "hash": digest, "chunks": []}
+        changed.append(path)
+
+    scraped = [p for p in changed if str(p) == str(Path(scraped_json))]
+    corpus_files = [p for p in changed if p not in scraped]
+    for doc in iter_files(corpus_files, max_workers=max_workers):
+        sources[doc.metadata["source"]]["chunks"].extend(split(doc))
+    for path in scraped:
+        for doc in iter_scraped_documents(str(path)):
+            sources[str(path)]["chunks"].extend(split(doc))
+    return sources, [str(p) for p in changed]
+
+
+class IndexSnapshot:
+    """
+    One immutable version of the RAG index.
+
+    Attributes are set once when the snapshot is built; precomputed is
+    replaced as a whole (never mutated) by precompute_agent_queries.
+    A lexical_only snapshot is published during a cold start, before the
+    chunks are embedded, and answers every mode with BM25.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        sources: Dict[str, dict],
+        lexical_index,
+        backend: str,
+        vectorstore=None,
+        numpy_index=None,
+        lexical_only: bool = False
+    ):
+        self.version = version
+        self.sources = sources
+        self.lexical_index = lexical_index
+        self.backend = backend
+        self.vectorstore = vectorstore
+        self.numpy_index = numpy_index
+        self.lexical_only = lexical_only
+        self.retriever = (
+            vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
+            if vectorstore is not None else None
+        )
+        self.precomputed: dict = {}
+        self._vector_rows = None
+
+    @property
+    def chunks(self) -> List[Document]:
+        return self.lexical_index.documents
+
+    def stored_vectors(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Vectors this snapshot already holds for the given chunk texts (None if absent)"""
+        found: List[Optional[List[float]]] = [None] * len(texts)
+        if self.numpy_index is not None:
+            index = self.numpy_index
+            if self._vector_rows is None:
+                self._vector_rows = {doc.page_content: row for row, doc in enumerate(index.documents)}
+            rows = self._vector_rows
+            matrix = index.full if index.full is not None else index.vectors
+            for i, text in enumerate(texts):
+                row = rows.get(text)
+                if row is not None:
+                    vector = matrix[row].astype("float32")
+                    if index.full is None and index.scales is not None:
+                        vector = vector * index.scales[row]
+                    found[i] = vector.tolist()
+        elif self.vectorstore is not None:
+            from app.rag.ingest import chunk_id
+            if self._vector_rows is None:
+                self._vector_rows = {doc.page_content: chunk_id(doc) for doc in self.chunks}
+            ids = self._vector_rows
+            wanted = list({ids[t] for t in texts if t in ids})
+            if wanted:
+                stored = self.vectorstore._collection.get(ids=wanted, include=["embeddings"])
+                by_id = dict(zip(stored["ids"], stored["embeddings"]))
+                for i, text in enumerate(texts):
+                    vector = by_id.get(ids.get(text))
+                    found[i] = list(vector) if vector is not None else None
+        return found
+
+
+class ReusedVectorEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that takes document vectors from the previous snapshot
+    when it has them and only sends new chunk texts to the model.
+    """
+
+    def __init__(self, embeddings: Embeddings, previous: Optional[IndexSnapshot]):
+        self.embeddings = embeddings
+        self.previous = previous
+        self.reused = 0
+        self.embedded = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.previous.stored_vectors(texts) if self.previous is not None else [None] * len(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            for i, vector in zip(missing, self.embeddings.embed_documents([texts[i] for i in missing])):
+                vectors[i] = vector
+        self.reused += len(texts) - len(missing)
+        self.embedded += len(missing)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
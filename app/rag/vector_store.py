@@ -1,6 +1,7 @@
 """
 Vector store initialization and management using Chroma + Gemini embeddings.
 """
+import threading
 from typing import Optional
 import chromadb
 from chromadb.config import Settings
@@ -11,18 +12,52 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from app.config import (
     GEMINI_API_KEY,
     GEMINI_EMBED_MODEL_NAME,
-    VECTOR_STORE_PATH
+    VECTOR_STORE_PATH,
+    CORPUS_LOADER_WORKERS,
+    RAG_CHUNKER,
+    RAG_CHUNK_TOKENS,
+    RAG_CHUNK_SIZE,
+    RAG_CHUNK_OVERLAP,
+    RAG_DEDUP_ENABLED,
+    RAG_DEDUP_THRESHOLD,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_ENABLED,
+    EMBED_BATCH_SIZE,
+    EMBED_MAX_CONCURRENCY,
+    EMBED_MAX_RETRIES,
+    RAG_SEARCH_MODE,
+    RAG_SEARCH_BACKEND,
+    RAG_VECTOR_DTYPE,
+    RAG_ANN_THRESHOLD,
+    RAG_ANN_NPROBE,
+    RAG_RESCORE_FACTOR,
+    RAG_QUERY_CACHE_SIZE,
+    RAG_QUERY_CACHE_TTL,
+    RAG_PRECOMPUTE_AGENT_QUERIES
 )
+from app.cache import VersionedLRUCache
+from app.rag.query_cache import normalize_query
+from app.rag.metadata_filter import Filters, normalize_filters
+from app.rag.snapshot import IndexSnapshot, ReusedVectorEmbeddings, collect_chunks
 
 
-# Global vector store and retriever
-_vectorstore = None
-_retriever = None
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+SEARCH_BACKENDS = ("chroma", "numpy")
+CHUNKERS = ("markdown", "recursive")
+
+CHROMA_COLLECTION_PREFIX = "hercycle_"
+
+# The live index. Reloads build a new snapshot and swap it in with one
+# assignment; queries read this global once and use that snapshot throughout
+_snapshot: Optional[IndexSnapshot] = None
+_build_options: Optional[dict] = None
+_reload_lock = threading.Lock()
 _embeddings = None
+_query_cache = VersionedLRUCache(max_entries=RAG_QUERY_CACHE_SIZE, ttl_seconds=RAG_QUERY_CACHE_TTL)
 
 
 def _get_embeddings():
-    """Get or create embeddings model"""
+    """Get or create embeddings model (wrapped in the on-disk embedding cache)"""
     global _embeddings
     if _embeddings is None:
         # Set environment variable for Google SDK
@@ -39,13 +74,231 @@ def _get_embeddings():
             # Use a simple mock embedding for development
             from langchain_community.embeddings import FakeEmbeddings
             _embeddings = FakeEmbeddings(size=384)
+        
+        # Share embeddings across rebuilds, re-chunking and queries
+        if EMBEDDING_CACHE_ENABLED:
+            from app.rag.embedding_cache import CachedEmbeddings
+            _embeddings = CachedEmbeddings(_embeddings, EMBEDDING_CACHE_PATH)
     return _embeddings
 
 
+def _compute_index_version(chunks: list, embeddings) -> str:
+    """Fingerprint of the chunk set and embedding model, used to version derived indexes"""
+    import hashlib
+    import json
+    from app.rag.embedding_cache import embedding_model_name
+    from app.rag.ingest import chunk_id
+    
+    model = embedding_model_name(getattr(embeddings, "embeddings", embeddings))
+    digest = hashlib.sha256(model.encode("utf-8"))
+    # Metadata is part of the version so filter partitions never go stale
+    for entry in sorted(
+        chunk_id(doc) + json.dumps(doc.metadata, sort_keys=True, default=str)
+        for doc in chunks
+    ):
+        digest.update(entry.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _build_chroma_store(chunks: list, embeddings, persist_dir: str, index_version: str, previous=None):
+    """
+    Open the Chroma collection for this index version, embedding and upserting
+    the chunks unless a previous run already filled it.
+    """
+    from app.rag.ingest import chunk_id, index_chunks
+    vectorstore = Chroma(
+        collection_name=f"{CHROMA_COLLECTION_PREFIX}{index_version[:16]}",
+        persist_directory=persist_dir,
+        embedding_function=embeddings
+    )
+    if not chunks:
+        return vectorstore
+    if vectorstore._collection.count() >= len({chunk_id(doc) for doc in chunks}):
+        print(f"Loading Chroma collection {vectorstore._collection.name}")
+        return vectorstore
+    
+    reused = ReusedVectorEmbeddings(embeddings, previous)
+    stats = index_chunks(
+        vectorstore,
+        chunks,
+        reused,
+        batch_size=EMBED_BATCH_SIZE,
+        max_concurrency=EMBED_MAX_CONCURRENCY,
+        max_retries=EMBED_MAX_RETRIES
+    )
+    print(f"Embedded {stats['chunks']} chunks in {stats['seconds']:.2f}s "
+          f"({stats['chunks_per_second']:.1f} chunks/s)")
+    if previous is not None:
+        print(f"Reused {reused.reused} stored vectors, embedded {reused.embedded} new chunks")
+    return vectorstore
+
+
+def _build_numpy_index(chunks: list, embeddings, persist_dir: str, index_version: str, previous=None):
+    """Open the mmap index for this index version, embedding and writing it if missing"""
+    from pathlib import Path
+    from app.rag.ingest import embed_matrix
+    from app.rag.numpy_index import NumpyVectorIndex
+    
+    index_dir = Path(persist_dir) / "numpy" / f"{index_version[:16]}-{RAG_VECTOR_DTYPE}"
+    if (index_dir / "meta.json").exists():
+        print(f"Loading NumPy index from {index_dir}")
+        return NumpyVectorIndex(str(index_dir), nprobe=RAG_ANN_NPROBE, rescore=RAG_RESCORE_FACTOR)
+    
+    reused = ReusedVectorEmbeddings(embeddings, previous)
+    unique, vectors = embed_matrix(
+        chunks,
+        reused,
+        batch_size=EMBED_BATCH_SIZE,
+        max_concurrency=EMBED_MAX_CONCURRENCY,
+        max_retries=EMBED_MAX_RETRIES
+    )
+    if previous is not None:
+        print(f"Reused {reused.reused} stored vectors, embedded {reused.embedded} new chunks")
+    return NumpyVectorIndex.build(
+        str(index_dir),
+        vectors,
+        unique,
+        dtype=RAG_VECTOR_DTYPE,
+        ann_threshold=RAG_ANN_THRESHOLD,
+        nprobe=RAG_ANN_NPROBE,
+        rescore=RAG_RESCORE_FACTOR
+    )
+
+
+def _prune_stale_indexes(persist_dir: str, keep: list) -> None:
+    """Delete index versions other than the given snapshots' (the live one and the one it replaced)"""
+    import re
+    import shutil
+    from pathlib import Path
+    
+    prefixes = {snapshot.version[:16] for snapshot in keep if snapshot is not None}
+    for snapshot in keep:
+        if snapshot is not None and snapshot.vectorstore is not None:
+            client = snapshot.vectorstore._client
+            for collection in client.list_collections():
+                name = collection.name
+                if name.startswith(CHROMA_COLLECTION_PREFIX) and name[len(CHROMA_COLLECTION_PREFIX):] not in prefixes:
+                    client.delete_collection(name)
+            break
+    
+    numpy_dir = Path(persist_dir) / "numpy"
+    if numpy_dir.is_dir():
+        for index_dir in numpy_dir.iterdir():
+            if re.fullmatch(r"[0-9a-f]{16}-\w+", index_dir.name) and index_dir.name[:16] not in prefixes:
+                shutil.rmtree(index_dir, ignore_errors=True)
+
+
+def _make_splitter(chunker: str, chunk_tokens: int, chunk_size: int, chunk_overlap: int):
+    if chunker == "markdown":
+        from app.rag.chunker import MarkdownChunker
+        return MarkdownChunker(max_tokens=chunk_tokens)
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len
+    )
+
+
+def _build_snapshot(
+    options: dict,
+    previous: Optional[IndexSnapshot] = None,
+    lexical_first: bool = False
+) -> IndexSnapshot:
+    """
+    Build a complete index snapshot from the corpus.
+    
+    With a previous snapshot, unchanged files keep their chunks and unchanged
+    chunks keep their vectors; only changed files are re-read and re-chunked
+    and only new chunk texts are embedded. Returns the previous snapshot
+    itself when the chunk set did not change.
+    
+    With lexical_first, a lexical-only snapshot goes live as soon as the BM25
+    index exists, so a cold start answers queries while embedding runs.
+    """
+    global _snapshot
+    embeddings = _get_embeddings()
+    text_splitter = _make_splitter(
+        options["chunker"], options["chunk_tokens"], options["chunk_size"], options["chunk_overlap"]
+    )
+    
+    # Changed files are streamed and split one document at a time, so raw
+    # documents are never all held in memory at once
+    sources, changed = collect_chunks(
+        options["corpus_dir"],
+        options["scraped_json"],
+        lambda document: text_splitter.split_documents([document]),
+        previous=previous.sources if previous is not None else None,
+        max_workers=CORPUS_LOADER_WORKERS
+    )
+    
+    # Near-duplicate chunks are dropped before they cost an embedding
+    from app.rag.dedup import NearDuplicateFilter
+    dedup = NearDuplicateFilter(threshold=RAG_DEDUP_THRESHOLD) if RAG_DEDUP_ENABLED else None
+    chunks = [
+        chunk
+        for source in sources.values()
+        for chunk in source["chunks"]
+        if dedup is None or dedup.keep(chunk)
+    ]
+    
+    if not sources:
+        print("Warning: No documents found for vector store initialization")
+    else:
+        print(f"Split {len(sources)} files into {len(chunks)} chunks "
+              f"({len(changed)} re-read, {len(sources) - len(changed)} unchanged)")
+    if dedup is not None and dedup.dropped:
+        stats = dedup.stats(EMBED_BATCH_SIZE)
+        print(f"Dropped {stats['dropped']}/{stats['chunks']} near-duplicate chunks "
+              f"({stats['reduction']:.0%}, {stats['embedding_requests_saved']} embedding requests saved)")
+    
+    index_version = _compute_index_version(chunks, embeddings)
+    if previous is not None and previous.version == index_version:
+        # Touched but not edited: remember the new mtimes so the next reload skips hashing
+        previous.sources = sources
+        return previous
+    
+    # Build the BM25 inverted index over the same chunks
+    from app.rag.lexical_index import BM25Index
+    lexical_index = BM25Index(chunks)
+    if lexical_first:
+        _snapshot = IndexSnapshot(index_version, sources, lexical_index, options["backend"], lexical_only=True)
+        print(f"Lexical search ready over {len(chunks)} chunks (embedding in progress)")
+    
+    persist_dir = options["persist_dir"]
+    if options["backend"] == "numpy":
+        numpy_index = (
+            _build_numpy_index(chunks, embeddings, persist_dir, index_version, previous)
+            if chunks else None
+        )
+        return IndexSnapshot(index_version, sources, lexical_index, "numpy", numpy_index=numpy_index)
+    vectorstore = _build_chroma_store(chunks, embeddings, persist_dir, index_version, previous)
+    return IndexSnapshot(index_version, sources, lexical_index, "chroma", vectorstore=vectorstore)
+
+
+def _publish(snapshot: IndexSnapshot, previous: Optional[IndexSnapshot]) -> None:
+    """Warm up a new snapshot, swap it in, and drop index versions older than the previous one"""
+    global _snapshot
+    # Warm up: take the agents' fixed query space off the request path
+    # before the snapshot serves its first query
+    if RAG_PRECOMPUTE_AGENT_QUERIES:
+        precompute_agent_queries(snapshot=snapshot)
+    _snapshot = snapshot
+    try:
+        _prune_stale_indexes(_build_options["persist_dir"], [snapshot, previous])
+    except Exception as e:
+        print(f"Warning: Could not prune stale index versions: {e}")
+
+
 def init_vector_store(
     corpus_dir: str,
     scraped_json: str,
-    persist_dir: str = VECTOR_STORE_PATH
+    persist_dir: str = VECTOR_STORE_PATH,
+    embeddings=None,
+    backend: Optional[str] = None,
+    chunker: Optional[str] = None,
+    chunk_tokens: int = RAG_CHUNK_TOKENS,
+    chunk_size: int = RAG_CHUNK_SIZE,
+    chunk_overlap: int = RAG_CHUNK_OVERLAP
 ) -> None:
     """
     Initialize the vector store with documents from corpus directory and scraped JSON.
@@ -54,86 +307,371 @@ def init_vector_store(
         corpus_dir: Path to directory containing .md/.txt files
         scraped_json: Path to JSON file with scraped resources
         persist_dir: Path where Chroma will persist data
+        embeddings: Optional embeddings model to use instead of Gemini
+            (e.g. a deterministic local model for benchmarks)
+        backend: "chroma" or "numpy" (in-process mmap index).
+            Defaults to RAG_SEARCH_BACKEND.
+        chunker: "markdown" (headings and paragraphs within a token budget)
+            or "recursive" (character windows). Defaults to RAG_CHUNKER.
+        chunk_tokens: Token budget per chunk for the markdown chunker
+        chunk_size: Maximum characters per chunk for the recursive chunker
+        chunk_overlap: Characters shared by consecutive recursive chunks
     """
-    global _vectorstore, _retriever
+    global _embeddings, _build_options
     
-    print(f"Initializing vector store at {persist_dir}...")
+    backend = backend or RAG_SEARCH_BACKEND
+    if backend not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown search backend '{backend}', expected one of {SEARCH_BACKENDS}")
+    chunker = chunker or RAG_CHUNKER
+    if chunker not in CHUNKERS:
+        raise ValueError(f"Unknown chunker '{chunker}', expected one of {CHUNKERS}")
+    
+    print(f"Initializing vector store at {persist_dir} ({backend} backend)...")
     
     # Get embeddings model
-    embeddings = _get_embeddings()
+    if embeddings is not None:
+        _embeddings = embeddings
     
-    # Load corpus
-    from app.rag.corpus_loader import load_corpus
-    documents = load_corpus(corpus_dir, scraped_json)
+    with _reload_lock:
+        _build_options = {
+            "corpus_dir": corpus_dir,
+            "scraped_json": scraped_json,
+            "persist_dir": persist_dir,
+            "backend": backend,
+            "chunker": chunker,
+            "chunk_tokens": chunk_tokens,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap
+        }
+        snapshot = _build_snapshot(_build_options, lexical_first=_snapshot is None)
+        _publish(snapshot, None)
     
-    if not documents:
-        print("Warning: No documents found for vector store initialization")
-        # Create empty vector store
-        _vectorstore = Chroma(
-            persist_directory=persist_dir,
-            embedding_function=embeddings
+    print(f"Vector store initialized with {len(snapshot.chunks)} chunks")
+
+
+def reload_vector_store() -> bool:
+    """
+    Incrementally rebuild the index from the corpus and swap it in atomically.
+    
+    Only changed files are re-chunked and only new chunks are embedded.
+    Queries already running keep the snapshot they started with; queries
+    arriving after the swap see the new one.
+    
+    Returns:
+        True if a new index version was published, False if nothing changed
+    """
+    if _build_options is None:
+        raise RuntimeError("Vector store not initialized. Call init_vector_store first.")
+    with _reload_lock:
+        previous = _snapshot
+        snapshot = _build_snapshot(_build_options, previous)
+        if snapshot is previous:
+            print("Corpus unchanged, keeping index version "
+                  f"{previous.version[:16] if previous is not None else None}")
+            return False
+        _publish(snapshot, previous)
+    print(f"Vector store reloaded with {len(snapshot.chunks)} chunks (version {snapshot.version[:16]})")
+    return True
+
+
+def get_snapshot() -> Optional[IndexSnapshot]:
+    """The index snapshot currently serving queries (None before initialization)"""
+    return _snapshot
+
+
+def _require_snapshot() -> IndexSnapshot:
+    snapshot = _snapshot
+    if snapshot is None:
+        raise RuntimeError("Vector store not initialized. Call init_vector_store first.")
+    return snapshot
+
+
+def get_index_version() -> Optional[str]:
+    """Fingerprint of the currently loaded index (None before initialization)"""
+    snapshot = _snapshot
+    return snapshot.version if snapshot is not None else None
+
+
+def get_retriever():
+    """
+    Get the retriever object for RAG queries.
+    
+    Returns:
+        LangChain retriever object
+    """
+    snapshot = _snapshot
+    if snapshot is None or snapshot.retriever is None:
+        raise RuntimeError(
+            "Retriever not available. Call init_vector_store first with the chroma backend."
         )
-        _retriever = _vectorstore.as_retriever(search_kwargs={"k": 3})
-        return
+    return snapshot.retriever
+
+
+def _vector_search_batch(snapshot: IndexSnapshot, queries: list) -> list:
+    """
+    Dense search for several (query, k, filters) triples.
     
-    # Split documents into chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len
-    )
+    All query texts go to the embedding model in one request. The NumPy
+    backend then scores every query with one matrix multiply; Chroma runs
+    one query call per distinct metadata filter.
+    """
+    from app.rag.embedding_cache import embed_queries
     
-    chunks = text_splitter.split_documents(documents)
-    print(f"Split {len(documents)} documents into {len(chunks)} chunks")
+    results = [[] for _ in queries]
+    numpy_index = snapshot.numpy_index
+    if numpy_index is not None:
+        rows_list = [numpy_index.partitions.rows(filters) for _, _, filters in queries]
+        live = [i for i, rows in enumerate(rows_list) if rows is None or len(rows)]
+        if live:
+            vectors = embed_queries(_get_embeddings(), [queries[i][0] for i in live])
+            hits = numpy_index.search_batch(
+                vectors, [queries[i][1] for i in live], [rows_list[i] for i in live]
+            )
+            for i, found in zip(live, hits):
+                results[i] = [numpy_index.documents[idx] for idx, _ in found]
+        return results
     
-    # Create or load vector store
-    _vectorstore = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=persist_dir
-    )
+    vectorstore = snapshot.vectorstore
+    if vectorstore is None:
+        # NumPy backend over an empty corpus
+        return results
+    import json
+    from langchain.docstore.document import Document
     
-    # Create retriever
-    _retriever = _vectorstore.as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": 3}
-    )
+    wheres = [snapshot.lexical_index.partitions.chroma_where(filters) for _, _, filters in queries]
+    live = [i for i, where in enumerate(wheres) if where != {}]
+    if not live:
+        return results
+    vectors = embed_queries(_get_embeddings(), [queries[i][0] for i in live])
+    
+    groups = {}
+    for i, vector in zip(live, vectors):
+        groups.setdefault(json.dumps(wheres[i], sort_keys=True), []).append((i, vector))
+    count = vectorstore._collection.count()
+    for group in groups.values():
+        n_results = min(count, max(queries[i][1] for i, _ in group))
+        if n_results == 0:
+            continue
+        found = vectorstore._collection.query(
+            query_embeddings=[vector for _, vector in group],
+            n_results=n_results,
+            where=wheres[group[0][0]],
+            include=["documents", "metadatas"]
+        )
+        for (i, _), texts, metadatas in zip(group, found["documents"], found["metadatas"]):
+            results[i] = [
+                Document(page_content=text, metadata=metadata or {})
+                for text, metadata in zip(texts, metadatas)
+            ][:queries[i][1]]
+    return results
+
+
+def _lexical_search(snapshot: IndexSnapshot, query: str, k: int, filters: Filters = None) -> list:
+    """BM25 search against the local inverted index"""
+    lexical_index = snapshot.lexical_index
+    rows = lexical_index.partitions.rows(filters)
+    return [lexical_index.documents[idx] for idx, _ in lexical_index.search(query, k=k, rows=rows)]
+
+
+def _hybrid_candidates(snapshot: IndexSnapshot, k: int) -> int:
+    """Candidates pulled from each ranker for hybrid search (deeper than k)"""
+    n_candidates = max(k * 4, 10)
+    if len(snapshot.lexical_index):
+        n_candidates = max(k, min(n_candidates, len(snapshot.lexical_index)))
+    return n_candidates
+
+
+def _fuse(dense: list, lexical: list, k: int) -> list:
+    """Fuse dense and BM25 rankings with reciprocal-rank fusion"""
+    from app.rag.ingest import chunk_id
+    from app.rag.lexical_index import reciprocal_rank_fusion
     
-    print(f"Vector store initialized with {len(chunks)} chunks")
+    by_id = {}
+    rankings = []
+    for ranked_docs in (dense, lexical):
+        ids = []
+        for doc in ranked_docs:
+            doc_id = chunk_id(doc)
+            by_id.setdefault(doc_id, doc)
+            ids.append(doc_id)
+        rankings.append(ids)
+    
+    return [by_id[doc_id] for doc_id in reciprocal_rank_fusion(rankings, k)]
 
 
-def get_retriever():
+def _run_batch(snapshot: IndexSnapshot, queries: list, mode: str) -> tuple[list[list[dict]], bool]:
     """
-    Get the retriever object for RAG queries.
+    Search one index snapshot for several (query, k, filters) triples in the given mode.
     
     Returns:
-        LangChain retriever object
+        (results per query, degraded) where degraded means dense retrieval
+        failed or isn't built yet and the lexical fallback answered instead
     """
-    if _retriever is None:
-        raise RuntimeError("Vector store not initialized. Call init_vector_store first.")
-    return _retriever
+    degraded = False
+    if mode == "lexical":
+        found = [_lexical_search(snapshot, query, k, filters) for query, k, filters in queries]
+    elif snapshot.lexical_only:
+        # Cold start: embeddings are still being built
+        found = [_lexical_search(snapshot, query, k, filters) for query, k, filters in queries]
+        degraded = True
+    else:
+        try:
+            if mode == "vector":
+                found = _vector_search_batch(snapshot, queries)
+            else:
+                depths = [_hybrid_candidates(snapshot, k) for _, k, _ in queries]
+                dense = _vector_search_batch(snapshot, [
+                    (query, depth, filters) for (query, _, filters), depth in zip(queries, depths)
+                ])
+                found = [
+                    _fuse(dense_docs, _lexical_search(snapshot, query, depth, filters), k)
+                    for dense_docs, (query, k, filters), depth in zip(dense, queries, depths)
+                ]
+        except Exception as e:
+            # Embedding service unavailable - keyword search still answers the queries
+            print(f"Warning: Dense retrieval failed, falling back to lexical search: {e}")
+            found = [_lexical_search(snapshot, query, k, filters) for query, k, filters in queries]
+            degraded = True
+    
+    formatted = [
+        [
+            {
+                "content": doc.page_content,
+                "metadata": doc.metadata
+            }
+            for doc in docs
+        ]
+        for docs in found
+    ]
+    return formatted, degraded
 
 
-def query_knowledge(query: str, k: int = 3) -> list[dict]:
+def precompute_agent_queries(mode: Optional[str] = None, snapshot: Optional[IndexSnapshot] = None) -> int:
+    """
+    Precompute results for every query the agents can generate.
+    
+    Run after each index (re)build so plan generation never pays for an
+    embedding call or a search on these queries.
+    
+    Args:
+        mode: Search mode to precompute (defaults to RAG_SEARCH_MODE)
+        snapshot: Snapshot to warm up (defaults to the live one)
+        
+    Returns:
+        Number of precomputed queries
+    """
+    from app.rag.query_templates import agent_queries
+    
+    mode = mode or RAG_SEARCH_MODE
+    snapshot = snapshot or _require_snapshot()
+    queries = agent_queries()
+    results, degraded = _run_batch(snapshot, queries, mode)
+    precomputed = {} if degraded else {
+        (normalize_query(query), k, mode, normalize_filters(filters)): found
+        for (query, k, filters), found in zip(queries, results)
+    }
+    
+    # Swap in one assignment so readers never see a half-built table
+    snapshot.precomputed = precomputed
+    print(f"Precomputed retrieval results for {len(precomputed)} agent queries")
+    return len(precomputed)
+
+
+def query_knowledge(
+    query: str,
+    k: int = 3,
+    mode: Optional[str] = None,
+    filters: Filters = None
+) -> list[dict]:
     """
     Query the knowledge base and return relevant documents.
     
     Args:
         query: Search query
         k: Number of results to return
+        mode: "vector" (dense only), "lexical" (BM25 only) or "hybrid"
+            (reciprocal-rank fusion of both). Defaults to RAG_SEARCH_MODE.
+        filters: Restrict the search to a metadata slice, e.g.
+            {"topic": ["nutrition_*", "cramps_relief"], "type": "scraped_article"}
+            (glob patterns OR-ed within a field, fields AND-ed)
         
     Returns:
         List of dicts with 'content' and 'metadata'
     """
-    if _vectorstore is None:
-        raise RuntimeError("Vector store not initialized. Call init_vector_store first.")
+    return query_knowledge_batch([(query, k, filters)], mode=mode)[0]
+
+
+def query_knowledge_batch(queries: list, mode: Optional[str] = None) -> list[list[dict]]:
+    """
+    Query the knowledge base for several queries in one round trip.
     
-    results = _vectorstore.similarity_search(query, k=k)
+    Queries not answered by the precomputed table or the result cache are
+    embedded in a single request and searched together.
     
-    return [
-        {
-            "content": doc.page_content,
-            "metadata": doc.metadata
-        }
-        for doc in results
-    ]
+    Args:
+        queries: (query, k, filters) triples, as in query_knowledge
+        mode: Search mode for every query. Defaults to RAG_SEARCH_MODE.
+        
+    Returns:
+        One list of dicts with 'content' and 'metadata' per query, in order
+    """
+    mode = mode or RAG_SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+    
+    # Pin one snapshot for the whole batch: a reload swapping in a new index
+    # meanwhile doesn't affect these queries. Cached results are scoped to
+    # the index version, so a rebuild invalidates them
+    snapshot = _require_snapshot()
+    results = [None] * len(queries)
+    misses = {}
+    for i, (query, k, filters) in enumerate(queries):
+        cache_key = (normalize_query(query), k, mode, normalize_filters(filters))
+        precomputed = snapshot.precomputed.get(cache_key)
+        if precomputed is not None:
+            results[i] = precomputed
+            continue
+        cached = _query_cache.get(snapshot.version, cache_key)
+        if cached is not None:
+            results[i] = cached
+            continue
+        misses.setdefault(cache_key, []).append(i)
+    
+    if misses:
+        pending = [queries[indices[0]] for indices in misses.values()]
+        found, degraded = _run_batch(snapshot, pending, mode)
+        # Don't pin fallback results in place of the real ones, or fill the
+        # cache with a version that was swapped out mid-query
+        store = not degraded and snapshot is _snapshot
+        for (cache_key, indices), formatted in zip(misses.items(), found):
+            if store:
+                _query_cache.put(snapshot.version, cache_key, formatted)
+            for i in indices:
+                results[i] = formatted
+    # Hits are shared with the cache and the precomputed table; callers get their own copies
+    return [[{**hit, "metadata": dict(hit["metadata"])} for hit in r] for r in results]
+
+
+def prefetch_plan_knowledge(daily_log: Optional[dict]) -> dict[str, list[dict]]:
+    """
+    Retrieve the RAG context for every agent in a plan run in one batch.
+    
+    Args:
+        daily_log: Today's check-in (the agents derive their queries from it)
+        
+    Returns:
+        Dict of agent name -> query_knowledge results
+    """
+    from app.rag.query_templates import plan_queries
+    
+    queries = plan_queries(daily_log)
+    results = query_knowledge_batch(list(queries.values()))
+    return dict(zip(queries, results))
+
+
+def get_query_cache_stats() -> dict:
+    """Hit-rate metrics for the query_knowledge result cache"""
+    stats = _query_cache.stats()
+    snapshot = _snapshot
+    stats["precomputed_queries"] = len(snapshot.precomputed) if snapshot is not None else 0
+    return stats
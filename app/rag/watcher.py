@@ -0,0 +1,117 @@
+"""
+Polling watcher that hot-reloads the RAG index when the corpus changes.
+
+Polls file mtimes and sizes (no inotify dependency, works on network mounts
+and in containers) and confirms a change by content hash before reloading,
+so a touch or a checkout that rewrites identical bytes costs no rebuild.
+"""
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.rag.snapshot import file_hash
+
+
+def _watched_paths(corpus_dir: str, scraped_json: str) -> List[Path]:
+    from app.rag.corpus_loader import corpus_file_paths
+    paths = corpus_file_paths(corpus_dir)
+    if Path(scraped_json).is_file():
+        paths.append(Path(scraped_json))
+    return paths
+
+
+class CorpusWatcher:
+    """
+    Background thread calling on_change when corpus content changes.
+
+    Args:
+        corpus_dir: Directory with .md/.txt files
+        scraped_json: Scraped resources file
+        on_change: Called (from the watcher thread) after files were added,
+            removed or edited; exceptions are logged and the watcher keeps going
+        interval: Seconds between polls
+        sources: Per-file {"stat", "hash"} of the index already built
+            (IndexSnapshot.sources), so edits made before the watcher
+            started are not missed
+    """
+
+    def __init__(
+        self,
+        corpus_dir: str,
+        scraped_json: str,
+        on_change: Callable[[], object],
+        interval: float = 5.0,
+        sources: Optional[Dict[str, dict]] = None
+    ):
+        self.corpus_dir = corpus_dir
+        self.scraped_json = scraped_json
+        self.on_change = on_change
+        self.interval = interval
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self._hashes: Dict[str, str] = {}
+        for key, source in (sources or {}).items():
+            self._stats[key] = source["stat"]
+            self._hashes[key] = source["hash"]
+        if sources is None:
+            self.poll()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _scan(self) -> Tuple[Dict[str, Tuple[int, int]], Dict[str, str], bool]:
+        """New (stats, hashes) for the corpus and whether content changed, without recording them"""
+        paths = _watched_paths(self.corpus_dir, self.scraped_json)
+        current = {str(path) for path in paths}
+        stats = {key: stat for key, stat in self._stats.items() if key in current}
+        hashes = {key: digest for key, digest in self._hashes.items() if key in current}
+        changed = len(stats) < len(self._stats)
+        for path in paths:
+            key = str(path)
+            try:
+                stat = path.stat()
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if stats.get(key) == signature:
+                    continue
+                digest = file_hash(path)
+            except OSError:
+                # Deleted or replaced between listing and reading; next poll sees it
+                continue
+            stats[key] = signature
+            if hashes.get(key) != digest:
+                hashes[key] = digest
+                changed = True
+        return stats, hashes, changed
+
+    def poll(self, on_change: Optional[Callable[[], object]] = None) -> bool:
+        """
+        Check the corpus once, updating the recorded state.
+
+        Args:
+            on_change: Called when content changed; the new state is only
+                recorded once it returns, so if it raises the next poll
+                sees the same change again and retries
+
+        Returns:
+            True when a file was added, removed, or its content changed
+        """
+        stats, hashes, changed = self._scan()
+        if changed and on_change is not None:
+            on_change()
+        self._stats, self._hashes = stats, hashes
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll(self.on_change)
+            except Exception as e:
+                print(f"Warning: Corpus reload failed (retrying on the next poll): {e}")
+
+    def start(self) -> "CorpusWatcher":
+        self._thread = threading.Thread(target=self._run, name="corpus-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,82 @@
+"""
+Readiness tracking for startup work that runs in the background.
+Lets the server accept requests immediately while /health reports which
+components (vector store, ML model) are still loading or failed.
+"""
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+_lock = threading.Lock()
+_components: dict[str, dict[str, Any]] = {}
+
+
+def register(component: str, required: bool = True) -> None:
+    """Declare a component; required components gate overall readiness"""
+    with _lock:
+        _components[component] = {"status": PENDING, "required": required, "error": None, "seconds": None}
+
+
+def set_status(component: str, status: str, error: Optional[str] = None, seconds: Optional[float] = None) -> None:
+    """Update a component's status (registering it as required if unknown)"""
+    with _lock:
+        entry = _components.setdefault(
+            component, {"status": PENDING, "required": True, "error": None, "seconds": None}
+        )
+        entry.update({"status": status, "error": error, "seconds": seconds})
+
+
+def get_status(component: str) -> str:
+    with _lock:
+        entry = _components.get(component)
+        return entry["status"] if entry else PENDING
+
+
+def is_ready(component: str) -> bool:
+    return get_status(component) == READY
+
+
+def readiness() -> dict:
+    """Overall readiness plus per-component detail"""
+    with _lock:
+        components = {name: dict(entry) for name, entry in _components.items()}
+    ready = all(c["status"] == READY for c in components.values() if c["required"])
+    return {"ready": ready, "components": components}
+
+
+def run_in_background(component: str, fn: Callable[[], Any], required: bool = True) -> threading.Thread:
+    """
+    Run a startup task in a daemon thread and track its readiness.
+
+    Args:
+        component: Name reported in /health
+        fn: Zero-argument callable doing the work
+        required: Whether the service is "ready" only once this succeeds
+
+    Returns:
+        The started thread
+    """
+    register(component, required=required)
+
+    def _task():
+        set_status(component, LOADING)
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            print(f"Warning: {component} initialization failed: {e}")
+            set_status(component, FAILED, error=str(e), seconds=time.perf_counter() - started)
+        else:
+            elapsed = time.perf_counter() - started
+            print(f"✓ {component} ready in {elapsed:.2f}s")
+            set_status(component, READY, seconds=elapsed)
+
+    thread = threading.Thread(target=_task, name=f"init-{component}", daemon=True)
+    thread.start()
+    return thread
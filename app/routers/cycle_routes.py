@@ -6,6 +6,7 @@ from pydantic import BaseModel
 from datetime import date, datetime, timedelta
 from typing import Optional
 
+from app.cycle_estimator import get_estimator
 from app.state import get_state, set_state, save_state_to_file
 
 router = APIRouter(prefix="/cycles", tags=["cycles"])
@@ -28,6 +29,7 @@ class CycleLog(BaseModel):
 async def set_current_cycle(tracking: CycleTracking):
     """Set current cycle tracking information"""
     state = get_state()
+    cycle_length = get_estimator(state).cycle_length
     
     current_cycle = {
         "is_on_period": tracking.is_on_period,
@@ -42,15 +44,15 @@ async def set_current_cycle(tracking: CycleTracking):
             days_diff = (datetime.now() - period_start).days + 1
 
             # If the provided date is very old (e.g. > 60 days), map it into the current
-            # 28-day cycle using modulo arithmetic rather than returning a huge day count
+            # cycle (the user's estimated length) rather than returning a huge day count
             if days_diff > 60:
-                # Map into 1..28 range
-                wrapped_day = ((days_diff - 1) % 28) + 1
+                # Map into 1..cycle_length range
+                wrapped_day = ((days_diff - 1) % cycle_length) + 1
                 current_cycle["period_start_date"] = tracking.period_start_date
                 current_cycle["current_day"] = wrapped_day
                 current_cycle["note"] = (
                     "Provided period_start_date is more than 60 days ago; "
-                    "estimating current day using a 28-day cycle."
+                    f"estimating current day using a {cycle_length}-day cycle."
                 )
             else:
                 current_cycle["period_start_date"] = tracking.period_start_date
@@ -66,12 +68,13 @@ async def set_current_cycle(tracking: CycleTracking):
         current_cycle["last_period_start"] = last_period_date.isoformat()
         current_cycle["current_day"] = tracking.days_since_last_period
         
-        # Estimate phase (rough calculation)
+        # Estimate phase (rough calculation; the luteal phase is ~14 days
+        # whatever the cycle length, so ovulation moves with it)
         if tracking.days_since_last_period <= 7:
             current_cycle["estimated_phase"] = "follicular"
-        elif tracking.days_since_last_period <= 14:
+        elif tracking.days_since_last_period <= cycle_length - 14:
             current_cycle["estimated_phase"] = "ovulatory"
-        elif tracking.days_since_last_period <= 28:
+        elif tracking.days_since_last_period <= cycle_length:
             current_cycle["estimated_phase"] = "luteal"
         else:
             current_cycle["estimated_phase"] = "late_luteal"
@@ -97,6 +100,11 @@ async def log_cycle(cycle: CycleLog):
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
+    # Update the cycle length estimate (O(1); built from history on first use)
+    estimator = get_estimator(state)
+    estimator.log_start(cycle.start_date)
+    state["cycle_estimate"] = estimator.to_dict()
+    
     # Add cycle to history
     cycle_data = cycle.model_dump()
     state["cycles"].append(cycle_data)
@@ -111,7 +119,8 @@ async def log_cycle(cycle: CycleLog):
     return {
         "message": "Cycle logged successfully",
         "cycle": cycle_data,
-        "total_cycles": len(state["cycles"])
+        "total_cycles": len(state["cycles"]),
+        "cycle_length_estimate": estimator.summary()
     }
 
 
@@ -154,13 +163,16 @@ async def get_current_cycle():
     estimated_phase = current_cycle.get("estimated_phase", "unknown")
     is_on_period = current_cycle.get("is_on_period", False)
     
-    # Calculate days until next period (rough estimate assuming 28-day cycle)
+    # Calculate days until next period from the user's estimated cycle length
+    # (the population prior until cycles are logged)
+    estimator = get_estimator(state)
+    cycle_length = estimator.cycle_length
     days_until_period = None
     if not is_on_period and cycle_day:
-        # Estimate next period in about 28 days from last period start
-        days_until_period = max(0, 28 - cycle_day)
+        # Estimate next period one cycle length after the last period start
+        days_until_period = max(0, cycle_length - cycle_day)
     elif is_on_period:
-        days_until_period = 28  # Next cycle
+        days_until_period = cycle_length  # Next cycle
     
     # Format phase name for display
     phase_names = {
@@ -176,5 +188,6 @@ async def get_current_cycle():
         "phase": phase_names.get(estimated_phase, "Unknown Phase"),
         "days_until_period": days_until_period,
         "is_on_period": is_on_period,
+        "cycle_length_estimate": estimator.summary(),
         "last_updated": current_cycle.get("last_updated")
     }
@@ -0,0 +1,120 @@
+"""
+Cycle prediction routes (ML model prediction, SHAP explanations and model versions)
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+router = APIRouter(prefix="/predict", tags=["predict"])
+
+
+class PredictionRequest(BaseModel):
+    features: Dict[str, Any]  # model inputs, e.g. {"Age": 25, "BMI": 22.5, ...}
+    explain: Optional[str] = "deferred"  # full, approximate, deferred or none
+    top_k: Optional[int] = 10
+
+
+# Model inference is CPU-bound, so these are sync endpoints (run in the threadpool)
+@router.post("/cycle")
+def predict_cycle(request: PredictionRequest):
+    """
+    Predict days until the next cycle.
+    "personalized" blends the forest's population-level prediction with the
+    user's own cycle length estimate (see app/cycle_estimator.py).
+    With explain="deferred" the prediction returns right away together with
+    an explanation_id; fetch the SHAP explanation from /predict/explanations/{id}.
+    With ML_PREDICTION_CACHE_QUANTIZE=true, inputs within a rounding step of
+    an earlier request (e.g. BMI 0.1, sleep 0.5 h) get that request's result.
+    """
+    from app.ml_cycle_predictor import (
+        CATEGORICAL_FEATURES, NUMERIC_FEATURES, EXPLAIN_MODES, run_cycle_prediction
+    )
+    
+    missing = [f for f in NUMERIC_FEATURES + CATEGORICAL_FEATURES if f not in request.features]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing features: {missing}")
+    if request.explain not in EXPLAIN_MODES:
+        raise HTTPException(status_code=400, detail=f"explain must be one of {list(EXPLAIN_MODES)}")
+    
+    try:
+        result = run_cycle_prediction(request.features, explain=request.explain, top_k=request.top_k)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid features: {e}")
+    
+    result["personalized"] = _personalize(result["prediction_days_until_next_cycle"])
+    return result
+
+
+def _personalize(rf_days: float) -> dict:
+    """Blend the forest's prediction with the user's own cycle length estimate"""
+    import math
+    from app.config import CYCLE_RF_SD
+    from app.cycle_estimator import get_estimator
+    from app.ml_cycle_predictor import get_active_metadata
+    from app.state import get_state
+    
+    # Mean absolute error of normally distributed errors is sd * sqrt(2 / pi)
+    test_mae = get_active_metadata().get("metrics", {}).get("test_mae")
+    rf_sd = test_mae * math.sqrt(math.pi / 2) if test_mae else CYCLE_RF_SD
+    estimator = get_estimator(get_state())
+    blended = estimator.blend(rf_days, rf_sd)
+    return {
+        "prediction_days_until_next_cycle": blended["days"],
+        "sd_days": blended["sd"],
+        "personal_weight": blended["personal_weight"],
+        **estimator.summary()
+    }
+
+
+@router.get("/explanations/{explanation_id}")
+def get_prediction_explanation(explanation_id: str, top_k: int = 10):
+    """Fetch a deferred SHAP explanation (202 while it is still being computed)"""
+    from app.ml_cycle_predictor import get_explanation
+    
+    explanation = get_explanation(explanation_id, top_k=top_k)
+    if explanation is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired explanation id")
+    if explanation["status"] == "pending":
+        return JSONResponse(status_code=202, content=explanation)
+    if explanation["status"] == "failed":
+        return JSONResponse(status_code=500, content=explanation)
+    return explanation
+
+
+@router.get("/models")
+def list_models():
+    """Registered model versions, the active one, and the state of the last swap"""
+    from app.ml_cycle_predictor import get_model_info
+    from app.readiness import readiness
+    
+    info = get_model_info()
+    info["swap"] = readiness()["components"].get("ml_model_swap")
+    return info
+
+
+@router.post("/models/rollback")
+def rollback_model():
+    """Swap back to the previously active version in the background (202; poll GET /predict/models)"""
+    from app.ml_cycle_predictor import get_model_info, rollback_model as rollback
+    from app.readiness import run_in_background
+    
+    target = get_model_info()["rollback_version"]
+    if target is None:
+        raise HTTPException(status_code=409, detail="No previous model version to roll back to")
+    run_in_background("ml_model_swap", rollback, required=False)
+    return JSONResponse(status_code=202, content={"status": "swapping", "version": target})
+
+
+@router.post("/models/{version}/activate")
+def activate_model(version: str):
+    """Load, warm up and swap in a registered version in the background (202; poll GET /predict/models)"""
+    from app.ml_cycle_predictor import activate_model as activate, get_model_info
+    from app.readiness import run_in_background
+    
+    if version not in {meta["version"] for meta in get_model_info()["versions"]}:
+        raise HTTPException(status_code=404, detail=f"Unknown model version '{version}'")
+    run_in_background("ml_model_swap", lambda: activate(version), required=False)
+    return JSONResponse(status_code=202, content={"status": "swapping", "version": version})
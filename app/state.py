@@ -34,6 +34,7 @@ class HerCycleState(TypedDict, total=False):
     profile: ProfileState
     cycles: list[dict[str, Any]]  # List of cycle records
     patterns: dict[str, Any]  # Computed cycle patterns
+    cycle_estimate: Optional[dict[str, Any]]  # Online cycle length posterior (app/cycle_estimator.py)
     daily_log: Optional[dict[str, Any]]  # Today's check-in data
     
     # Current cycle tracking
@@ -84,6 +85,7 @@ CURRENT_STATE: HerCycleState = {
     },
     "cycles": [],
     "patterns": {},
+    "cycle_estimate": None,
     "daily_log": None,
     "current_cycle": None,
     "agent_outputs": {
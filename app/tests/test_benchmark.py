@@ -0,0 +1,67 @@
+"""
+Test retrieval benchmark helpers
+"""
+import sys
+
+import pytest
+
+from app import ml_benchmark, ml_cycle_predictor
+from app.rag.benchmark import (
+    HashingEmbeddings,
+    recall_at_k,
+    reciprocal_rank,
+    write_synthetic_corpus
+)
+from app.rag.corpus_loader import iter_scraped_items
+
+
+def test_metrics():
+    """Test recall@k and reciprocal rank on a hand-labeled ranking"""
+    results = [{"content": "Drink water"}, {"content": "Use a HEATING PAD"}, {"content": "Heat therapy"}]
+    terms = ["heating pad", "heat therapy"]
+    assert recall_at_k(results, terms, n_relevant=4, k=3) == pytest.approx(2 / 3)
+    assert recall_at_k(results, terms, n_relevant=2, k=3) == 1.0
+    assert reciprocal_rank(results, terms) == 0.5
+    assert reciprocal_rank(results, ["magnesium"]) == 0.0
+
+
+def test_synthetic_corpus_is_deterministic(tmp_path):
+    """Test that the synthetic corpus is reproducible and keeps the base items"""
+    base = tmp_path / "base.json"
+    base.write_text('[{"url": "u", "topic": "general", "content": "real article"}]', encoding="utf-8")
+
+    first = list(iter_scraped_items(write_synthetic_corpus(str(tmp_path / "a.jsonl"), 20, str(base))))
+    second = list(iter_scraped_items(write_synthetic_corpus(str(tmp_path / "b.jsonl"), 20, str(base))))
+    assert first == second
+    assert len(first) == 21
+    assert first[0]["content"] == "real article"
+
+
+def test_hashing_embeddings_are_stable():
+    """Test that the local embedding model is deterministic and normalized"""
+    embeddings = HashingEmbeddings(size=64)
+    vector = embeddings.embed_query("magnesium for cramps")
+    assert vector == embeddings.embed_documents(["magnesium for cramps"])[0]
+    assert sum(v * v for v in vector) == pytest.approx(1.0)
+
+
+def test_synthetic_ml_benchmark_leaves_real_dirs_untouched(tmp_path, monkeypatch, capsys):
+    """Test that --synthetic keeps its model, registry and forest export in a temp dir"""
+    forest_dir = tmp_path / "compiled_forest"
+    registry_dir = tmp_path / "registry"
+    monkeypatch.setattr(ml_cycle_predictor, "ML_FOREST_DIR", str(forest_dir))
+    monkeypatch.setattr(ml_cycle_predictor, "ML_REGISTRY_DIR", str(registry_dir))
+    monkeypatch.setattr(ml_cycle_predictor, "_active", None)
+    small = ml_benchmark.train_synthetic_model
+    monkeypatch.setattr(ml_benchmark, "train_synthetic_model",
+                        lambda: small(n_rows=200, n_estimators=5, max_depth=4))
+    monkeypatch.setattr(sys, "argv", ["ml_benchmark", "--synthetic", "--rows", "20", "--repeats", "1"])
+
+    ml_benchmark.main()
+    assert "Batch speedup" in capsys.readouterr().out
+    assert not forest_dir.exists() and not registry_dir.exists()
+    assert ml_cycle_predictor.ML_FOREST_DIR == str(forest_dir)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
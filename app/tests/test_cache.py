@@ -0,0 +1,54 @@
+"""
+Test the versioned LRU/TTL result cache
+"""
+import time
+import pytest
+
+from app.cache import VersionedLRUCache
+
+
+def test_lru_eviction_and_hit_rate():
+    """Test that the least recently used entry is evicted first"""
+    cache = VersionedLRUCache(max_entries=2)
+    cache.put("v1", "a", [1])
+    cache.put("v1", "b", [2])
+    assert cache.get("v1", "a") == [1]  # a is now most recent
+    cache.put("v1", "c", [3])
+
+    assert cache.get("v1", "b") is None
+    assert cache.get("v1", "c") == [3]
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_version_change_invalidates():
+    """Test that entries from an old version are never served"""
+    cache = VersionedLRUCache()
+    cache.put("v1", "q", ["old"])
+    assert cache.get("v2", "q") is None
+    cache.put("v2", "other", ["new"])
+    assert cache.stats()["entries"] == 1
+    assert cache.get("v2", "q") is None
+
+
+def test_stale_version_get_keeps_current_entries():
+    """Test that a lookup pinned to a previous version misses without clearing the live entries"""
+    cache = VersionedLRUCache()
+    cache.put("v2", "q", ["new"])
+    assert cache.get("v1", "q") is None
+    assert cache.stats()["version"] == "v2"
+    assert cache.get("v2", "q") == ["new"]
+
+
+def test_ttl_expiry():
+    """Test that stale entries expire"""
+    cache = VersionedLRUCache(ttl_seconds=0.01)
+    cache.put("v1", "q", ["x"])
+    time.sleep(0.02)
+    assert cache.get("v1", "q") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
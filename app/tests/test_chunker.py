@@ -0,0 +1,70 @@
+"""
+Test structure- and token-aware markdown chunker
+"""
+import pytest
+from langchain.docstore.document import Document
+
+from app.config import RAG_CORPUS_PATH
+from app.rag.chunker import MarkdownChunker, estimate_tokens
+from app.rag.query_templates import EMOTIONAL_CONTEXT_CHARS, NUTRITION_CONTEXT_CHARS
+
+
+MARKDOWN = """# Guide
+
+## Relief
+
+### Heat
+- Heating pad
+- Warm bath
+
+### Movement
+- Walking
+
+## Nutrition
+
+Eat iron-rich foods.
+"""
+
+
+def test_heading_paths_and_section_boundaries():
+    """Test that h2 sections never share a chunk and subsections pack into their parent"""
+    chunks = MarkdownChunker(max_tokens=100).split_text(MARKDOWN)
+    assert [heading for heading, _ in chunks] == ["Guide > Relief", "Guide > Nutrition"]
+    relief = chunks[0][1]
+    assert relief.startswith("Guide > Relief\n### Heat\n- Heating pad")
+    assert "### Movement\n- Walking" in relief
+
+
+def test_budget_respected_and_long_paragraphs_split():
+    """Test that every chunk fits the token budget, splitting at sentence boundaries"""
+    text = "# Long\n\n" + " ".join(f"Sentence number {i} is about cramps." for i in range(60))
+    chunks = MarkdownChunker(max_tokens=50).split_text(text)
+    assert len(chunks) > 1
+    for heading, chunk in chunks:
+        assert heading == "Long"
+        assert estimate_tokens(chunk) <= 50
+        assert chunk.endswith(".")
+
+
+def test_plain_articles_use_title_and_keep_metadata():
+    """Test that scraped articles without headings get their title as heading path"""
+    doc = Document(
+        page_content="First paragraph.\n\nSecond paragraph.",
+        metadata={"title": "Cramp relief", "topic": "cramps_relief"}
+    )
+    [chunk] = MarkdownChunker().split_documents([doc])
+    assert chunk.metadata == {"title": "Cramp relief", "topic": "cramps_relief", "heading_path": "Cramp relief"}
+    assert chunk.page_content == "Cramp relief\nFirst paragraph.\n\nSecond paragraph."
+
+
+@pytest.mark.parametrize("filename", ["menstrual_cycle_basics.md", "pms_pain_management.md"])
+def test_corpus_chunks_fit_agent_context(filename):
+    """Test that curated corpus chunks are injected whole by the agents"""
+    with open(f"{RAG_CORPUS_PATH}/{filename}", encoding="utf-8") as f:
+        chunks = MarkdownChunker(max_tokens=100).split_text(f.read())
+    for _, chunk in chunks:
+        assert len(chunk) <= min(NUTRITION_CONTEXT_CHARS, EMOTIONAL_CONTEXT_CHARS)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,72 @@
+"""
+Test the per-user online cycle length estimator
+"""
+import math
+import pytest
+
+from app.cycle_estimator import CycleLengthEstimator, get_estimator
+
+
+STARTS = ["2025-01-01", "2025-01-31", "2025-03-01", "2025-03-31", "2025-05-02"]  # 30, 29, 30, 32 days
+
+
+def test_incremental_update_matches_batch_posterior():
+    """Test that one-at-a-time updates give the closed-form Normal-Inverse-Gamma posterior"""
+    estimator = CycleLengthEstimator(mean=28.0, weight=1.0, shape=3.0, scale=18.0)
+    lengths = [30, 29, 30, 32]
+    for start in STARTS:
+        estimator.log_start(start)
+
+    n = len(lengths)
+    sample_mean = sum(lengths) / n
+    squares = sum((x - sample_mean) ** 2 for x in lengths)
+    assert estimator.observations == n
+    assert estimator.mean == pytest.approx((1.0 * 28.0 + n * sample_mean) / (1.0 + n))
+    assert estimator.weight == 1.0 + n
+    assert estimator.shape == 3.0 + n / 2
+    assert estimator.scale == pytest.approx(18.0 + squares / 2 + 1.0 * n * (sample_mean - 28.0) ** 2 / (2 * (1.0 + n)))
+    assert estimator.cycle_length == 30
+
+
+def test_implausible_gaps_and_out_of_order_logs_are_ignored():
+    """Test that missed cycles, duplicates and back-dated logs don't skew the estimate"""
+    estimator = CycleLengthEstimator()
+    assert estimator.log_start("2025-01-01") is None
+    assert estimator.log_start("2025-01-01") is None
+    assert estimator.log_start("2025-03-05") is None  # 63 days: a missed log
+    assert estimator.log_start("2025-02-01") is None  # earlier than the last start
+    assert estimator.log_start("2025-04-02") == 28
+    assert estimator.observations == 1
+    assert estimator.last_start == "2025-04-02"
+
+
+def test_blend_shifts_from_forest_to_personal_history():
+    """Test that the personal estimate gains weight as cycles are logged"""
+    prior = CycleLengthEstimator()
+    learned = CycleLengthEstimator()
+    for i in range(12):
+        learned.update(32 + (i % 2))
+
+    assert prior.blend(rf_days=35.0, rf_sd=3.0) == {"days": 35.0, "sd": 3.0, "personal_weight": 0.0}
+    first = CycleLengthEstimator()
+    first.update(30)
+    early = first.blend(rf_days=27.0, rf_sd=3.0)
+    late = learned.blend(rf_days=27.0, rf_sd=3.0)
+    assert 0 < early["personal_weight"] < 0.5 < late["personal_weight"]
+    assert late["days"] == pytest.approx(late["personal_weight"] * learned.mean + (1 - late["personal_weight"]) * 27.0)
+    assert late["sd"] < math.sqrt(learned.variance)
+
+
+def test_state_round_trip_and_rebuild_from_history():
+    """Test that the stored posterior and a replay of state["cycles"] agree"""
+    cycles = [{"start_date": start, "period_length": 5} for start in reversed(STARTS)]
+    rebuilt = get_estimator({"cycles": cycles})
+    assert rebuilt.observations == 4
+
+    restored = get_estimator({"cycles": [], "cycle_estimate": rebuilt.to_dict()})
+    assert restored.to_dict() == rebuilt.to_dict()
+    assert get_estimator({"cycles": []}).summary()["observed_cycles"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,56 @@
+"""
+Test near-duplicate chunk elimination
+"""
+import random
+import pytest
+from langchain.docstore.document import Document
+
+from app.rag.dedup import NearDuplicateFilter, dedupe_chunks
+
+
+def _article(seed, n_words=150):
+    rng = random.Random(seed)
+    words = ["cramps", "iron", "magnesium", "sleep", "hydration", "yoga", "mood", "stress",
+             "cycle", "hormone", "energy", "heat", "walk", "fiber", "protein", "journal"]
+    return " ".join(rng.choice(words) + str(rng.randint(0, 50)) for _ in range(n_words))
+
+
+def _doc(text, topic="general", source="a"):
+    return Document(page_content=text, metadata={"topic": topic, "source": source})
+
+
+def test_near_duplicate_dropped():
+    """Test that a lightly edited copy is dropped and distinct text is kept"""
+    original = _article(1)
+    edited = original.replace(original.split()[40], "changed", 1)
+    chunks = [_doc(original), _doc(edited, source="b"), _doc(_article(2), source="c")]
+
+    kept = dedupe_chunks(chunks)
+    assert [d.metadata["source"] for d in kept] == ["a", "c"]
+
+
+def test_topic_slices_preserved():
+    """Test that a copy under another specific topic survives, but general text covers any topic"""
+    text = _article(3)
+    dedup = NearDuplicateFilter()
+    assert dedup.keep(_doc(text, topic="nutrition_pms"))
+    assert dedup.keep(_doc(text, topic="emotional_support"))
+
+    dedup = NearDuplicateFilter()
+    assert dedup.keep(_doc(text, topic="general"))
+    assert not dedup.keep(_doc(text, topic="emotional_support"))
+
+
+def test_stats_report_reduction():
+    """Test that the filter reports chunks dropped and embedding requests saved"""
+    dedup = NearDuplicateFilter()
+    for i in range(10):
+        dedup.keep(_doc(_article(i % 5), source=str(i)))
+    stats = dedup.stats(batch_size=4)
+    assert stats["chunks"] == 10 and stats["kept"] == 5 and stats["dropped"] == 5
+    assert stats["reduction"] == pytest.approx(0.5)
+    assert stats["embedding_requests_saved"] == 3 - 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,144 @@
+"""
+Test on-disk embedding cache
+"""
+import subprocess
+import sys
+import threading
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from app.rag.embedding_cache import CachedEmbeddings, EmbeddingCache, _file_lock, text_key
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic embeddings that record every text sent to the model"""
+    model = "counting-test-model"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.extend(texts)
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    def embed_query(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 0.0, 0.5]
+
+
+def test_only_new_text_is_embedded(tmp_path):
+    """Test that a rebuild only embeds texts missing from the cache"""
+    model = CountingEmbeddings()
+    cached = CachedEmbeddings(model, str(tmp_path))
+
+    first = cached.embed_documents(["cramps", "sleep", "cramps"])
+    assert model.calls == ["cramps", "sleep"]
+
+    # A fresh wrapper (e.g. new process) reads the same files
+    cached_again = CachedEmbeddings(model, str(tmp_path))
+    second = cached_again.embed_documents(["sleep", "cramps", "iron"])
+    assert model.calls == ["cramps", "sleep", "iron"]
+    assert second[0] == first[1]
+    assert second[1] == first[0]
+    assert cached_again.hits == 2 and cached_again.misses == 1
+
+
+def test_queries_and_documents_cached_separately(tmp_path):
+    """Test that query embeddings do not reuse document embeddings"""
+    model = CountingEmbeddings()
+    cached = CachedEmbeddings(model, str(tmp_path))
+
+    doc_vec = cached.embed_documents(["stress"])[0]
+    query_vec = cached.embed_query("stress")
+    assert doc_vec != query_vec
+    assert cached.embed_query("stress") == query_vec
+    assert model.calls == ["stress", "stress"]
+
+
+def test_cache_rejects_dimension_change(tmp_path):
+    """Test that mixing embedding sizes in one model cache fails loudly"""
+    cache = EmbeddingCache(str(tmp_path), "model")
+    cache.put_many(["a"], [[1.0, 2.0]])
+    with pytest.raises(ValueError):
+        cache.put_many(["b"], [[1.0, 2.0, 3.0]])
+    assert len(cache) == 1
+
+
+def test_write_appends_without_rewriting_existing_data(tmp_path):
+    """Test that a batch only appends its own rows, however many entries are cached"""
+    cache = EmbeddingCache(str(tmp_path), "model")
+    vector = [0.1] * 768
+    cache.put_many([text_key(f"bulk-{i}") for i in range(10000)], [vector] * 10000)
+    files = [cache.path / name for name in ("vectors.f32", "keys.log", "meta.json")]
+    before = {path: (path.stat().st_ino, path.read_bytes()) for path in files}
+
+    keys = [text_key(f"new-{j}") for j in range(50)]
+    cache.put_many(keys, [vector] * len(keys))
+    assert len(cache) == 10050
+    grown = {
+        "vectors.f32": 50 * 768 * 4,
+        "keys.log": sum(len(key) + 1 for key in keys),
+        "meta.json": 0
+    }
+    for path in files:
+        inode, data = before[path]
+        assert path.stat().st_ino == inode
+        assert path.stat().st_size == len(data) + grown[path.name]
+        with open(path, "rb") as f:
+            assert f.read(len(data)) == data
+
+    # Another process sees every row
+    reopened = EmbeddingCache(str(tmp_path), "model")
+    assert len(reopened) == 10050
+    assert reopened.get_many([text_key("bulk-9999"), keys[-1]]) == [pytest.approx(vector)] * 2
+
+
+def test_writers_wait_for_a_live_lock_holder(tmp_path):
+    """Test that a held lock is never broken and a dead holder's lock is released"""
+    writer = EmbeddingCache(str(tmp_path), "model")
+    other = EmbeddingCache(str(tmp_path), "model")
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with _file_lock(writer._lock_path):
+            holding.set()
+            release.wait(10)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait(10)
+    blocked = threading.Thread(target=other.put_many, args=(["a"], [[1.0, 2.0]]))
+    blocked.start()
+    blocked.join(0.3)
+    assert blocked.is_alive() and len(EmbeddingCache(str(tmp_path), "model")) == 0
+    release.set()
+    holder.join()
+    blocked.join(10)
+    assert EmbeddingCache(str(tmp_path), "model").get_many(["a"]) == [[1.0, 2.0]]
+
+    # A process that dies holding the lock doesn't block later writers
+    subprocess.run([sys.executable, "-c", (
+        "import fcntl, os; f = open(%r, 'a+b'); fcntl.flock(f.fileno(), fcntl.LOCK_EX); os._exit(0)"
+    ) % str(writer._lock_path)], check=True)
+    writer.put_many(["b"], [[3.0, 4.0]])
+    assert len(writer) == 2
+
+
+def test_partial_write_is_ignored_and_overwritten(tmp_path):
+    """Test that vector bytes without a key line (a crashed writer) are dropped"""
+    cache = EmbeddingCache(str(tmp_path), "model")
+    cache.put_many(["a"], [[1.0, 2.0]])
+    with open(cache.path / "vectors.f32", "ab") as f:
+        f.write(b"\0" * 8)
+    with open(cache.path / "keys.log", "ab") as f:
+        f.write(b"half-written")
+
+    reopened = EmbeddingCache(str(tmp_path), "model")
+    assert len(reopened) == 1
+    reopened.put_many(["b"], [[3.0, 4.0]])
+    assert EmbeddingCache(str(tmp_path), "model").get_many(["a", "b"]) == [[1.0, 2.0], [3.0, 4.0]]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
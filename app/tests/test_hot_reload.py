@@ -0,0 +1,154 @@
+"""
+Test incremental corpus reloads and atomic index snapshot swaps
+"""
+import os
+import pytest
+
+from app.rag import vector_store
+from app.rag.benchmark import HashingEmbeddings
+from app.rag.watcher import CorpusWatcher
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """A two-file corpus indexed with the numpy backend into a temp dir"""
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    (corpus_dir / "cramps.md").write_text("# Cramps\n\nA heating pad eases cramps.\n", encoding="utf-8")
+    (corpus_dir / "sleep.md").write_text("# Sleep\n\nKeep a regular bedtime.\n", encoding="utf-8")
+    for name in ("_snapshot", "_build_options", "_embeddings"):
+        monkeypatch.setattr(vector_store, name, getattr(vector_store, name))
+    monkeypatch.setattr(vector_store, "RAG_PRECOMPUTE_AGENT_QUERIES", False)
+    monkeypatch.setattr(vector_store, "_query_cache", vector_store.VersionedLRUCache(max_entries=0))
+
+    embeddings = CountingEmbeddings()
+    vector_store.init_vector_store(
+        str(corpus_dir), str(tmp_path / "missing.json"), persist_dir=str(tmp_path / "index"),
+        embeddings=embeddings, backend="numpy"
+    )
+    embeddings.embedded.clear()
+    return corpus_dir, embeddings
+
+
+def test_reload_reembeds_only_changed_files(corpus):
+    """Test that an edit re-chunks and re-embeds one file and keeps the other's chunks"""
+    corpus_dir, embeddings = corpus
+    old = vector_store.get_snapshot()
+    (corpus_dir / "cramps.md").write_text("# Cramps\n\nMagnesium may ease cramps.\n", encoding="utf-8")
+
+    assert vector_store.reload_vector_store()
+    new = vector_store.get_snapshot()
+    assert new.version != old.version
+    assert embeddings.embedded == ["Cramps\nMagnesium may ease cramps."]
+    sleep = str(corpus_dir / "sleep.md")
+    assert new.sources[sleep]["chunks"] is old.sources[sleep]["chunks"]
+
+    # A query that picked up the old snapshot keeps answering from it
+    old_results, _ = vector_store._run_batch(old, [("cramps", 1, None)], "hybrid")
+    assert "heating pad" in old_results[0][0]["content"]
+    assert "Magnesium" in vector_store.query_knowledge("cramps", k=1)[0]["content"]
+
+
+def test_touch_without_edit_keeps_snapshot(corpus):
+    """Test that rewriting identical bytes neither rebuilds nor re-embeds"""
+    corpus_dir, embeddings = corpus
+    old = vector_store.get_snapshot()
+    path = corpus_dir / "sleep.md"
+    path.write_bytes(path.read_bytes())
+    os.utime(path, ns=(0, 0))
+
+    assert not vector_store.reload_vector_store()
+    assert vector_store.get_snapshot() is old
+    assert embeddings.embedded == []
+
+
+def test_watcher_detects_content_changes(corpus):
+    """Test that the watcher ignores touches and reports edits, additions and removals"""
+    corpus_dir, _ = corpus
+    watcher = CorpusWatcher(str(corpus_dir), "missing.json", on_change=lambda: None,
+                            sources=vector_store.get_snapshot().sources)
+    assert not watcher.poll()
+
+    os.utime(corpus_dir / "sleep.md", ns=(0, 0))
+    assert not watcher.poll()
+    (corpus_dir / "sleep.md").write_text("# Sleep\n\nLimit caffeine after noon.\n", encoding="utf-8")
+    assert watcher.poll()
+    (corpus_dir / "mood.md").write_text("# Mood\n\nJournal daily.\n", encoding="utf-8")
+    assert watcher.poll()
+    (corpus_dir / "mood.md").unlink()
+    assert watcher.poll()
+
+
+def test_watcher_retries_failed_reload(corpus):
+    """Test that an edit whose reload raised is picked up again by the next poll"""
+    corpus_dir, _ = corpus
+    attempts = []
+
+    def flaky_reload():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise RuntimeError("embedding API unavailable")
+
+    watcher = CorpusWatcher(str(corpus_dir), "missing.json", on_change=flaky_reload,
+                            sources=vector_store.get_snapshot().sources)
+    (corpus_dir / "sleep.md").write_text("# Sleep\n\nKeep a fixed wake time.\n", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        watcher.poll(flaky_reload)
+    assert watcher.poll(flaky_reload)
+    assert not watcher.poll(flaky_reload)
+    assert attempts == [0, 1]
+
+
+def test_cached_results_are_not_shared_with_callers(corpus, monkeypatch):
+    """Test that mutating a returned hit leaves later cache hits intact"""
+    monkeypatch.setattr(vector_store, "_query_cache", vector_store.VersionedLRUCache(max_entries=16))
+    first = vector_store.query_knowledge("cramps", k=1)
+    first[0]["content"] = "annotated"
+    first[0]["metadata"]["score"] = 1.0
+    again = vector_store.query_knowledge("cramps", k=1)
+    assert vector_store.get_query_cache_stats()["hits"] == 1
+    assert "heating pad" in again[0]["content"] and "score" not in again[0]["metadata"]
+
+
+def test_cold_start_serves_lexical_results_while_embedding(tmp_path, monkeypatch):
+    """Test that queries made during the first build are answered by BM25 and not cached"""
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    (corpus_dir / "cramps.md").write_text("# Cramps\n\nA heating pad eases cramps.\n", encoding="utf-8")
+    for name in ("_build_options", "_embeddings"):
+        monkeypatch.setattr(vector_store, name, getattr(vector_store, name))
+    monkeypatch.setattr(vector_store, "_snapshot", None)
+    monkeypatch.setattr(vector_store, "RAG_PRECOMPUTE_AGENT_QUERIES", False)
+    cache = vector_store.VersionedLRUCache(max_entries=16)
+    monkeypatch.setattr(vector_store, "_query_cache", cache)
+
+    seen = []
+
+    class QueryingEmbeddings(HashingEmbeddings):
+        def embed_documents(self, texts):
+            snapshot = vector_store.get_snapshot()
+            seen.append((snapshot.lexical_only, vector_store.query_knowledge("cramps", k=1, mode="hybrid")))
+            return super().embed_documents(texts)
+
+    vector_store.init_vector_store(
+        str(corpus_dir), str(tmp_path / "missing.json"), persist_dir=str(tmp_path / "index"),
+        embeddings=QueryingEmbeddings(), backend="numpy"
+    )
+    lexical_only, results = seen[0]
+    assert lexical_only and "heating pad" in results[0]["content"]
+    assert cache.stats()["entries"] == 0
+    assert not vector_store.get_snapshot().lexical_only
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
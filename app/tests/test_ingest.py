@@ -0,0 +1,137 @@
+"""
+Test batched, concurrent embedding pipeline
+"""
+import json
+import time
+import threading
+import pytest
+from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
+
+from app.rag.corpus_loader import iter_scraped_items
+from app.rag.ingest import embed_matrix, embed_texts, iter_embedded_windows, IngestionError
+
+
+class FakeEmbeddingEndpoint(Embeddings):
+    """Local stand-in for a remote embedding service with latency and failures"""
+
+    def __init__(self, latency=0.0, fail_first_calls=0, poison=None):
+        self.latency = latency
+        self.fail_first_calls = fail_first_calls
+        self.poison = poison
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.batch_sizes.append(len(texts))
+        try:
+            time.sleep(self.latency)
+            if call <= self.fail_first_calls:
+                raise ConnectionError("503 Service Unavailable")
+            if self.poison in texts:
+                raise ValueError("text rejected")
+            return [[float(len(t)), float(i)] for i, t in enumerate(texts)]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_batches_with_bounded_concurrency():
+    """Test that batches respect batch size and the concurrency limit"""
+    endpoint = FakeEmbeddingEndpoint(latency=0.01)
+    texts = [f"chunk {i}" for i in range(100)]
+
+    vectors = embed_texts(texts, endpoint, batch_size=8, max_concurrency=3, on_progress=None)
+
+    assert len(vectors) == 100
+    assert max(endpoint.batch_sizes) == 8
+    assert endpoint.max_in_flight <= 3
+    # Results come back in input order
+    assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
+
+
+def test_failed_batches_are_retried():
+    """Test that transient endpoint failures are retried"""
+    endpoint = FakeEmbeddingEndpoint(fail_first_calls=2)
+    vectors = embed_texts(
+        ["a", "bb", "ccc"], endpoint, batch_size=2, max_concurrency=1,
+        retry_backoff=0, on_progress=None
+    )
+    assert [v[0] for v in vectors] == [1.0, 2.0, 3.0]
+
+
+def test_bad_text_is_isolated():
+    """Test that a permanently failing text is isolated by splitting its batch"""
+    endpoint = FakeEmbeddingEndpoint(poison="bad")
+    with pytest.raises(IngestionError):
+        embed_texts(
+            ["ok", "bad", "fine", "good"], endpoint, batch_size=4,
+            max_retries=0, retry_backoff=0, on_progress=None
+        )
+    # Split down to the single bad text: [4] -> [2, 2] -> [1, 1]
+    assert endpoint.batch_sizes[:4] == [4, 2, 1, 1]
+
+
+def test_progress_reporting():
+    """Test that progress reaches the total"""
+    seen = []
+    embed_texts(
+        [str(i) for i in range(10)], FakeEmbeddingEndpoint(), batch_size=3,
+        on_progress=lambda done, total, elapsed: seen.append((done, total))
+    )
+    assert len(seen) == 4
+    assert seen[-1] == (10, 10)
+
+
+def test_windows_stream_lazily_and_skip_repeats():
+    """Test that chunks are embedded a window at a time from a generator"""
+    consumed = []
+
+    def chunks():
+        for i in range(50):
+            consumed.append(i)
+            yield Document(page_content=f"chunk {i % 40}", metadata={"source": "s"})
+
+    windows = iter_embedded_windows(
+        chunks(), FakeEmbeddingEndpoint(), batch_size=4, max_concurrency=2, on_progress=None
+    )
+    ids, docs, vectors = next(windows)
+    # One window (4 * 2 * 2 chunks) is read before anything is embedded
+    assert len(docs) == 16 and len(consumed) == 16
+    assert vectors.shape == (16, 2)
+
+    docs, matrix = embed_matrix(
+        chunks(), FakeEmbeddingEndpoint(), batch_size=4, max_concurrency=2, on_progress=None
+    )
+    assert len(docs) == 40
+    assert matrix.shape == (40, 2)
+
+
+def test_scraped_items_parsed_incrementally(tmp_path, monkeypatch):
+    """Test that JSON arrays and JSONL both stream item by item"""
+    import app.rag.corpus_loader as corpus_loader
+    monkeypatch.setattr(corpus_loader, "_READ_SIZE", 7)
+    items = [{"content": f"text {i}, with [brackets]", "url": f"u{i}"} for i in range(5)]
+
+    array_file = tmp_path / "scraped.json"
+    array_file.write_text(json.dumps(items, indent=2), encoding="utf-8")
+    assert list(iter_scraped_items(str(array_file))) == items
+
+    lines_file = tmp_path / "scraped.jsonl"
+    lines_file.write_text("\n".join(json.dumps(i) for i in items) + "\n", encoding="utf-8")
+    assert list(iter_scraped_items(str(lines_file))) == items
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,45 @@
+"""
+Test BM25 lexical index and reciprocal-rank fusion
+"""
+import pytest
+from langchain.docstore.document import Document
+
+from app.rag.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def _docs():
+    return [
+        Document(page_content="Heat therapy and a heating pad help relieve cramps."),
+        Document(page_content="Magnesium foods like bananas and nuts support energy."),
+        Document(page_content="Mood swings and stress: try meditation and deep breathing."),
+    ]
+
+
+def test_tokenize_stems_and_drops_stopwords():
+    """Test that plurals match singulars and stopwords are removed"""
+    assert tokenize("Cramps during the period") == ["cramp", "period"]
+    assert tokenize("coping strategies") == ["coping", "strategy"]
+
+
+def test_bm25_ranks_keyword_matches_first():
+    """Test that the chunk sharing query terms ranks first"""
+    index = BM25Index(_docs())
+    results = index.search("nutrition recommendations for cramps", k=3)
+    assert results[0][0] == 0
+    assert index.search("stress mood", k=1)[0][0] == 2
+
+
+def test_bm25_no_match_returns_empty():
+    """Test that queries with unknown terms return nothing"""
+    assert BM25Index(_docs()).search("ovulation", k=3) == []
+    assert BM25Index([]).search("cramps", k=3) == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """Test that ids ranked well by both lists win the fusion"""
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]], k=2)
+    assert fused == ["b", "a"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
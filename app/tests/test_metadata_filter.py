@@ -0,0 +1,61 @@
+"""
+Test metadata-filtered retrieval
+"""
+import pytest
+from langchain.docstore.document import Document
+
+from app.rag.metadata_filter import MetadataPartitions, normalize_filters
+from app.rag.lexical_index import BM25Index
+
+
+def _docs():
+    return [
+        Document(page_content="Iron rich foods for cramps", metadata={"topic": "nutrition_period", "type": "scraped_article"}),
+        Document(page_content="Foods to avoid with PMS cramps", metadata={"topic": "nutrition_pms", "type": "scraped_article"}),
+        Document(page_content="Heat relieves cramps", metadata={"topic": "cramps_relief", "type": "scraped_article"}),
+        Document(page_content="Cramps and the menstrual cycle", metadata={"topic": "general", "type": "corpus_file"}),
+    ]
+
+
+def test_topic_prefix_patterns_select_partition():
+    """Test that glob patterns resolve to the matching topic partitions"""
+    partitions = MetadataPartitions(_docs())
+    assert list(partitions.rows({"topic": "nutrition_*"})) == [0, 1]
+    assert list(partitions.rows({"topic": ["nutrition_pms", "general"]})) == [1, 3]
+    assert partitions.rows(None) is None
+
+
+def test_fields_are_intersected():
+    """Test that filters on several fields must all match"""
+    partitions = MetadataPartitions(_docs())
+    rows = partitions.rows({"topic": ["cramps_relief", "general"], "type": "corpus_file"})
+    assert list(rows) == [3]
+    assert len(partitions.rows({"topic": "movement_*"})) == 0
+
+
+def test_chroma_where_translation():
+    """Test that patterns become a concrete Chroma $in clause"""
+    partitions = MetadataPartitions(_docs())
+    assert partitions.chroma_where({"topic": "nutrition_*"}) == {
+        "topic": {"$in": ["nutrition_period", "nutrition_pms"]}
+    }
+    assert partitions.chroma_where({"topic": "nothing_*"}) == {}
+    assert "$and" in partitions.chroma_where({"topic": "general", "type": "corpus_file"})
+
+
+def test_lexical_search_stays_in_slice():
+    """Test that BM25 only returns documents from the filtered slice"""
+    index = BM25Index(_docs())
+    rows = index.partitions.rows({"topic": "nutrition_*"})
+    assert {idx for idx, _ in index.search("cramps", k=4, rows=rows)} == {0, 1}
+
+
+def test_normalize_filters_rejects_unknown_field():
+    """Test that filters are canonical and validated"""
+    assert normalize_filters({"topic": ["b", "a", "a"]}) == (("topic", ("a", "b")),)
+    with pytest.raises(ValueError):
+        normalize_filters({"author": "x"})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,306 @@
+"""
+Test cycle prediction (per-row and batch) against the sklearn pipeline
+"""
+import shutil
+import time
+from concurrent.futures import Future
+from pathlib import Path
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import ml_cycle_predictor
+from app.ml_benchmark import synthetic_features, train_synthetic_model
+from app.ml_encoder import FeatureEncoder
+from app.ml_forest import CompiledForest
+from app.model_registry import ModelRegistry
+from app.cache import VersionedLRUCache
+
+
+@pytest.fixture(scope="module")
+def trained_model(tmp_path_factory):
+    """A small forest fitted with the training pipeline, saved like the real model"""
+    path = tmp_path_factory.mktemp("model") / "model.pkl"
+    model = train_synthetic_model(n_rows=500, n_estimators=20, max_depth=6)
+    joblib.dump(model, path)
+    return model, str(path)
+
+
+@pytest.fixture
+def predictor(trained_model, monkeypatch, tmp_path):
+    model, path = trained_model
+    monkeypatch.setattr(ml_cycle_predictor, "ML_MODEL_PATH", path)
+    monkeypatch.setattr(ml_cycle_predictor, "ML_FOREST_DIR", str(tmp_path / "forest"))
+    monkeypatch.setattr(ml_cycle_predictor, "ML_REGISTRY_DIR", str(tmp_path / "registry"))
+    monkeypatch.setattr(ml_cycle_predictor, "_active", None)
+    monkeypatch.setattr(ml_cycle_predictor, "_explanations", VersionedLRUCache(max_entries=100, ttl_seconds=60))
+    monkeypatch.setattr(ml_cycle_predictor, "_predictions", VersionedLRUCache(max_entries=100, ttl_seconds=60))
+    monkeypatch.setattr(ml_cycle_predictor, "_failures", VersionedLRUCache(max_entries=100, ttl_seconds=60))
+    monkeypatch.setattr(ml_cycle_predictor, "_pending", {})
+    return model
+
+
+def test_batch_matches_per_row(predictor):
+    """Test that the batch path returns exactly the per-row results"""
+    features = synthetic_features(25, seed=3)
+    batch = ml_cycle_predictor.run_cycle_prediction_batch(features)
+    assert len(batch) == 25
+    for row, result in zip(features, batch):
+        single = ml_cycle_predictor.run_cycle_prediction(row)
+        assert single["prediction_days_until_next_cycle"] == pytest.approx(result["prediction_days_until_next_cycle"])
+        assert single["feature_contributions_ranked"] == pytest.approx(result["feature_contributions_ranked"])
+    assert ml_cycle_predictor.run_cycle_prediction_batch([]) == []
+
+
+def test_prediction_and_shap_match_pipeline(predictor):
+    """Test predictions against the pipeline and SHAP names against its transformed columns"""
+    features = synthetic_features(10, seed=4)
+    results = ml_cycle_predictor.run_cycle_prediction_batch(features)
+    expected = predictor.predict(pd.DataFrame(features))
+    assert [r["prediction_days_until_next_cycle"] for r in results] == pytest.approx(expected)
+
+    names = [name.split("__", 1)[1] for name in predictor.named_steps["preprocess"].get_feature_names_out()]
+    result = results[0]
+    assert list(result["raw_shap_values"]) == names
+    assert len(result["feature_contributions_ranked"]) == ml_cycle_predictor.TOP_CONTRIBUTIONS
+    impacts = [c["impact_days"] for c in result["feature_contributions_ranked"]]
+    assert impacts == sorted(impacts, reverse=True)
+
+    # SHAP values plus the expected value reconstruct each prediction
+    base = float(np.ravel(ml_cycle_predictor._get_model().explainer.expected_value)[0])
+    for r in results:
+        assert base + sum(r["raw_shap_values"].values()) == pytest.approx(r["prediction_days_until_next_cycle"], abs=1e-6)
+
+
+def test_compiled_encoder_matches_column_transformer(trained_model):
+    """Test the dict encoder against preprocess.transform, incl. dropped and unknown categories"""
+    preprocess = trained_model[0].named_steps["preprocess"]
+    encoder = FeatureEncoder.from_preprocess(preprocess)
+    features = synthetic_features(30, seed=5)
+    features[0]["Diet"] = "Mediterranean"  # unseen in training: all zeros
+    features[1]["Exercise Frequency"] = "High"  # first category: dropped
+
+    expected = preprocess.transform(pd.DataFrame(features))
+    np.testing.assert_allclose(encoder.transform(features), expected)
+    for row, values in zip(expected, features):
+        np.testing.assert_allclose(encoder.transform_one(values)[0], row)
+
+
+@pytest.mark.parametrize("with_mean,with_std", [(False, True), (True, False), (False, False)])
+def test_compiled_encoder_follows_scaler_flags(with_mean, with_std):
+    """Test that a scaler fitted without centering or scaling encodes like its transform"""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    features = synthetic_features(50, seed=6)
+    preprocess = ColumnTransformer([
+        ("cat", OneHotEncoder(handle_unknown="ignore"), ml_cycle_predictor.CATEGORICAL_FEATURES),
+        ("num", StandardScaler(with_mean=with_mean, with_std=with_std), ml_cycle_predictor.NUMERIC_FEATURES)
+    ]).fit(pd.DataFrame(features))
+    encoder = FeatureEncoder.from_preprocess(preprocess)
+    expected = preprocess.transform(pd.DataFrame(features))
+    np.testing.assert_allclose(encoder.transform(features), expected)
+    np.testing.assert_allclose(encoder.transform_one(features[0])[0], expected[0])
+
+
+def test_explanations_are_optional_and_cached(predictor):
+    """Test the explain modes and that repeat explanations come from the cache"""
+    features = synthetic_features(1, seed=6)[0]
+    full = ml_cycle_predictor.run_cycle_prediction(features)
+
+    bare = ml_cycle_predictor.run_cycle_prediction(features, explain="none")
+    assert bare == {
+        "prediction_days_until_next_cycle": full["prediction_days_until_next_cycle"],
+        "model_version": full["model_version"]
+    }
+    assert ml_cycle_predictor.run_cycle_prediction(features) == full
+
+    approx = ml_cycle_predictor.run_cycle_prediction(features, explain="approximate", top_k=3)
+    assert approx["explanation_approximate"] and "raw_shap_values" not in approx
+    assert len(approx["feature_contributions_ranked"]) == 3
+
+    with pytest.raises(ValueError):
+        ml_cycle_predictor.run_cycle_prediction(features, explain="sometimes")
+
+
+def test_deferred_explanation_fetched_when_ready(predictor):
+    """Test that a deferred explanation is computed in the background and matches the inline one"""
+    features = synthetic_features(1, seed=7)[0]
+    deferred = ml_cycle_predictor.run_cycle_prediction(features, explain="deferred")
+    assert set(deferred) == {
+        "prediction_days_until_next_cycle", "model_version", "explanation_id", "explanation_status"
+    }
+
+    deadline = time.monotonic() + 30
+    while (explanation := ml_cycle_predictor.get_explanation(deferred["explanation_id"]))["status"] == "pending":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert explanation["status"] == "ready"
+
+    full = ml_cycle_predictor.run_cycle_prediction(features)
+    assert explanation["raw_shap_values"] == pytest.approx(full["raw_shap_values"])
+    assert ml_cycle_predictor.run_cycle_prediction(features, explain="deferred")["explanation_status"] == "ready"
+    assert ml_cycle_predictor.get_explanation("0" * 32) is None
+
+
+def test_failed_deferred_explanation_reported(predictor, monkeypatch):
+    """Test that a deferred explanation whose SHAP call raises reports failed, then retries"""
+    model = ml_cycle_predictor._get_model()
+
+    class BrokenExplainer:
+        def shap_values(self, *args, **kwargs):
+            raise RuntimeError("explainer unavailable")
+
+    working = model.explainer
+    monkeypatch.setattr(model, "explainer", BrokenExplainer())
+    features = synthetic_features(1, seed=13)[0]
+    deferred = ml_cycle_predictor.run_cycle_prediction(features, explain="deferred")
+
+    deadline = time.monotonic() + 30
+    while (explanation := ml_cycle_predictor.get_explanation(deferred["explanation_id"]))["status"] == "pending":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert explanation == {"status": "failed", "error": "explainer unavailable"}
+    # The failure is recorded; the finished future itself isn't kept around
+    while ml_cycle_predictor._pending:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert ml_cycle_predictor.get_explanation(deferred["explanation_id"])["status"] == "failed"
+
+    # The next request for the same row queues it again
+    model.explainer = working
+    ml_cycle_predictor.run_cycle_prediction(features, explain="deferred")
+    while (explanation := ml_cycle_predictor.get_explanation(deferred["explanation_id"]))["status"] != "ready":
+        assert explanation["status"] == "pending" and time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_compiled_forest_matches_sklearn(trained_model, tmp_path):
+    """Test the array-backed forest against sklearn, in memory and reloaded with mmap"""
+    model = trained_model[0]
+    rf = model.named_steps["rf"]
+    X = model.named_steps["preprocess"].transform(pd.DataFrame(synthetic_features(300, seed=8)))
+    forest = CompiledForest.from_sklearn(rf)
+    np.testing.assert_allclose(forest.predict(X), rf.predict(X), rtol=1e-12)
+    np.testing.assert_allclose(forest.predict(X[:1]), rf.predict(X[:1]), rtol=1e-12)
+
+    assert forest.save(str(tmp_path / "forest"))
+    loaded = CompiledForest.load(str(tmp_path / "forest"))
+    assert isinstance(loaded.children, np.memmap)
+    np.testing.assert_allclose(loaded.predict(X), rf.predict(X), rtol=1e-12)
+
+    # A second export of the same version leaves the mapped one in place
+    written = (tmp_path / "forest" / "children.npy").stat().st_ino
+    assert not forest.save(str(tmp_path / "forest"))
+    assert (tmp_path / "forest" / "children.npy").stat().st_ino == written
+    assert [p.name for p in tmp_path.iterdir()] == ["forest"]
+    np.testing.assert_allclose(loaded.predict(X), rf.predict(X), rtol=1e-12)
+
+
+def test_preload_shares_forest_pages_and_warms_up(predictor):
+    """Test that startup loading memory-maps the forest export and warms the SHAP paths"""
+    ml_cycle_predictor.preload_model()
+    model = ml_cycle_predictor._get_model()
+    assert isinstance(model.forest.children, np.memmap)
+    assert model._approx_explainer is not None
+    assert ml_cycle_predictor._explanations.stats()["entries"] == 2
+
+    # A restarted worker maps the existing export instead of recompiling
+    exports = list(Path(ml_cycle_predictor.ML_FOREST_DIR).iterdir())
+    ml_cycle_predictor._active = None
+    ml_cycle_predictor.preload_model()
+    assert list(Path(ml_cycle_predictor.ML_FOREST_DIR).iterdir()) == exports
+
+
+def test_prediction_cache_memoizes_exact_inputs(predictor):
+    """Test that by default the cache never changes the model's output"""
+    model, features = predictor, dict(synthetic_features(1, seed=9)[0], BMI=22.43, **{"Sleep Hours": 7.2})
+    nearby = dict(features, BMI=22.36, **{"Sleep Hours": 6.9})
+    for inputs in (features, nearby, features):
+        result = ml_cycle_predictor.run_cycle_prediction(inputs, explain="none")
+        expected = model.predict(pd.DataFrame([inputs]))[0]
+        assert result["prediction_days_until_next_cycle"] == pytest.approx(expected, rel=1e-9)
+    stats = ml_cycle_predictor.get_prediction_cache_stats()["predictions"]
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_prediction_cache_keyed_by_quantized_features(predictor, monkeypatch):
+    """Test that nearby inputs share a cached result when enabled and a new model version invalidates it"""
+    monkeypatch.setattr(ml_cycle_predictor, "ML_PREDICTION_CACHE_QUANTIZE", True)
+    features = dict(synthetic_features(1, seed=9)[0], BMI=22.43, **{"Sleep Hours": 7.2})
+    first = ml_cycle_predictor.run_cycle_prediction(features)
+    # Computed on the request's own values, not the rounded ones
+    expected = predictor.predict(pd.DataFrame([features]))[0]
+    assert first["prediction_days_until_next_cycle"] == pytest.approx(expected, rel=1e-9)
+    nearby = dict(features, BMI=22.36, **{"Sleep Hours": 6.9})
+    assert ml_cycle_predictor.quantize_features(nearby) == ml_cycle_predictor.quantize_features(features)
+    assert ml_cycle_predictor.run_cycle_prediction(nearby) == first
+    assert ml_cycle_predictor.run_cycle_prediction(dict(features, BMI=25.0)) != first
+
+    stats = ml_cycle_predictor.get_prediction_cache_stats()["predictions"]
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+    # Results handed out are copies of the cached entry
+    ml_cycle_predictor.run_cycle_prediction(features)["feature_contributions_ranked"].clear()
+    assert ml_cycle_predictor.run_cycle_prediction(features) == first
+
+    ml_cycle_predictor._get_model().version = "retrained"
+    ml_cycle_predictor.run_cycle_prediction(features)
+    assert ml_cycle_predictor.get_prediction_cache_stats()["predictions"]["entries"] == 1
+
+
+def test_registry_hot_swap_and_rollback(predictor, tmp_path):
+    """Test that registered versions swap in without a reload of the caller and roll back"""
+    registry = ModelRegistry(ml_cycle_predictor.ML_REGISTRY_DIR)
+    features = synthetic_features(1, seed=10)[0]
+    legacy = ml_cycle_predictor.run_cycle_prediction(features, explain="none")
+    assert legacy["model_version"].startswith("model.pkl:")
+
+    first = registry.register(ml_cycle_predictor.ML_MODEL_PATH, metrics={"test_mae": 1.0})
+    retrained_path = tmp_path / "retrained.pkl"
+    joblib.dump(train_synthetic_model(n_rows=300, n_estimators=10, max_depth=4, seed=1), retrained_path)
+    time.sleep(1)  # version ids are second-resolution timestamps
+    second = registry.register(str(retrained_path), metrics={"test_mae": 2.0}, params={"n_estimators": 10})
+    assert [meta["version"] for meta in registry.versions()] == [first, second]
+    assert registry.current() is None
+
+    ml_cycle_predictor._pending["stale"] = Future()
+    assert ml_cycle_predictor.activate_model(first) == first
+    assert ml_cycle_predictor._pending == {}  # old-model computations are dropped on a swap
+    assert ml_cycle_predictor.run_cycle_prediction(features, explain="none")["model_version"] == first
+    in_flight = ml_cycle_predictor._get_model()
+    ml_cycle_predictor.activate_model(second)
+    swapped = ml_cycle_predictor.run_cycle_prediction(features)
+    assert swapped["model_version"] == second
+    assert in_flight.version == first  # requests holding the old bundle are unaffected
+
+    info = ml_cycle_predictor.get_model_info()
+    assert info["active_metadata"]["metrics"] == {"test_mae": 2.0}
+    assert info["registry_current"] == second and info["rollback_version"] == first
+
+    assert ml_cycle_predictor.rollback_model() == first
+    restored = ml_cycle_predictor.run_cycle_prediction(features, explain="none")
+    assert restored["model_version"] == first
+    assert restored["prediction_days_until_next_cycle"] == legacy["prediction_days_until_next_cycle"]
+    assert registry.current() == first
+    with pytest.raises(ValueError):
+        ml_cycle_predictor.rollback_model()
+    with pytest.raises(KeyError):
+        ml_cycle_predictor.activate_model("unknown")
+
+    # A fresh worker starts on the registry's active version
+    ml_cycle_predictor._active = None
+    assert ml_cycle_predictor.run_cycle_prediction(features, explain="none")["model_version"] == first
+
+    # Only registered versions keep their forest exports
+    exports = {path.name for path in Path(ml_cycle_predictor.ML_FOREST_DIR).iterdir()}
+    assert exports == {ml_cycle_predictor._forest_key(first), ml_cycle_predictor._forest_key(second)}
+    shutil.rmtree(Path(ml_cycle_predictor.ML_REGISTRY_DIR) / second)
+    ml_cycle_predictor.activate_model(first)
+    exports = {path.name for path in Path(ml_cycle_predictor.ML_FOREST_DIR).iterdir()}
+    assert exports == {ml_cycle_predictor._forest_key(first)}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,100 @@
+"""
+Test typed, chunked loading of the training CSV and its columnar cache
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml_benchmark import synthetic_features
+from app.ml_data import COLUMN_DTYPES, DATE_COLUMNS, load_dataset, read_csv_chunked
+
+
+def _write_csv(path, n_rows):
+    df = pd.DataFrame(synthetic_features(n_rows, seed=12))
+    starts = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(len(df)) % 300, unit="D")
+    df["Cycle Start Date"] = starts.strftime("%Y-%m-%d")
+    next_starts = starts + pd.to_timedelta(df["Cycle Length"].to_numpy(), unit="D")
+    df["Next Cycle Start Date"] = next_starts.strftime("%Y-%m-%d")
+    df["User Notes"] = "unused column"
+    # A category that only the last chunk sees, and a gap in an integer column
+    df.loc[len(df) - 1, "Diet"] = "Mediterranean"
+    df.loc[3, "Period Length"] = None
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    return _write_csv(tmp_path / "cycles.csv", 500)
+
+
+def test_chunked_read_is_typed_and_matches_plain_parse(csv_path):
+    """Test compact dtypes, dates and values against an untyped read_csv"""
+    df = read_csv_chunked(str(csv_path), chunk_rows=64)
+    expected = pd.read_csv(csv_path)
+
+    assert "User Notes" not in df
+    assert len(df) == len(expected)
+    assert df["Age"].dtype == np.int8 and df["Cycle Length"].dtype == np.int16
+    assert df["Period Length"].dtype == np.float32 and np.isnan(df["Period Length"][3])
+    assert df["BMI"].dtype == np.float32
+    for column in DATE_COLUMNS:
+        assert df[column].dtype == "datetime64[ns]"
+    for column, dtype in COLUMN_DTYPES.items():
+        if dtype == "category":
+            assert isinstance(df[column].dtype, pd.CategoricalDtype)
+            assert df[column].astype(object).tolist() == expected[column].tolist()
+    assert "Mediterranean" in df["Diet"].cat.categories
+    np.testing.assert_allclose(df["Sleep Hours"], expected["Sleep Hours"], rtol=1e-6)
+    assert df.memory_usage(deep=True).sum() < expected.memory_usage(deep=True).sum() / 2
+
+
+def test_cache_keyed_by_source_content(csv_path, tmp_path):
+    """Test that reruns hit the cached copy and an edited source misses it"""
+    cache_dir = str(tmp_path / "cache")
+    first, report = load_dataset(str(csv_path), cache_dir=cache_dir, chunk_rows=64)
+    assert report["cache"] == "miss" and report["rows"] == 500
+    assert report["peak_mb"] > 0 and report["frame_mb"] > 0
+
+    cached, report = load_dataset(str(csv_path), cache_dir=cache_dir)
+    assert report["cache"] == "hit"
+    pd.testing.assert_frame_equal(cached, first)
+
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("30,22.0,2,Low,7.0,Vegan,29,5,None,2025-01-01,2025-01-30,extra\n")
+    edited, report = load_dataset(str(csv_path), cache_dir=cache_dir)
+    assert report["cache"] == "miss" and len(edited) == 501
+
+    assert load_dataset(str(csv_path), cache_dir=None)[1]["cache"] == "disabled"
+
+
+def test_empty_csv_columns_and_strict_dates(csv_path, tmp_path):
+    """Test that empty inputs keep a fixed column order and malformed dates raise"""
+    header_only = tmp_path / "header.csv"
+    header_only.write_text(csv_path.read_text(encoding="utf-8").splitlines()[0] + "\n", encoding="utf-8")
+    assert list(read_csv_chunked(str(header_only)).columns) == [
+        column for column in pd.read_csv(csv_path, nrows=0).columns if column != "User Notes"
+    ]
+    unrelated = tmp_path / "unrelated.csv"
+    unrelated.write_text("a,b\n1,2\n", encoding="utf-8")
+    assert list(read_csv_chunked(str(unrelated)).columns) == list(COLUMN_DTYPES) + DATE_COLUMNS
+
+    lines = csv_path.read_text(encoding="utf-8").splitlines()
+    lines[5] = lines[5].replace("2024-01-05", "not a date", 1)
+    malformed = tmp_path / "malformed.csv"
+    malformed.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_csv_chunked(str(malformed), chunk_rows=64)
+
+
+def test_peak_memory_bounded_by_final_frame(tmp_path):
+    """Test that parsing never holds much more than the final frame plus one chunk"""
+    path = _write_csv(tmp_path / "large.csv", 40_000)
+    df, report = load_dataset(str(path), cache_dir=None, chunk_rows=1000)
+    assert len(df) == 40_000 and isinstance(df["Diet"].dtype, pd.CategoricalDtype)
+    # The C parser's buffers add about 1 MB whatever the file size
+    assert report["peak_mb"] < 1.5 * report["frame_mb"] + 1.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
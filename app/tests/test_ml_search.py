@@ -0,0 +1,77 @@
+"""
+Test the cross-validated hyperparameter search used by train_model.py --search
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from app import ml_search
+from app.ml_benchmark import synthetic_features
+from app.ml_cycle_predictor import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+from app.ml_forest import CompiledForest
+
+
+@pytest.fixture
+def dataset():
+    X = pd.DataFrame(synthetic_features(300, seed=11))
+    y = X["Cycle Length"] + 0.5 * (X["Stress Level"] - 3) + np.random.default_rng(0).normal(0, 1, len(X))
+    preprocess = ColumnTransformer([
+        ("cat", OneHotEncoder(handle_unknown="ignore", drop="first"), CATEGORICAL_FEATURES),
+        ("num", StandardScaler(), NUMERIC_FEATURES)
+    ], remainder="drop")
+    return X, y, preprocess
+
+
+def test_preprocessed_matrix_cached_once(dataset, tmp_path):
+    """Test that the matrix is written once per dataset and matches the fitted transformer"""
+    X, y, preprocess = dataset
+    X_path, y_path = ml_search.cache_matrix(X, y, preprocess, str(tmp_path))
+    written = X_path.stat().st_mtime_ns
+    assert ml_search.cache_matrix(X, y, preprocess, str(tmp_path)) == (X_path, y_path)
+    assert X_path.stat().st_mtime_ns == written
+    np.testing.assert_allclose(np.load(X_path), preprocess.fit_transform(X), rtol=1e-6)
+
+    shifted = y + 1
+    assert ml_search.cache_matrix(X, shifted, preprocess, str(tmp_path))[0] != X_path
+
+
+def test_search_reports_tradeoffs_per_candidate(dataset, tmp_path):
+    """Test a small grid search in the process pool: one row per candidate, best first"""
+    X, y, preprocess = dataset
+    space = {"n_estimators": [5, 20], "max_depth": [3, None]}
+    results = ml_search.run_search(
+        X, y, preprocess, mode="grid", folds=3, workers=2, space=space, cache_dir=str(tmp_path)
+    )
+    assert len(results) == 4
+    assert {(r["params"]["n_estimators"], r["params"]["max_depth"]) for r in results} == {
+        (5, 3), (5, None), (20, 3), (20, None)
+    }
+    maes = [r["cv_mae"] for r in results]
+    assert maes == sorted(maes)
+    for result in results:
+        assert result["latency_us"] > 0 and result["model_mb"] > result["compiled_mb"] > 0
+    assert any(r["pareto"] for r in results)
+    # The smallest forest is never dominated on size
+    smallest = min(results, key=lambda r: r["compiled_mb"])
+    assert smallest["pareto"]
+    # The saved forests are removed once timed
+    assert not list(tmp_path.glob("*/forests-*"))
+
+    with pytest.raises(ValueError):
+        ml_search.run_search(X, y, preprocess, mode="bayesian", cache_dir=str(tmp_path))
+
+
+def test_latency_timed_outside_the_pool(dataset, tmp_path):
+    """Test that workers save the compiled forest for the parent and return only the metrics"""
+    X, y, preprocess = dataset
+    X_path, y_path = ml_search.cache_matrix(X, y, preprocess, str(tmp_path))
+    forest_path = tmp_path / "forest"
+    result = ml_search.evaluate_candidate({"n_estimators": 5}, str(X_path), str(y_path), 3, 0, str(forest_path))
+    assert "latency_us" not in result
+    assert result["nodes"] == len(CompiledForest.load(str(forest_path)).value)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
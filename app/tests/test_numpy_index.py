@@ -0,0 +1,107 @@
+"""
+Test in-process NumPy search backend
+"""
+import numpy as np
+import pytest
+from langchain.docstore.document import Document
+
+from app.rag.numpy_index import NumpyVectorIndex
+
+
+def _corpus(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    docs = [Document(page_content=f"chunk {i}", metadata={"row": i}) for i in range(n)]
+    return vectors, docs
+
+
+def _brute_force(vectors, query, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return list(np.argsort(-(unit @ (query / np.linalg.norm(query))))[:k])
+
+
+def test_exact_search_matches_brute_force(tmp_path):
+    """Test that exact search returns the true top-k by cosine similarity"""
+    vectors, docs = _corpus(200)
+    index = NumpyVectorIndex.build(str(tmp_path / "idx"), vectors.tolist(), docs)
+    query = vectors[17] + 0.01
+
+    results = index.search(query.tolist(), k=5)
+    found = [index.documents[row].metadata["row"] for row, _ in results]
+    assert found == _brute_force(vectors, query, 5)
+    assert isinstance(index.vectors, np.memmap)
+
+
+def test_float16_storage_keeps_ranking(tmp_path):
+    """Test that float16 storage still finds the nearest neighbour"""
+    vectors, docs = _corpus(200)
+    index = NumpyVectorIndex.build(str(tmp_path / "idx"), vectors.tolist(), docs, dtype="float16")
+    assert index.vectors.dtype == np.float16
+    row, score = index.search(vectors[42].tolist(), k=1)[0]
+    assert index.documents[row].metadata["row"] == 42
+    assert score == pytest.approx(1.0, abs=1e-2)
+
+
+def test_int8_storage_with_rescoring(tmp_path):
+    """Test that int8 storage shrinks the matrix and rescoring restores exact ranking"""
+    vectors, docs = _corpus(500, dim=64)
+    exact = NumpyVectorIndex.build(str(tmp_path / "f32"), vectors, docs)
+    index = NumpyVectorIndex.build(str(tmp_path / "i8"), vectors, docs, dtype="int8", rescore=4)
+    assert index.vectors.dtype == np.int8
+    assert index.searched_bytes < exact.searched_bytes / 3
+
+    query = vectors[7] + 0.3 * vectors[8]
+    results = index.search(query.tolist(), k=5)
+    assert [row for row, _ in results] == _brute_force(vectors, query, 5)
+    # Rescored similarities are the full-precision ones
+    assert results[0][1] == pytest.approx(exact.search(query.tolist(), k=1)[0][1], abs=1e-5)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_batch_search_matches_single_queries(tmp_path, dtype):
+    """Test that one batched matrix multiply returns the same hits as separate searches"""
+    vectors, docs = _corpus(300, dim=32)
+    index = NumpyVectorIndex.build(str(tmp_path / "idx"), vectors, docs, dtype=dtype)
+    queries = [vectors[3], vectors[50] + vectors[51], vectors[299]]
+    ks = [1, 5, 3]
+    rows_list = [None, list(range(40, 120)), [299, 7, 8]]
+
+    batched = index.search_batch(queries, ks, rows_list)
+    for query, k, rows, hits in zip(queries, ks, rows_list, batched):
+        assert [r for r, _ in hits] == [r for r, _ in index.search(query, k=k, rows=rows)]
+
+
+def test_unknown_dtype_rejected(tmp_path):
+    """Test that an unsupported storage dtype fails fast"""
+    vectors, docs = _corpus(5)
+    with pytest.raises(ValueError):
+        NumpyVectorIndex.build(str(tmp_path / "idx"), vectors, docs, dtype="int4")
+
+
+def test_ivf_above_threshold(tmp_path):
+    """Test that large indexes switch to IVF and keep high recall"""
+    vectors, docs = _corpus(2000)
+    index = NumpyVectorIndex.build(
+        str(tmp_path / "idx"), vectors.tolist(), docs, ann_threshold=1000, nprobe=16
+    )
+    assert index.meta["ivf"]
+
+    recalls = []
+    for q in range(0, 2000, 100):
+        found = {index.documents[row].metadata["row"] for row, _ in index.search(vectors[q].tolist(), k=10)}
+        recalls.append(len(found & set(_brute_force(vectors, vectors[q], 10))) / 10)
+        assert q in found
+    assert np.mean(recalls) >= 0.8
+
+
+def test_build_reuses_published_index(tmp_path):
+    """Test that a second worker opens the existing index instead of rewriting it"""
+    vectors, docs = _corpus(10)
+    path = str(tmp_path / "idx")
+    NumpyVectorIndex.build(path, vectors.tolist(), docs)
+    reopened = NumpyVectorIndex.build(path, [], [])
+    assert len(reopened) == 10
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,42 @@
+"""
+Test query_knowledge result cache
+"""
+import pytest
+
+from app.rag.query_cache import normalize_query
+from app.rag.query_templates import (
+    agent_queries, plan_queries, nutrition_query, emotional_query, knowledge_query, knowledge_filter,
+    NUTRITION_K, EMOTIONAL_K, KNOWLEDGE_K, NUTRITION_FILTER, EMOTIONAL_FILTER
+)
+
+
+def test_normalize_query():
+    """Test that case and whitespace differences share a cache key"""
+    assert normalize_query("  Pain   Relief\n") == normalize_query("pain relief")
+
+
+def test_agent_query_space_is_enumerated():
+    """Test that queries the agents build are all in the precomputed set"""
+    queries = {(query, k): filters for query, k, filters in agent_queries()}
+    assert len(queries) == 8 + 4 * 5 + 4
+    assert queries[(nutrition_query(["cramps", "stress"]), NUTRITION_K)] == NUTRITION_FILTER
+    assert (nutrition_query([]), NUTRITION_K) in queries
+    assert queries[(emotional_query("bad", 5), EMOTIONAL_K)] == EMOTIONAL_FILTER
+    assert queries[(knowledge_query([]), KNOWLEDGE_K)] is None
+    both = ["pain relief", "mood management"]
+    assert queries[(knowledge_query(both), KNOWLEDGE_K)] == knowledge_filter(both)
+
+
+def test_plan_queries_are_precomputed():
+    """Test that every daily log maps to queries from the enumerated space"""
+    space = {(query, k, str(filters)) for query, k, filters in agent_queries()}
+    logs = [None, {"pain": 8, "energy": 2, "stress": 5, "mood": "bad"}, {"pain": 3, "mood": "okay", "stress": 2}]
+    for log in logs:
+        queries = plan_queries(log)
+        assert set(queries) == {"nutrition", "emotional", "knowledge_resources"}
+        for query, k, filters in queries.values():
+            assert (query, k, str(filters)) in space
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])